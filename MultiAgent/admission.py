@@ -0,0 +1,161 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from metrics import percentile
+
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", "2000"))
+ADMISSION_ROUTE_WAIT_MS = float(os.getenv("ADMISSION_ROUTE_WAIT_MS", "250"))
+ADMISSION_ROUTE_LIMITS = os.getenv("ADMISSION_ROUTE_LIMITS", "web=4,nl2sql=8,general=16")
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+DEGRADE_ROUTES = {"web": "general", "nl2sql": "general"}
+
+
+def parse_route_limits(spec: str) -> Dict[str, int]:
+  limits = {}
+  for part in spec.split(","):
+    if "=" in part:
+      route, limit = part.split("=", 1)
+      limits[route.strip()] = int(limit)
+  return limits
+
+
+class AdmissionRejected(Exception):
+  """Raised when a request cannot be admitted; the API maps it to a 429."""
+  def __init__(self, reason: str, retry_after: float = 1.0):
+    super().__init__(reason)
+    self.reason = reason
+    self.retry_after = retry_after
+
+
+class _Waiter:
+  __slots__ = ("event", "granted", "cancelled")
+
+  def __init__(self):
+    self.event = threading.Event()
+    self.granted = False
+    self.cancelled = False
+
+
+class AdmissionController:
+  """Bounds in-flight work with a priority queue in front and per-route limits behind it.
+
+  `admit` gates whole requests: at most `max_concurrent` run at once, up to
+  `max_queue` wait in priority order and anything beyond that, or waiting longer
+  than `max_wait`, is rejected. `route_slot` gates the expensive agents: when a
+  route is saturated the request degrades to the cheaper route in `degrade_routes`
+  or is rejected.
+  """
+  def __init__(self, max_concurrent: int = ADMISSION_MAX_CONCURRENT, max_queue: int = ADMISSION_MAX_QUEUE,
+               max_wait: float = ADMISSION_MAX_WAIT_MS / 1000, route_limits: Dict[str, int] = None,
+               route_wait: float = ADMISSION_ROUTE_WAIT_MS / 1000, degrade_routes: Dict[str, str] = None):
+    self.max_concurrent = max_concurrent
+    self.max_queue = max_queue
+    self.max_wait = max_wait
+    self.route_wait = route_wait
+    self.route_limits = route_limits if route_limits is not None else parse_route_limits(ADMISSION_ROUTE_LIMITS)
+    self.degrade_routes = degrade_routes if degrade_routes is not None else dict(DEGRADE_ROUTES)
+    self._route_slots = {route: threading.BoundedSemaphore(limit) for route, limit in self.route_limits.items()}
+    self._lock = threading.Lock()
+    self._queue: List = []
+    self._seq = itertools.count()
+    self._in_flight = 0
+    self._route_in_flight = {route: 0 for route in self.route_limits}
+    self._wait_times = deque(maxlen=1000)
+    self.counters = {"admitted": 0, "rejected": 0, "timed_out": 0, "degraded": 0}
+    self.max_queue_depth = 0
+
+  @contextmanager
+  def admit(self, priority: str = "normal") -> Iterator[None]:
+    self._acquire(PRIORITIES.get(priority, PRIORITIES["normal"]))
+    try:
+      yield
+    finally:
+      self._release()
+
+  def _acquire(self, rank: int):
+    started = time.monotonic()
+    with self._lock:
+      if self._in_flight < self.max_concurrent and not self._queue:
+        self._in_flight += 1
+        self.counters["admitted"] += 1
+        self._wait_times.append(0.0)
+        return
+      if len(self._queue) >= self.max_queue:
+        self.counters["rejected"] += 1
+        raise AdmissionRejected("Request queue is full", retry_after=self.max_wait)
+      waiter = _Waiter()
+      heapq.heappush(self._queue, (rank, next(self._seq), waiter))
+      self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+
+    waiter.event.wait(self.max_wait)
+    with self._lock:
+      if not waiter.granted:
+        waiter.cancelled = True
+        self.counters["timed_out"] += 1
+        raise AdmissionRejected("Timed out waiting for a free slot", retry_after=self.max_wait)
+      self._wait_times.append(time.monotonic() - started)
+
+  def _release(self):
+    with self._lock:
+      while self._queue:
+        _, _, waiter = heapq.heappop(self._queue)
+        if waiter.cancelled:
+          continue
+        # Hand the slot straight to the next waiter so _in_flight stays the same.
+        waiter.granted = True
+        self.counters["admitted"] += 1
+        waiter.event.set()
+        return
+      self._in_flight -= 1
+
+  @contextmanager
+  def route_slot(self, route: str) -> Iterator[str]:
+    """Yield the route the request may run on, degrading to a cheaper one under load."""
+    granted = self._acquire_route(route)
+    try:
+      yield granted
+    finally:
+      if granted in self._route_slots:
+        with self._lock:
+          self._route_in_flight[granted] -= 1
+        self._route_slots[granted].release()
+
+  def _acquire_route(self, route: str) -> str:
+    candidate = route
+    while candidate is not None:
+      slots = self._route_slots.get(candidate)
+      if slots is None:
+        return candidate
+      if slots.acquire(timeout=self.route_wait):
+        with self._lock:
+          self._route_in_flight[candidate] += 1
+          if candidate != route:
+            self.counters["degraded"] += 1
+        return candidate
+      candidate = self.degrade_routes.get(candidate)
+    with self._lock:
+      self.counters["rejected"] += 1
+    raise AdmissionRejected(f"Route '{route}' is overloaded", retry_after=self.route_wait)
+
+  def stats(self) -> Dict[str, object]:
+    with self._lock:
+      waits = list(self._wait_times)
+      queue_depth = sum(1 for _, _, waiter in self._queue if not waiter.cancelled)
+      return {
+        "in_flight": self._in_flight,
+        "queue_depth": queue_depth,
+        "max_queue_depth": self.max_queue_depth,
+        "route_in_flight": dict(self._route_in_flight),
+        "wait_p50_ms": percentile(waits, 50) * 1000,
+        "wait_p95_ms": percentile(waits, 95) * 1000,
+        **self.counters,
+      }
@@ -1,103 +1,234 @@
-from langgraph.graph import StateGraph, START, END
-from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import Any, Dict, List
 from abc import ABC, abstractmethod
-from langchain_core.prompts import ChatPromptTemplate
-from model import *
-from db_connection import *
+from db_connection import DatabaseConnect, get_vector_db
+from batching import MicroBatcher, ROUTER_BATCH_MAX_SIZE
+from admission import AdmissionController
+from deadline import DeadlineExceeded, call_with_deadline, deadline_after, has_budget, reserve
+from collections import OrderedDict
+from prompts import *
+from state import WorkflowState
+from keyword_router import KeywordRouter
+from batch_runner import run_batch
+from checkpointing import NodeMemo, get_checkpointer, invoke_resumable
+import traffic
+import os
+import uuid
+import json
+import re
+
+ROUTER_MEMO_TTL_S = float(os.getenv("ROUTER_MEMO_TTL_S", "86400"))
+WEB_MEMO_TTL_S = float(os.getenv("WEB_MEMO_TTL_S", "600"))
+# "off", "auto" (the router may send compound questions to the planner) or "always".
+PLANNER_MODE = os.getenv("PLANNER_MODE", "off").lower()
+PLANNER_MAX_SUBTASKS = int(os.getenv("PLANNER_MAX_SUBTASKS", "4"))
 
-@dataclass
-class WorkflowState:
-  user_message: str = ""
-  messages: List[Any] = None
-  current_state: str = ""
-  data: Dict[str, Any] = None
-  
 class BaseAgent:
+  prompt_prefix = SHARED_SYSTEM_PREFIX
+  llm_tier = "large"
+  
   def __init__(self, name):
+    from llm_gateway import get_llm
     self.name = name
     self.role = "BaseAgent"
-    self.llm = llm
-    self.vector_db = VectorDBConnect()
+    self.llm = get_llm(self.llm_tier)
+    
+  @property
+  def vector_db(self):
+    return get_vector_db()
+    
+  def build_chain(self, system: str, human: str):
+    """Compile a prompt | llm chain once, at construction, behind this agent's shared prefix."""
+    return build_prompt(system, human, self.prompt_prefix) | self.llm
   
   @abstractmethod
   def process(self,state: WorkflowState)->WorkflowState:
     pass
   
   def add_message(self, state: WorkflowState, msg: str):
-    msg = f"{self.name}: {msg}"
-    state.messages.append(msg)
+    state.add_message(f"{self.name}: {msg}")
+    
+  def degrade(self, state: WorkflowState, step: str, reason: str):
+    state.degraded.append(step)
+    self.add_message(state, f"Degraded {step}: {reason}")
 
 
 class RouterAgent(BaseAgent):
+  prompt_prefix = ROUTING_PLAN_PREFIX if PLANNER_MODE == "auto" else ROUTING_PREFIX
+  llm_tier = "fast"
+  
   def __init__(self, name):
     super().__init__(name)
     self.role = "Routing"
+    self.batcher = None
+    self.decisions = KeywordRouter({"web": ["web", "web search", "search"], "nl2sql": ["nl2sql", "sql"], "plan": ["plan"]}, default="general")
+    self.chain = self.build_chain(ROUTER_SYSTEM, ROUTER_HUMAN)
+    self.batch_chain = self.build_chain(ROUTER_BATCH_SYSTEM, ROUTER_BATCH_HUMAN)
     
-  def process(self, state: WorkflowState)->WorkflowState:
-    prompt = ChatPromptTemplate.from_messages([
-      ("system", """You are a helpful routing agent. Your job is to analyze the user's question and return only one of the following routing decisions based on its intent:
-      1. web - If the user is asking for current information, real-time data, or referencing a specific name (not a user name), location, or entity that may require web access.
-      2. nl2sql - If the user is asking to query a database, fetch structured data, or perform operations that require SQL or database access.
-      3. general - If the user is asking for a general explanation, definition, code sample, or if the question refers to past conversation context or user-specific details stored in memory.
-
-      Instructions:
-      - Return only one of the options: web, nl2sql, or general.
-      - Do not include any explanation or reasoning in your response.
-      - Base your decision only on the question provided.
-    """),
-      ("human","""
-      Query: {query}
-      
-      Please provide the appropriate result based on the user query.
-      """)
-    ])
+  def parse_decision(self, content: str)->str:
+    return self.decisions.classify(content)
     
-    chain = prompt | self.llm
+  def classify(self, query: str)->str:
+    response = self.chain.invoke({
+      "query" : query
+    })
+    return self.parse_decision(response.content)
+  
+  def classify_batch(self, queries: List[str])->List[str]:
+    """Classify several queries with one LLM call, falling back to one call per query."""
+    if len(queries) == 1:
+      return [self.classify(queries[0])]
     
-    response = chain.invoke({
-      "query" : state.user_message
+    response = self.batch_chain.invoke({
+      "queries" : "\n".join(f"{i+1}. {query}" for i, query in enumerate(queries))
     })
     
-    web = ['web', 'web search', 'search']
-    sql = ['nl2sql', 'sql']
+    try:
+      content = re.sub(r'```(json)?', '', response.content).strip()
+      decisions = json.loads(content)
+      if isinstance(decisions, list) and len(decisions) == len(queries):
+        return [self.parse_decision(str(decision)) for decision in decisions]
+    except ValueError:
+      pass
+    print(f"Batched routing returned an unexpected response, routing {len(queries)} queries individually")
+    return [self.classify(query) for query in queries]
+    
+  def process(self, state: WorkflowState)->WorkflowState:
+    classify = self.batcher.submit if self.batcher else self.classify
     decision = "general"
-    if any(web_token in response.content.lower() for web_token in web):
-      decision = "web"
-    elif any(sql_token in response.content.lower() for sql_token in sql):
-      decision = "nl2sql"
+    if state.route:
+      decision = state.route
+    elif not has_budget(state.deadline, "router"):
+      self.degrade(state, "router", "not enough time left, using general agent")
+    else:
+      try:
+        decision = traffic.external("route", state.user_message, lambda: call_with_deadline(state.deadline, classify, state.user_message, kind="router"))
+      except DeadlineExceeded as e:
+        self.degrade(state, "router", f"{e}, using general agent")
       
     state.current_state = decision
+    state.route = decision
     self.add_message(state, f"Router has decided to go to {decision} agent")
     return state
 
-class WebSearchAgent(BaseAgent):
+class PlannerAgent(BaseAgent):
+  llm_tier = "fast"
+  
+  def __init__(self, name, max_subtasks: int = PLANNER_MAX_SUBTASKS):
+    super().__init__(name)
+    self.role = "Planning"
+    self.max_subtasks = max_subtasks
+    self.routes = KeywordRouter({"web": ["web"], "nl2sql": ["nl2sql", "sql"]}, default="general")
+    self.chain = self.build_chain(PLANNER_SYSTEM, PLANNER_HUMAN)
+    
+  def plan(self, query: str)->List[Dict[str, Any]]:
+    response = self.chain.invoke({
+      "query" : query,
+      "max_subtasks" : self.max_subtasks
+    })
+    tasks = json.loads(re.sub(r'```(json)?', '', response.content).strip())
+    subtasks = []
+    for task in tasks if isinstance(tasks, list) else []:
+      if isinstance(task, dict) and task.get("question") and len(subtasks) < self.max_subtasks:
+        subtasks.append({"index": len(subtasks), "question": str(task["question"]), "route": self.routes.classify(str(task.get("route", "")))})
+    return subtasks
+    
+  def process(self, state: WorkflowState)->WorkflowState:
+    subtasks = []
+    if not has_budget(state.deadline, "router"):
+      self.degrade(state, "planner", "not enough time left, answering the query as a whole")
+    else:
+      try:
+        subtasks = call_with_deadline(state.deadline, self.plan, state.user_message, kind="llm")
+      except DeadlineExceeded as e:
+        self.degrade(state, "planner", f"{e}, answering the query as a whole")
+      except ValueError as e:
+        print(f"Planner returned an unexpected response: {e}")
+    state.subtasks = subtasks or [{"index": 0, "question": state.user_message, "route": "general"}]
+    self.add_message(state, f"Planner split the query into {len(state.subtasks)} sub-questions: "
+                     + "; ".join(f"{task['question']} ({task['route']})" for task in state.subtasks))
+    return state
+
+class SynthesisAgent(BaseAgent):
   def __init__(self, name):
+    super().__init__(name)
+    self.role = "Synthesis"
+    self.chain = self.build_chain(SYNTHESIS_SYSTEM, SYNTHESIS_HUMAN)
+    
+  def process(self, state: WorkflowState)->WorkflowState:
+    partials = "\n\n".join(f"{p['index'] + 1}. {p['question']} ({p['route']}): {p['answer'] or 'no answer'}" for p in state.partials)
+    for partial in state.partials:
+      state.degraded.extend(partial["degraded"])
+    if len(state.partials) == 1:
+      result = state.partials[0]["answer"]
+    elif not has_budget(state.deadline, "answer"):
+      self.degrade(state, "synthesis", "not enough time left, returning the partial answers")
+      result = partials
+    else:
+      try:
+        result = call_with_deadline(state.deadline, self.chain.invoke, {
+          "query" : state.user_message,
+          "partials" : partials
+        }, kind="llm").content
+      except DeadlineExceeded as e:
+        self.degrade(state, "synthesis", str(e))
+        result = partials
+    state.set_result(self.name, result)
+    state.current_state = "Response"
+    return state
+
+class WebSearchAgent(BaseAgent):
+  def __init__(self, name, cache_size: int = 128):
     super().__init__(name)
     self.role = "Web Search"
+    self.cache_size = cache_size
+    self.result_cache = OrderedDict()
+    self.chain = self.build_chain(WEB_SYSTEM, WEB_HUMAN)
+    
+  def cached_results(self, query: str):
+    if traffic.active():
+      return None
+    key = query.strip().lower()
+    if key in self.result_cache:
+      self.result_cache.move_to_end(key)
+      return self.result_cache[key]
+    return None
+  
+  def cache_results(self, query: str, web_result):
+    if traffic.active():
+      return
+    self.result_cache[query.strip().lower()] = web_result
+    self.result_cache.move_to_end(query.strip().lower())
+    while len(self.result_cache) > self.cache_size:
+      self.result_cache.popitem(last=False)
     
   def process(self, state: WorkflowState)->WorkflowState:
     from websearch import search
-    prompt = ChatPromptTemplate.from_messages([
-      ("system", """You are an helpful agent. Use the user's query and web search result to give appropriate result.
-      """),
-      ("human","""
-      Query: {query}
-      Web Result: {web_result}
-      
-      Please provide the appropriate result based on the user query and web search result.
-      """)
-    ])
-    
-    web_result = search.invoke(state.user_message)
-    chain = prompt | self.llm
-    response = chain.invoke({
-      "query" : state.user_message,
-      "web_result": web_result
-    })
+    web_result = self.cached_results(state.user_message)
+    search_deadline = reserve(state.deadline, "answer")
+    if web_result is not None and not has_budget(search_deadline, "search"):
+      self.degrade(state, "web_search", "not enough time left, answering from cached results")
+    elif web_result is None and not has_budget(search_deadline, "search"):
+      web_result = []
+      self.degrade(state, "web_search", "not enough time left, answering without web results")
+    else:
+      web_result = search.invoke(state.user_message, deadline=search_deadline, degraded=state.degraded)
+      if web_result:
+        self.cache_results(state.user_message, web_result)
+      elif self.cached_results(state.user_message):
+        web_result = self.cached_results(state.user_message)
+        self.degrade(state, "web_search", "search returned nothing in time, answering from cached results")
+        
+    try:
+      response = call_with_deadline(state.deadline, self.chain.invoke, {
+        "query" : state.user_message,
+        "web_result": web_result
+      }, kind="llm")
+      result = response.content
+    except DeadlineExceeded as e:
+      self.degrade(state, "web_answer", str(e))
+      result = "\n".join(f"- {r.get('title', '')}: {r.get('snippet', '')} ({r.get('link', '')})" for r in web_result[:5]) or "Sorry, the web search did not finish in time."
 
-    state.data['result'] = response.content
-    self.add_message(state, response.content)
+    state.set_result(self.name, result)
     state.current_state = "Response"
     return state
 
@@ -105,14 +236,24 @@ class NL2SQLAgent(BaseAgent):
   def __init__(self, name):
     super().__init__(name)
     self.role = "Natural Language Querying"
+    self._chain = None
+    
+  @property
+  def chain(self):
+    # Built on first use so the API can start while the database is unreachable.
+    if self._chain is None:
+      from nl2sql import SQLChain
+      from llm_gateway import get_llm
+      self._chain = SQLChain(DatabaseConnect(), self.llm, sql_llm=get_llm("fast"))
+    return self._chain
     
   def process(self, state: WorkflowState)->WorkflowState:
-    from nl2sql import SQLChain
-    db = DatabaseConnect()
-    chain = SQLChain(db, llm)
-    response = chain.invoke({"question":state.user_message})
-    state.data['result'] = response
-    self.add_message(state, response)
+    try:
+      response = call_with_deadline(state.deadline, self.chain.invoke, {"question":state.user_message}, kind="nl2sql")
+    except DeadlineExceeded as e:
+      self.degrade(state, "nl2sql", str(e))
+      response = "Sorry, the database query did not finish in time."
+    state.set_result(self.name, response)
     state.current_state = "Response"
     return state
   
@@ -120,28 +261,28 @@ class General(BaseAgent):
     def __init__(self, name):
       super().__init__(name)
       self.role = "General Agent"
+      self.chain = self.build_chain(GENERAL_SYSTEM, GENERAL_HUMAN)
       
     def process(self, state: WorkflowState)->WorkflowState:
-      recall_memory = self.vector_db.get_similar_content(state.user_message)
-      prompt = ChatPromptTemplate.from_messages([
-          ("system", """You are an helpful assistant providing response to user's query.
-          Provide only the data that you have or from the context provided, do not hallucinate and generate fake data.
-          """),
-          ("human","""
-          Query: {query}
-          Conversation history: {context}
-          Please provide the appropriate result based on the user query and conversation history. If conversation history does not meet with the user query, respond to the query with your knowledge or greet the user ignoring the conversation history.
-          """)
-        ])
-      
-      chain = prompt | self.llm
-      
-      response = chain.invoke({
-          "query" : state.user_message,
-          "context" : recall_memory
-        })
-      state.data['result'] = response.content
-      self.add_message(state, response.content)
+      recall_memory = []
+      recall_deadline = reserve(state.deadline, "answer")
+      if not has_budget(recall_deadline, "memory_recall"):
+        self.degrade(state, "memory_recall", "not enough time left, answering without conversation history")
+      else:
+        try:
+          recall_memory = call_with_deadline(recall_deadline, self.vector_db.get_similar_content, state.user_message, kind="memory")
+        except DeadlineExceeded as e:
+          self.degrade(state, "memory_recall", str(e))
+      try:
+        response = call_with_deadline(state.deadline, self.chain.invoke, {
+            "query" : state.user_message,
+            "context" : recall_memory
+          }, kind="llm")
+        result = response.content
+      except DeadlineExceeded as e:
+        self.degrade(state, "general_answer", str(e))
+        result = "Sorry, I could not answer in time. Please try again."
+      state.set_result(self.name, result)
       state.current_state = "Response"
       return state
       
@@ -152,26 +293,44 @@ class RespondAgent(BaseAgent):
     
   def process(self, state: WorkflowState)->WorkflowState:
     state.current_state = "End"
-    self.vector_db.add_document("Query: "+state.user_message+"\nResult: "+state.data['result'])
+    if not has_budget(state.deadline, "memory_write"):
+      self.degrade(state, "memory_write", "skipped storing the response")
+      return state
+    try:
+      call_with_deadline(state.deadline, self.vector_db.add_document, "Query: "+state.user_message+"\nResult: "+state.result, kind="memory")
+    except DeadlineExceeded as e:
+      self.degrade(state, "memory_write", str(e))
     return state
 
 class WorkflowManager():
   def __init__(self):
     self.router = RouterAgent("RouterAgent")
+    if ROUTER_BATCH_MAX_SIZE > 1:
+      self.router.batcher = MicroBatcher(self.router.classify_batch)
     self.web_search = WebSearchAgent("WebSearchAgent")
     self.nl2sql = NL2SQLAgent("NL2SQLAgent")
     self.respond = RespondAgent("RespondAgent")
     self.general = General("GeneralAgent")
+    self.planner = PlannerAgent("PlannerAgent")
+    self.synthesizer = SynthesisAgent("SynthesisAgent")
+    self.admission = AdmissionController()
+    # Captured and replayed requests skip the memo, so they make every external call.
+    self.memo = NodeMemo(bypass=traffic.active)
     
     self.workflow = self._build_workflow()
     
-  def _build_workflow(self)->StateGraph:
+  def _build_workflow(self):
+    from langgraph.graph import StateGraph, START, END
     workflow = StateGraph(WorkflowState)
-    workflow.add_node("router", self._router_node)
-    workflow.add_node("web", self._websearch_node)
+    # Routing decisions and web answers are memoized by query; everything is checkpointed per request.
+    workflow.add_node("router", self.memo.wrap("router", self._router_node, ("user_message", "route"), ("current_state", "route"), ROUTER_MEMO_TTL_S))
+    workflow.add_node("web", self.memo.wrap("web", self._websearch_node, ("user_message",), ("result", "current_state"), WEB_MEMO_TTL_S))
     workflow.add_node("nl2sql", self._nl2sql_node)
     workflow.add_node("general", self._general_node)
     workflow.add_node("respond", self._respond_node)
+    workflow.add_node("plan", self._plan_node)
+    workflow.add_node("subtask", self._subtask_node)
+    workflow.add_node("synthesize", self._synthesize_node)
     
     workflow.add_edge(START, "router")
     workflow.add_conditional_edges(
@@ -182,34 +341,80 @@ class WorkflowManager():
     workflow.add_edge("web", "respond")
     workflow.add_edge("nl2sql", "respond")
     workflow.add_edge("general", "respond")
+    # Planner mode: one branch per sub-question, run in parallel, joined by synthesis.
+    workflow.add_conditional_edges("plan", self._fan_out, ["subtask"])
+    workflow.add_edge("subtask", "synthesize")
+    workflow.add_edge("synthesize", "respond")
     workflow.add_edge("respond", END)
     
-    return workflow.compile()
+    return workflow.compile(checkpointer=get_checkpointer())
   
     
   def _router_node(self, state: WorkflowState)->WorkflowState:
     return self.router.process(state)
   
+  def _route_agent(self, route: str)->BaseAgent:
+    return {"web": self.web_search, "nl2sql": self.nl2sql, "general": self.general}[route]
+  
+  def _admitted_process(self, route: str, state: WorkflowState)->WorkflowState:
+    with self.admission.route_slot(route) as granted:
+      if granted != route:
+        self.router.degrade(state, f"{route}_admission", f"{route} agent is overloaded, degraded to {granted} agent")
+      return self._route_agent(granted).process(state)
+  
   def _nl2sql_node(self, state: WorkflowState)->WorkflowState:
-    return self.nl2sql.process(state)
+    return self._admitted_process("nl2sql", state)
   
   def _websearch_node(self, state: WorkflowState)->WorkflowState:
-    return self.web_search.process(state)
+    return self._admitted_process("web", state)
   
   def _respond_node(self, state: WorkflowState)->WorkflowState:
     return self.respond.process(state)
   
   def _general_node(self, state: WorkflowState)->WorkflowState:
-    return self.general.process(state)
+    return self._admitted_process("general", state)
   
-  def run(self, query: str)->WorkflowState:
+  def _plan_node(self, state: WorkflowState)->WorkflowState:
+    return self.planner.process(state)
+  
+  def _fan_out(self, state: WorkflowState):
+    from langgraph.types import Send
+    # Leave the synthesis call its budget.
+    deadline = reserve(state.deadline, "answer")
+    return [Send("subtask", dict(task, deadline=deadline)) for task in state.subtasks]
+  
+  def _subtask_node(self, task: Dict[str, Any])->Dict[str, Any]:
+    sub_state = WorkflowState(user_message=task["question"], route=task["route"], deadline=task["deadline"])
+    try:
+      sub_state = self._admitted_process(task["route"], sub_state)
+    except Exception as e:
+      print(f"Sub-question '{task['question']}' failed: {e}")
+      sub_state.result = ""
+      sub_state.degraded.append(f"subtask_{task['index']}")
+    return {"partials": [{"index": task["index"], "question": task["question"], "route": task["route"],
+                          "answer": sub_state.result, "degraded": sub_state.degraded}]}
+  
+  def _synthesize_node(self, state: WorkflowState)->WorkflowState:
+    return self.synthesizer.process(state)
+  
+  def run(self, query: str, priority: str = "normal", timeout: float = None, route: str = "", request_id: str = None)->WorkflowState:
     print("Multi-agent System started processing this query", query)
     
     initial_state = WorkflowState(
       user_message=query,
-      messages=[],
       current_state="Start(Orchestration)",
-      data={}
+      route=route or ("plan" if PLANNER_MODE == "always" else ""),
+      deadline=deadline_after(timeout) if timeout else deadline_after()
     )
-    result = self.workflow.invoke(initial_state)
-    return result
\ No newline at end of file
+    with self.admission.admit(priority):
+      # Retrying with the same request_id resumes after the last completed node.
+      result = invoke_resumable(self.workflow, initial_state, request_id or uuid.uuid4().hex, {"deadline": initial_state.deadline})
+    return result
+  
+  def run_batch(self, input_path: str, output_path: str, **kwargs):
+    """Run a JSONL file of queries, routing them up front so each route's requests run together."""
+    classify = self.router.batcher.submit if self.router.batcher else self.router.classify
+    return run_batch(
+      lambda query, route: self.run(query, priority="low", route=route),
+      input_path, output_path, route=classify, **kwargs
+    )
\ No newline at end of file
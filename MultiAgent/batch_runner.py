@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+# The toy workflows import this module as MultiAgent.batch_runner.
+if __package__:
+  from .metrics import percentile
+else:
+  from metrics import percentile
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "256"))
+
+RunFn = Callable[[str, str], Mapping[str, Any]]
+RouteFn = Callable[[str], str]
+
+
+def read_queries(path: str, offset: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+  """Yield (line index, record) from a JSONL file, starting at line `offset`.
+
+  A line may be a JSON object with a "query" field (other fields such as "id"
+  are carried through) or a bare JSON string.
+  """
+  with open(path) as f:
+    for index, line in enumerate(islice(f, offset, None), start=offset):
+      line = line.strip()
+      if not line:
+        continue
+      record = json.loads(line)
+      if isinstance(record, str):
+        record = {"query": record}
+      yield index, record
+
+
+def completed_indices(path: str) -> set:
+  """Input line indices already written to an output file, for --resume."""
+  if not os.path.exists(path):
+    return set()
+  done = set()
+  with open(path) as f:
+    for line in f:
+      try:
+        record = json.loads(line)
+      except ValueError:
+        continue  # A line cut short by a crash.
+      if "error" not in record:
+        done.add(record["index"])
+  return done
+
+
+def run_batch(run: RunFn, input_path: str, output_path: str, route: Optional[RouteFn] = None,
+              concurrency: int = BATCH_CONCURRENCY, offset: int = 0, resume: bool = False,
+              chunk_size: int = BATCH_CHUNK_SIZE) -> Dict[str, Any]:
+  """Run every query in a JSONL file through a workflow and stream results to JSONL.
+
+  Queries are read `chunk_size` at a time. When `route` is given, each chunk is
+  classified first and then run route by route, so consecutive requests hit the
+  same backend. `run(query, route)` must return the final workflow state. Results
+  are appended as they finish; `offset` skips input lines and `resume` skips the
+  lines that already have a successful result in `output_path`.
+  """
+  skip = completed_indices(output_path) if resume else set()
+  write_lock = threading.Lock()
+  latencies: List[float] = []
+  routes = Counter()
+  counts = Counter()
+  started = time.perf_counter()
+
+  def classify(query: str) -> str:
+    try:
+      return route(query)
+    except Exception as e:
+      # Leave it to the workflow's own router.
+      print(f"Routing failed for query '{query}': {e}")
+      return ""
+
+  def execute(index: int, record: Dict[str, Any], route_name: str) -> Dict[str, Any]:
+    query_started = time.perf_counter()
+    output = {"index": index, "id": record.get("id"), "query": record["query"], "route": route_name}
+    try:
+      state = run(record["query"], route_name)
+      output["result"] = state.get("final_response") or state.get("result")
+      if state.get("degraded"):
+        output["degraded"] = state["degraded"]
+    except Exception as e:
+      output["error"] = f"{type(e).__name__}: {e}"
+    output["elapsed_ms"] = round((time.perf_counter() - query_started) * 1000, 1)
+    return output
+
+  mode = "a" if offset or resume else "w"
+  with open(output_path, mode) as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+    queries = ((index, record) for index, record in read_queries(input_path, offset) if index not in skip)
+    while True:
+      chunk = list(islice(queries, chunk_size))
+      if not chunk:
+        break
+      decisions = list(pool.map(lambda item: classify(item[1]["query"]), chunk)) if route else [""] * len(chunk)
+
+      groups: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+      for item, decision in zip(chunk, decisions):
+        groups.setdefault(decision, []).append(item)
+      futures = [pool.submit(execute, index, record, decision)
+                 for decision, items in groups.items() for index, record in items]
+
+      for future in as_completed(futures):
+        output = future.result()
+        with write_lock:
+          out.write(json.dumps(output) + "\n")
+          out.flush()
+        counts["failed" if "error" in output else "succeeded"] += 1
+        routes[output["route"] or "unrouted"] += 1
+        latencies.append(output["elapsed_ms"])
+
+  elapsed = time.perf_counter() - started
+  processed = counts["succeeded"] + counts["failed"]
+  summary = {
+    "processed": processed,
+    "succeeded": counts["succeeded"],
+    "failed": counts["failed"],
+    "skipped": len(skip),
+    "elapsed_s": round(elapsed, 2),
+    "queries_per_s": round(processed / elapsed, 2) if elapsed else 0.0,
+    "latency_p50_ms": percentile(latencies, 50),
+    "latency_p95_ms": percentile(latencies, 95),
+    "routes": dict(routes),
+  }
+  print(f"Batch finished: {json.dumps(summary)}")
+  return summary
+
+
+MULTIAGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(MULTIAGENT_DIR)
+
+WORKFLOWS = {
+  "multiagent": ("agents", MULTIAGENT_DIR),
+  "customer_support": ("customer_support", REPO_DIR),
+  "loop_customer_support": ("simple_loop_customer_support", REPO_DIR),
+  "simple": ("simple_multiagent_workflow", REPO_DIR),
+}
+
+
+def load_manager(workflow: str):
+  import importlib
+  module_name, directory = WORKFLOWS[workflow]
+  if directory not in sys.path:
+    sys.path.insert(0, directory)
+  return importlib.import_module(module_name).WorkflowManager()
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Run a JSONL file of queries through a workflow")
+  parser.add_argument("input", help="JSONL file of {\"query\": ...} records or bare strings")
+  parser.add_argument("output", help="JSONL file results are appended to as they finish")
+  parser.add_argument("--workflow", choices=sorted(WORKFLOWS), default="multiagent")
+  parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+  parser.add_argument("--offset", type=int, default=0, help="input line to start from")
+  parser.add_argument("--resume", action="store_true", help="skip lines already completed in the output file")
+  args = parser.parse_args()
+
+  manager = load_manager(args.workflow)
+  manager.run_batch(args.input, args.output, concurrency=args.concurrency, offset=args.offset, resume=args.resume)
+
+
+if __name__ == "__main__":
+  main()
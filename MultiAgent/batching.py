@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+ROUTER_BATCH_MAX_SIZE = int(os.getenv("ROUTER_BATCH_MAX_SIZE", "8"))
+ROUTER_BATCH_MAX_WAIT_MS = float(os.getenv("ROUTER_BATCH_MAX_WAIT_MS", "15"))
+ROUTER_BATCH_MAX_CONCURRENCY = int(os.getenv("ROUTER_BATCH_MAX_CONCURRENCY", "8"))
+
+
+class MicroBatcher:
+  """Groups calls arriving within `max_wait` seconds into a single `batch_fn` call.
+
+  `batch_fn` receives a list of items and must return a list of results in the
+  same order. Callers block in `submit` until their batch has been processed.
+  Up to `max_concurrency` batches are in flight at once.
+  """
+  def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = ROUTER_BATCH_MAX_SIZE, max_wait: float = ROUTER_BATCH_MAX_WAIT_MS / 1000, max_concurrency: int = ROUTER_BATCH_MAX_CONCURRENCY):
+    self.batch_fn = batch_fn
+    self.max_batch_size = max(1, max_batch_size)
+    self.max_wait = max(0.0, max_wait)
+    self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="MicroBatch")
+    self._pending: List[Tuple[Any, Future]] = []
+    self._cond = threading.Condition()
+    self._worker = None
+    self.batches = 0
+    self.items = 0
+
+  def _ensure_worker(self):
+    if self._worker is None or not self._worker.is_alive():
+      self._worker = threading.Thread(target=self._loop, name="MicroBatcher", daemon=True)
+      self._worker.start()
+
+  def submit(self, item: Any) -> Any:
+    future = Future()
+    with self._cond:
+      self._ensure_worker()
+      self._pending.append((item, future))
+      self._cond.notify()
+    return future.result()
+
+  def _next_batch(self) -> List[Tuple[Any, Future]]:
+    with self._cond:
+      while not self._pending:
+        self._cond.wait()
+      flush_at = time.monotonic() + self.max_wait
+      while len(self._pending) < self.max_batch_size:
+        remaining = flush_at - time.monotonic()
+        if remaining <= 0:
+          break
+        self._cond.wait(remaining)
+      batch = self._pending[:self.max_batch_size]
+      del self._pending[:self.max_batch_size]
+      return batch
+
+  def _loop(self):
+    while True:
+      batch = self._next_batch()
+      self.batches += 1
+      self.items += len(batch)
+      self._executor.submit(self._run_batch, batch)
+
+  def _run_batch(self, batch: List[Tuple[Any, Future]]):
+    items = [item for item, _ in batch]
+    try:
+      results = self.batch_fn(items)
+      if len(results) != len(items):
+        raise ValueError(f"Batch function returned {len(results)} results for {len(items)} items")
+    except Exception as e:
+      for _, future in batch:
+        future.set_exception(e)
+      return
+    for (_, future), result in zip(batch, results):
+      future.set_result(result)
+
+  def stats(self) -> Dict[str, float]:
+    return {
+      "batches": self.batches,
+      "items": self.items,
+      "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+    }
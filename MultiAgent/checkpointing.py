@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", os.path.join(_HERE, "checkpoints.sqlite"))
+NODE_MEMO_DB = os.getenv("NODE_MEMO_DB", os.path.join(_HERE, "node_memo.sqlite"))
+NODE_MEMO_TTL_S = float(os.getenv("NODE_MEMO_TTL_S", "600"))
+# Requests stay resumable (and a finished one returns its stored result) for this long.
+CHECKPOINT_TTL_S = float(os.getenv("CHECKPOINT_TTL_S", "3600"))
+CHECKPOINT_PRUNE_INTERVAL_S = float(os.getenv("CHECKPOINT_PRUNE_INTERVAL_S", "60"))
+
+_checkpointers: Dict[str, Any] = {}
+_thread_logs: Dict[int, "ThreadLog"] = {}
+_lock = threading.Lock()
+
+
+class RequestConflict(Exception):
+  """Raised when a request ID is reused for a different request; the API maps it to a 409."""
+
+
+def request_hash(state) -> str:
+  """What a request asked for, so a reused request ID cannot return another request's result."""
+  payload = json.dumps([state.user_message, getattr(state, "route", "")])
+  return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ThreadLog:
+  """When each checkpointed request started and what it asked, so expired ones
+  can be deleted and a reused request ID checked against the original request.
+
+  Kept in a table next to the checkpoints for the SQLite saver, so threads
+  left by earlier processes are pruned too, and in memory otherwise.
+  """
+  def __init__(self, saver, path: str = ":memory:", ttl: float = CHECKPOINT_TTL_S):
+    self.saver = saver
+    self.ttl = ttl
+    self.conn = sqlite3.connect(path, check_same_thread=False)
+    self.conn.execute("CREATE TABLE IF NOT EXISTS checkpoint_threads (thread_id TEXT PRIMARY KEY, started_at REAL NOT NULL, request_hash TEXT)")
+    columns = [row[1] for row in self.conn.execute("PRAGMA table_info(checkpoint_threads)")]
+    if "request_hash" not in columns:
+      self.conn.execute("ALTER TABLE checkpoint_threads ADD COLUMN request_hash TEXT")
+    self.conn.commit()
+    self._lock = threading.Lock()
+    self._last_prune = 0.0
+
+  def started(self, thread_id: str, digest: str):
+    with self._lock:
+      self.conn.execute("INSERT OR IGNORE INTO checkpoint_threads VALUES (?, ?, ?)", (thread_id, time.time(), digest))
+      self.conn.commit()
+
+  def request_hash(self, thread_id: str) -> Optional[str]:
+    with self._lock:
+      row = self.conn.execute("SELECT request_hash FROM checkpoint_threads WHERE thread_id = ?", (thread_id,)).fetchone()
+    return row[0] if row else None
+
+  def prune(self, force: bool = False) -> int:
+    """Delete the checkpoints of requests older than the TTL, at most once per interval."""
+    now = time.time()
+    with self._lock:
+      if not force and now - self._last_prune < CHECKPOINT_PRUNE_INTERVAL_S:
+        return 0
+      self._last_prune = now
+      expired = [row[0] for row in self.conn.execute(
+        "SELECT thread_id FROM checkpoint_threads WHERE started_at < ?", (now - self.ttl,))]
+    for thread_id in expired:
+      self.saver.delete_thread(thread_id)
+    with self._lock:
+      self.conn.executemany("DELETE FROM checkpoint_threads WHERE thread_id = ?", [(thread_id,) for thread_id in expired])
+      self.conn.commit()
+    return len(expired)
+
+
+def get_checkpointer(path: str = CHECKPOINT_DB):
+  """Shared SQLite checkpointer for `path`, or an in-memory one without langgraph-checkpoint-sqlite."""
+  with _lock:
+    if path not in _checkpointers:
+      try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+        conn = sqlite3.connect(path, check_same_thread=False)
+        saver = _checkpointers[path] = SqliteSaver(conn)
+        _thread_logs[id(saver)] = ThreadLog(saver, path)
+      except ImportError:
+        from langgraph.checkpoint.memory import InMemorySaver
+        print("langgraph-checkpoint-sqlite is not installed, checkpoints are kept in memory")
+        saver = _checkpointers[path] = InMemorySaver()
+        _thread_logs[id(saver)] = ThreadLog(saver)
+    return _checkpointers[path]
+
+
+def run_config(request_id: str) -> Dict[str, Any]:
+  return {"configurable": {"thread_id": request_id}}
+
+
+def invoke_resumable(workflow, initial_state, request_id: str, updates: Optional[Dict[str, Any]] = None):
+  """Invoke a checkpointed graph, resuming a previous attempt with the same request ID.
+
+  A finished request returns its stored final state without re-running anything.
+  A request that failed part way resumes from the last completed node, after
+  applying `updates` (e.g. a fresh deadline) to the stored state. Reusing a
+  request ID for a different question or route raises RequestConflict. Requests
+  older than CHECKPOINT_TTL_S are deleted as new ones come in.
+  """
+  config = run_config(request_id)
+  threads = _thread_logs.get(id(workflow.checkpointer))
+  if threads is not None:
+    threads.prune()
+  digest = request_hash(initial_state)
+  snapshot = workflow.get_state(config)
+  if not snapshot.values:
+    if threads is not None:
+      threads.started(request_id, digest)
+    return workflow.invoke(initial_state, config)
+  stored = threads.request_hash(request_id) if threads is not None else None
+  if stored != digest and (stored is not None or snapshot.values.get("user_message") != initial_state.user_message):
+    raise RequestConflict(f"Request ID {request_id} was already used for a different request")
+  if not snapshot.next:
+    print(f"Request {request_id} already completed, returning the stored result")
+    return snapshot.values
+  print(f"Resuming request {request_id} at {', '.join(snapshot.next)}")
+  if updates:
+    workflow.update_state(config, updates)
+  return workflow.invoke(None, config)
+
+
+class NodeMemo:
+  """SQLite-backed memo of node outputs keyed by a hash of the node's inputs.
+
+  Only the listed output fields are stored and restored, never request-scoped
+  fields like the deadline or message log, and outputs produced while the
+  request was degraded are not stored. While `bypass()` is true the memo is
+  neither read nor written.
+  """
+  def __init__(self, path: str = NODE_MEMO_DB, bypass: Callable[[], bool] = lambda: False):
+    self.bypass = bypass
+    self.conn = sqlite3.connect(path, check_same_thread=False)
+    self.conn.execute("CREATE TABLE IF NOT EXISTS node_memo (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)")
+    self.conn.commit()
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def key(self, node: str, state, inputs: Sequence[str]) -> str:
+    payload = json.dumps([node] + [getattr(state, field) for field in inputs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+  def get(self, key: str, ttl: float) -> Optional[Dict[str, Any]]:
+    with self._lock:
+      row = self.conn.execute("SELECT value, created_at FROM node_memo WHERE key = ?", (key,)).fetchone()
+    if row is None or time.time() - row[1] > ttl:
+      return None
+    return json.loads(row[0])
+
+  def put(self, key: str, value: Dict[str, Any]):
+    with self._lock:
+      self.conn.execute("INSERT OR REPLACE INTO node_memo VALUES (?, ?, ?)", (key, json.dumps(value), time.time()))
+      self.conn.commit()
+
+  def wrap(self, node: str, fn: Callable, inputs: Sequence[str], outputs: Sequence[str], ttl: float = NODE_MEMO_TTL_S) -> Callable:
+    """Node function that reuses `fn`'s outputs for inputs it has already seen."""
+    def memoized(state):
+      if self.bypass():
+        return fn(state)
+      key = self.key(node, state, inputs)
+      cached = self.get(key, ttl)
+      if cached is not None:
+        self.hits += 1
+        for field, value in cached.items():
+          setattr(state, field, value)
+        state.add_message(f"{node}: reused memoized output")
+        return state
+      self.misses += 1
+      degraded = len(state.degraded)
+      state = fn(state)
+      if len(state.degraded) == degraded:
+        self.put(key, {field: getattr(state, field) for field in outputs})
+      return state
+    return memoized
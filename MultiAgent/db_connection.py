@@ -1,10 +1,11 @@
-from langchain_community.utilities import SQLDatabase
 from dotenv import load_dotenv
-from langchain_chroma import Chroma
+from functools import lru_cache
+from typing import List
+import hashlib
+import math
 import os
-from model import embedding
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+import time
+import traffic
 
 
 load_dotenv()
@@ -17,15 +18,36 @@ MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "Chinook")
 
 mysql_uri = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
 
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+CHROMA_DIR = os.getenv("CHROMA_DIR", "./chroma_db")
+COLLECTION_NAME = "MultiAgent"
+# Chroma distance under which a new memory counts as a repeat of a stored one.
+MEMORY_DEDUP_MAX_DISTANCE = float(os.getenv("MEMORY_DEDUP_MAX_DISTANCE", "0.05"))
+# `source` of answers stored by RespondAgent, the only entries that expire;
+# ingested documents carry their file or JSONL line as source instead.
+CONVERSATION_SOURCE = "conversation"
+
+def content_id(text: str) -> str:
+  """Chunk ID derived from its content, so storing the same chunk twice is a no-op."""
+  return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 class DatabaseConnect:
   def __init__(self, uri=mysql_uri):
+    from langchain_community.utilities import SQLDatabase
+    from sql_cache import SQL_CACHE_ENABLED, SQLResultCache
+    if traffic.REPLAYING:
+      # Schema and query results come from the traffic log, no database needed.
+      uri = "sqlite://"
     self.db = SQLDatabase.from_uri(uri)
+    self.cache = SQLResultCache(self.db._engine) if SQL_CACHE_ENABLED else None
         
   def get_db(self):
     return self.db
   
   def get_schema(self):
-    return self.db.get_table_info()
+    return traffic.external("sql_schema", "schema", self.db.get_table_info)
 
   def get_table_names(self):
     return self.db.get_table_names()
@@ -37,30 +59,104 @@ class DatabaseConnect:
     return self.db.execute_query(query)
       
   def run_query(self, query: str):
-    return self.db.run(query)
+    return traffic.external("sql", traffic.call_key(query), lambda: self._run_query(query))
+  
+  def _run_query(self, query: str):
+    if self.cache is None or traffic.active():
+      return self.db.run(query)
+    return self.cache.get_or_run(query, self.db.run)
   
 class VectorDBConnect:
-  def __init__(self):
+  def __init__(self, persist_directory: str = CHROMA_DIR):
+    from langchain_chroma import Chroma
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from model import embedding
     self.vector_store = Chroma(
-      collection_name="MultiAgent",
+      collection_name=COLLECTION_NAME,
       embedding_function=embedding,
-      persist_directory="./chroma_db"
+      persist_directory=persist_directory
     )
-    
-  def text_split(self, data: str):
-    text_splitter = RecursiveCharacterTextSplitter(
-      chunk_size = 1000,
-      chunk_overlap = 200,
+    self.text_splitter = RecursiveCharacterTextSplitter(
+      chunk_size = CHUNK_SIZE,
+      chunk_overlap = CHUNK_OVERLAP,
       add_start_index = True,
     )
-    doc = [Document(page_content=data)]
-    return text_splitter.split_documents(doc)
+    
+  def text_split(self, data: str, metadata: dict = None):
+    from langchain_core.documents import Document
+    doc = [Document(page_content=data, metadata=metadata or {})]
+    return self.text_splitter.split_documents(doc)
   
   def add_document(self, data: str):
-    doc = self.text_split(data)
-    self.vector_store.add_documents(documents=doc)
+    doc = self.text_split(data, {"source": CONVERSATION_SOURCE})
+    traffic.external("memory_write", traffic.call_key(data), lambda: self.add_new(doc), encode=lambda ids: None)
+    
+  def add_new(self, docs) -> List[str]:
+    """Store the chunks as the newest memories and return the IDs stored.
+
+    A chunk whose content hash is already stored only refreshes that entry's
+    `last_seen_at`. Stored entries within MEMORY_DEDUP_MAX_DISTANCE of a new
+    chunk are replaced by it, so recall serves the latest answer, the copy
+    memory_maintenance keeps too. A chunk that repeats an earlier chunk of the
+    same call is dropped. New chunks are embedded once, for the checks and the insert.
+    """
+    collection = self.vector_store._collection
+    now = time.time()
+    by_id = {content_id(doc.page_content): doc for doc in docs}
+    seen = collection.get(ids=list(by_id), include=[])["ids"]
+    fresh = [(chunk_id, doc) for chunk_id, doc in by_id.items() if chunk_id not in seen]
+    new, replaced = [], set()
+    if fresh:
+      space = (collection.metadata or {}).get("hnsw:space", "l2")
+      embeddings = self.vector_store.embeddings.embed_documents([doc.page_content for _, doc in fresh])
+      stored = collection.count()
+      for (chunk_id, doc), embedding in zip(fresh, embeddings):
+        if any(_distance(embedding, other, space) <= MEMORY_DEDUP_MAX_DISTANCE for _, _, other in new):
+          continue
+        close = []
+        if stored:
+          nearest = collection.query(query_embeddings=[embedding], n_results=min(5, stored), include=["distances"])
+          close = [entry_id for entry_id, distance in zip(nearest["ids"][0], nearest["distances"][0])
+                   if distance <= MEMORY_DEDUP_MAX_DISTANCE]
+        if any(entry_id in seen for entry_id in close):
+          continue  # Repeats a chunk of this call that is already stored.
+        replaced.update(close)
+        new.append((chunk_id, doc, embedding))
+    if replaced:
+      collection.delete(ids=list(replaced))
+    if new:
+      collection.upsert(
+        ids=[chunk_id for chunk_id, _, _ in new],
+        embeddings=[embedding for _, _, embedding in new],
+        documents=[doc.page_content for _, doc, _ in new],
+        metadatas=[dict(doc.metadata, created_at=now, last_seen_at=now) for _, doc, _ in new],
+      )
+    if seen:
+      collection.update(ids=seen, metadatas=[{"last_seen_at": now} for _ in seen])
+    return [chunk_id for chunk_id, _, _ in new]
     
   def get_similar_content(self, query: str):
-    return self.vector_store.similarity_search(query=query, k=5)
-  
-  
\ No newline at end of file
+    return traffic.external(
+      "memory_recall", traffic.call_key(query), lambda: self.vector_store.similarity_search(query=query, k=5),
+      encode=lambda docs: [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs],
+      decode=_documents,
+    )
+
+def _distance(a, b, space: str) -> float:
+  """Distance between two embeddings as Chroma reports it for the collection's `space`."""
+  dot = sum(x * y for x, y in zip(a, b))
+  if space == "cosine":
+    norm = math.sqrt(sum(x * x for x in a) * sum(y * y for y in b))
+    return 1.0 - dot / norm if norm else 1.0
+  if space == "ip":
+    return 1.0 - dot
+  return sum((x - y) ** 2 for x, y in zip(a, b))
+
+def _documents(records):
+  from langchain_core.documents import Document
+  return [Document(**record) for record in records]
+
+@lru_cache(maxsize=None)
+def get_vector_db()->VectorDBConnect:
+  """One Chroma client per process, shared by every agent."""
+  return VectorDBConnect()
@@ -0,0 +1,93 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict
+
+REQUEST_DEADLINE_S = float(os.getenv("REQUEST_DEADLINE_S", "20"))
+
+# Minimum remaining budget (seconds) worth starting each optional step with.
+MIN_BUDGET_S = {
+  "router": float(os.getenv("MIN_BUDGET_ROUTER_S", "1.0")),
+  "search": float(os.getenv("MIN_BUDGET_SEARCH_S", "3.0")),
+  "search_variant": float(os.getenv("MIN_BUDGET_SEARCH_VARIANT_S", "4.0")),
+  "deep_read": float(os.getenv("MIN_BUDGET_DEEP_READ_S", "6.0")),
+  "memory_recall": float(os.getenv("MIN_BUDGET_MEMORY_RECALL_S", "2.0")),
+  "memory_write": float(os.getenv("MIN_BUDGET_MEMORY_WRITE_S", "0.5")),
+  "answer": float(os.getenv("MIN_BUDGET_ANSWER_S", "3.0")),
+}
+
+# Threads per kind of call ("router", "llm", "search", "memory", ...). Calls that
+# time out keep running, so each kind has its own pool: hung router batches or a
+# hung search backend can fill their own pool but not delay answer LLM calls.
+DEADLINE_POOL_SIZE = int(os.getenv("DEADLINE_POOL_SIZE", "32"))
+
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+# Applied to every function run on the pool. This module is also imported as
+# MultiAgent.deadline by the toy workflows, so it takes no local imports;
+# profiling.install sets this to attribute pool work to the calling request.
+_wrap_task: Callable[[Callable], Callable] = lambda fn: fn
+
+
+def set_task_wrapper(wrapper: Callable[[Callable], Callable]):
+  global _wrap_task
+  _wrap_task = wrapper
+
+
+class DeadlineExceeded(Exception):
+  pass
+
+
+def deadline_after(seconds: float = REQUEST_DEADLINE_S) -> float:
+  """Absolute deadline (epoch seconds) for a request starting now."""
+  return time.time() + seconds
+
+
+def remaining(deadline: float) -> float:
+  """Seconds left before `deadline`; a deadline of 0 means unbounded."""
+  if not deadline:
+    return float("inf")
+  return deadline - time.time()
+
+
+def has_budget(deadline: float, step: str) -> bool:
+  return remaining(deadline) >= MIN_BUDGET_S.get(step, 0.0)
+
+
+def reserve(deadline: float, step: str) -> float:
+  """Earlier deadline for optional work that leaves `step`'s budget for what follows."""
+  if not deadline:
+    return deadline
+  return deadline - MIN_BUDGET_S.get(step, 0.0)
+
+
+def _pool(kind: str) -> ThreadPoolExecutor:
+  with _pools_lock:
+    if kind not in _pools:
+      _pools[kind] = ThreadPoolExecutor(max_workers=DEADLINE_POOL_SIZE, thread_name_prefix=f"deadline-{kind}")
+    return _pools[kind]
+
+
+def call_with_deadline(deadline: float, fn: Callable[..., Any], *args, kind: str = "default", **kwargs) -> Any:
+  """Run `fn` on the `kind` pool and give up with DeadlineExceeded once the deadline passes.
+
+  The call keeps running on the pool thread after a timeout, its result is
+  simply discarded. A call still queued behind such calls is cancelled and
+  reported as never started. It runs in a copy of the caller's context variables.
+  """
+  budget = remaining(deadline)
+  name = getattr(fn, "__name__", fn)
+  if budget == float("inf"):
+    return fn(*args, **kwargs)
+  if budget <= 0:
+    raise DeadlineExceeded(f"No time left to call {name}")
+  future = _pool(kind).submit(contextvars.copy_context().run, _wrap_task(fn), *args, **kwargs)
+  try:
+    return future.result(timeout=budget)
+  except FutureTimeout:
+    if future.cancel():
+      raise DeadlineExceeded(f"{name} did not start within {budget:.1f}s, the {kind} pool is busy")
+    raise DeadlineExceeded(f"{name} did not finish within {budget:.1f}s")
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, List
+
+from db_connection import CHUNK_OVERLAP, CHUNK_SIZE, content_id
+
+INGEST_EXTENSIONS = tuple(os.getenv("INGEST_EXTENSIONS", ".txt,.md,.rst").split(","))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 2)))
+INGEST_WINDOW = int(os.getenv("INGEST_WINDOW", "512"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "2000"))
+
+Chunk = Dict[str, Any]
+
+
+def iter_documents(source: str) -> Iterator[Dict[str, Any]]:
+  """Stream documents from a directory tree or a JSONL file.
+
+  Files are yielded by path and read by the chunking workers. A JSONL line may
+  be an object with a "text" (or "content") field, whose other fields become
+  metadata, or a bare JSON string.
+  """
+  if os.path.isdir(source):
+    for root, dirs, files in os.walk(source):
+      dirs.sort()
+      for name in sorted(files):
+        if name.endswith(INGEST_EXTENSIONS):
+          path = os.path.join(root, name)
+          yield {"path": path, "metadata": {"source": os.path.relpath(path, source)}}
+    return
+  with open(source) as f:
+    for index, line in enumerate(f):
+      line = line.strip()
+      if not line:
+        continue
+      record = json.loads(line)
+      if isinstance(record, str):
+        record = {"text": record}
+      text = record.pop("text", None) or record.pop("content", "")
+      metadata = {key: value for key, value in record.items() if isinstance(value, (str, int, float, bool))}
+      metadata.setdefault("source", f"{os.path.basename(source)}:{index}")
+      yield {"text": text, "metadata": metadata}
+
+
+_splitter = None
+
+
+def chunk_document(doc: Dict[str, Any]) -> List[Chunk]:
+  """Split one document into chunks; runs in the chunking process pool."""
+  global _splitter
+  if _splitter is None:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    _splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True)
+  text = doc.get("text")
+  if text is None:
+    with open(doc["path"], encoding="utf-8", errors="replace") as f:
+      text = f.read()
+  chunks = []
+  for piece in _splitter.create_documents([text], metadatas=[doc["metadata"]]):
+    chunks.append({"id": content_id(piece.page_content), "text": piece.page_content, "metadata": piece.metadata})
+  return chunks
+
+
+class Ingester:
+  """Bulk loader for the memory store's Chroma collection.
+
+  Chunks are embedded in batches of `batch_size` with at most `concurrency`
+  embedding calls in flight, retried with backoff, and upserted `upsert_batch`
+  at a time. Chunks whose content hash is already in the collection are
+  skipped before embedding.
+  """
+  def __init__(self, vector_db=None, batch_size: int = EMBED_BATCH_SIZE, concurrency: int = EMBED_CONCURRENCY,
+               upsert_batch: int = UPSERT_BATCH_SIZE, workers: int = INGEST_WORKERS, window: int = INGEST_WINDOW):
+    if vector_db is None:
+      from db_connection import get_vector_db
+      vector_db = get_vector_db()
+    # The LangChain wrapper embeds inside add_documents; batching and retrying
+    # the embedding calls ourselves needs the raw collection.
+    self.collection = vector_db.vector_store._collection
+    self.embedding = vector_db.vector_store.embeddings
+    self.batch_size = batch_size
+    self.concurrency = concurrency
+    self.upsert_batch = upsert_batch
+    self.workers = workers
+    self.window = window
+    self.stats = {"docs": 0, "chunks": 0, "skipped": 0, "inserted": 0, "retries": 0}
+    self._lock = threading.Lock()
+    self._started = 0.0
+    self._last_report = 0.0
+
+  def _count(self, stat: str, n: int = 1):
+    with self._lock:
+      self.stats[stat] += n
+
+  def _embed(self, texts: List[str]) -> List[List[float]]:
+    for attempt in range(EMBED_MAX_RETRIES):
+      try:
+        return self.embedding.embed_documents(texts)
+      except Exception as e:
+        if attempt == EMBED_MAX_RETRIES - 1:
+          raise
+        self._count("retries")
+        delay = min(30.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+        print(f"Embedding batch of {len(texts)} failed ({e}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+  def _new_chunks(self, chunks: List[Chunk], seen: set) -> List[Chunk]:
+    fresh = {}
+    for chunk in chunks:
+      if chunk["id"] not in seen and chunk["id"] not in fresh:
+        fresh[chunk["id"]] = chunk
+    if fresh:
+      existing = set(self.collection.get(ids=list(fresh), include=[])["ids"])
+      for chunk_id in existing:
+        del fresh[chunk_id]
+    self._count("skipped", len(chunks) - len(fresh))
+    seen.update(fresh)
+    return list(fresh.values())
+
+  def _flush(self, chunks: List[Chunk], embedders: ThreadPoolExecutor):
+    texts = [chunk["text"] for chunk in chunks]
+    batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+    embeddings = [vector for batch in embedders.map(self._embed, batches) for vector in batch]
+    now = time.time()
+    self.collection.upsert(
+      ids=[chunk["id"] for chunk in chunks],
+      embeddings=embeddings,
+      documents=texts,
+      metadatas=[dict(chunk["metadata"], created_at=now, last_seen_at=now) for chunk in chunks],
+    )
+    self._count("inserted", len(chunks))
+
+  def _report(self, final: bool = False):
+    now = time.perf_counter()
+    if not final and now - self._last_report < 2.0:
+      return
+    self._last_report = now
+    elapsed = now - self._started
+    rate = self.stats["docs"] / elapsed if elapsed else 0.0
+    print(f"{'Done' if final else 'Progress'}: {self.stats['docs']} docs, {self.stats['chunks']} chunks, "
+          f"{self.stats['inserted']} inserted, {self.stats['skipped']} already present, "
+          f"{rate:.1f} docs/s, {elapsed:.1f}s")
+
+  def ingest(self, documents: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+    self._started = self._last_report = time.perf_counter()
+    seen: set = set()
+    pending: List[Chunk] = []
+    with ProcessPoolExecutor(max_workers=self.workers) as chunkers, ThreadPoolExecutor(max_workers=self.concurrency) as embedders:
+      while True:
+        window = list(islice(documents, self.window))
+        if not window:
+          break
+        chunks = [chunk for doc_chunks in chunkers.map(chunk_document, window, chunksize=16) for chunk in doc_chunks]
+        self._count("docs", len(window))
+        self._count("chunks", len(chunks))
+        pending.extend(self._new_chunks(chunks, seen))
+        while len(pending) >= self.upsert_batch:
+          self._flush(pending[:self.upsert_batch], embedders)
+          del pending[:self.upsert_batch]
+        self._report()
+      if pending:
+        self._flush(pending, embedders)
+    self._report(final=True)
+    elapsed = time.perf_counter() - self._started
+    return dict(self.stats, elapsed_s=round(elapsed, 2), docs_per_s=round(self.stats["docs"] / elapsed, 1) if elapsed else 0.0)
+
+
+def ingest(source: str, vector_db=None, **kwargs) -> Dict[str, Any]:
+  """Ingest every document under `source` (a directory or JSONL file) into the memory store."""
+  return Ingester(vector_db, **kwargs).ingest(iter_documents(source))
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Bulk-load documents into the vector memory store")
+  parser.add_argument("source", help=f"directory of {'/'.join(INGEST_EXTENSIONS)} files, or a JSONL file")
+  parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="texts per embedding call")
+  parser.add_argument("--concurrency", type=int, default=EMBED_CONCURRENCY, help="embedding calls in flight")
+  parser.add_argument("--upsert-batch", type=int, default=UPSERT_BATCH_SIZE, help="chunks per collection upsert")
+  parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="chunking processes")
+  args = parser.parse_args()
+
+  summary = ingest(args.source, batch_size=args.batch_size, concurrency=args.concurrency,
+                   upsert_batch=args.upsert_batch, workers=args.workers)
+  print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+  main()
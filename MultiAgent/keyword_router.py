@@ -0,0 +1,76 @@
+import json
+import re
+from typing import Dict, List, Mapping, Tuple, Union
+
+Keywords = Union[List[str], Mapping[str, float]]
+
+
+_WORD = re.compile(r"[a-z0-9_']+")
+
+
+class KeywordRouter:
+  """Routes a message by keyword scores, computed in one pass over its words.
+
+  `routes` maps a route name to its keywords, either a list (weight 1.0 each)
+  or a {keyword: weight} mapping. Keywords are compiled into a dict of word
+  n-grams and match whole words only, with an optional plural suffix, so "due"
+  no longer matches inside "produce". The route with the highest total score
+  wins; ties go to the route listed first, and a message with no keywords goes
+  to `default`.
+  """
+  def __init__(self, routes: Mapping[str, Keywords], default: str, plurals: bool = True):
+    self.routes = list(routes)
+    self.default = default
+    self.plurals = plurals
+    self._weights: Dict[str, List[Tuple[str, float]]] = {}
+    for route, keywords in routes.items():
+      weighted = keywords.items() if isinstance(keywords, Mapping) else ((keyword, 1.0) for keyword in keywords)
+      for keyword, weight in weighted:
+        entries = self._weights.setdefault(" ".join(_WORD.findall(keyword.lower())), [])
+        if all(existing != route for existing, _ in entries):
+          entries.append((route, float(weight)))
+    self._max_words = max((len(keyword.split()) for keyword in self._weights), default=0)
+
+  @classmethod
+  def from_config(cls, path: str) -> "KeywordRouter":
+    """Load routes from JSON: {"default": "...", "routes": {"Route": [...] or {"kw": weight}}}."""
+    with open(path) as f:
+      config = json.load(f)
+    return cls(config["routes"], default=config["default"], plurals=config.get("plurals", True))
+
+  def _lookup(self, phrase: str):
+    entries = self._weights.get(phrase)
+    if entries is None and self.plurals and phrase.endswith("s"):
+      entries = self._weights.get(phrase[:-1])
+      if entries is None and phrase.endswith("es"):
+        entries = self._weights.get(phrase[:-2])
+    return entries
+
+  def scores(self, message: str) -> Dict[str, float]:
+    totals = {route: 0.0 for route in self.routes}
+    words = _WORD.findall(message.lower())
+    if self._max_words == 1:
+      for word in words:
+        entries = self._weights.get(word) or self._lookup(word)
+        if entries:
+          for route, weight in entries:
+            totals[route] += weight
+      return totals
+    i = 0
+    while i < len(words):
+      # Longest keyword starting at this word wins, then skip past it.
+      for n in range(min(self._max_words, len(words) - i), 0, -1):
+        entries = self._lookup(words[i] if n == 1 else " ".join(words[i:i + n]))
+        if entries:
+          for route, weight in entries:
+            totals[route] += weight
+          i += n
+          break
+      else:
+        i += 1
+    return totals
+
+  def classify(self, message: str) -> str:
+    totals = self.scores(message)
+    best = max(self.routes, key=lambda route: totals[route], default=self.default)
+    return best if totals.get(best, 0.0) > 0 else self.default
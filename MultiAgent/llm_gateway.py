@@ -0,0 +1,195 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from metrics import percentile
+import model
+from profiling import captured
+import traffic
+
+# Small, fast model for one-word routing decisions and SQL generation; the
+# larger one for answers the user reads.
+TIERS = {
+  "fast": os.getenv("LLM_FAST_MODEL", "gemini-2.5-flash-lite"),
+  "large": os.getenv("LLM_LARGE_MODEL", "gemini-2.5-flash"),
+}
+
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+# The delay should sit below the slow tail: at p95, a tail of 5% or more of
+# calls pulls the delay into the stall it is meant to cut short.
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DEFAULT_DELAY_MS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "3000"))
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "50"))
+# At most this share of calls is hedged (plus a burst of LLM_HEDGE_BURST), so a
+# slow provider gets a little extra load rather than twice the requests.
+LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))
+LLM_HEDGE_BURST = float(os.getenv("LLM_HEDGE_BURST", "5"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+LLM_GATEWAY_POOL_SIZE = int(os.getenv("LLM_GATEWAY_POOL_SIZE", "64"))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_GATEWAY_POOL_SIZE, thread_name_prefix="llm")
+
+
+class LatencyStats:
+  """Rolling window of call latencies for one tier, plus hedging counters.
+
+  Hedges are paid for from a budget that every call adds `hedge_rate` to, up
+  to `hedge_burst`; `hedges_skipped` counts slow calls that found it empty.
+  """
+  def __init__(self, window: int = LLM_LATENCY_WINDOW, hedge_rate: float = LLM_HEDGE_MAX_RATE,
+               hedge_burst: float = LLM_HEDGE_BURST):
+    self.samples = deque(maxlen=window)
+    self.calls = 0
+    self.errors = 0
+    self.hedges = 0
+    self.hedge_wins = 0
+    self.hedges_skipped = 0
+    self.hedge_rate = hedge_rate
+    self.hedge_burst = hedge_burst
+    self._hedge_budget = hedge_burst
+    self._lock = threading.Lock()
+
+  def count(self, counter: str):
+    with self._lock:
+      setattr(self, counter, getattr(self, counter) + 1)
+
+  def call_started(self):
+    with self._lock:
+      self.calls += 1
+      self._hedge_budget = min(self.hedge_burst, self._hedge_budget + self.hedge_rate)
+
+  def take_hedge(self) -> bool:
+    """Spend one hedge from the budget, or count it as skipped when there is none."""
+    with self._lock:
+      if self._hedge_budget >= 1:
+        self._hedge_budget -= 1
+        self.hedges += 1
+        return True
+      self.hedges_skipped += 1
+      return False
+
+  def record(self, seconds: float):
+    with self._lock:
+      self.samples.append(seconds)
+
+  def percentile(self, pct: float) -> Optional[float]:
+    with self._lock:
+      samples = list(self.samples)
+    return percentile(samples, pct, None)
+
+  def hedge_delay(self) -> float:
+    """Seconds to wait on the first attempt before sending a duplicate."""
+    if len(self.samples) < LLM_HEDGE_MIN_SAMPLES:
+      return LLM_HEDGE_DEFAULT_DELAY_MS / 1000
+    return max(LLM_HEDGE_MIN_DELAY_MS / 1000, self.percentile(LLM_HEDGE_PERCENTILE))
+
+  def snapshot(self) -> Dict[str, Any]:
+    p50, p95, p99 = (self.percentile(pct) for pct in (50, 95, 99))
+    to_ms = lambda value: round(value * 1000, 1) if value is not None else None
+    return {
+      "calls": self.calls,
+      "errors": self.errors,
+      "hedges": self.hedges,
+      "hedge_wins": self.hedge_wins,
+      "hedges_skipped": self.hedges_skipped,
+      "p50_ms": to_ms(p50),
+      "p95_ms": to_ms(p95),
+      "p99_ms": to_ms(p99),
+    }
+
+
+def _ai_message(content):
+  from langchain_core.messages import AIMessage
+  return AIMessage(content=content)
+
+
+class HedgedLLM(Runnable):
+  """Chat model wrapper that sends a duplicate request when the first is slow.
+
+  If the first attempt has not answered after the tier's LLM_HEDGE_PERCENTILE
+  latency, and the hedge budget allows, the same input is sent again and
+  whichever attempt succeeds first wins; the other result is discarded. Composes like the wrapped model (`prompt | llm`,
+  `llm.bind(stop=...)`), and context variables are copied into both attempts.
+  """
+  def __init__(self, llm: Runnable, tier: str, stats: LatencyStats = None, hedge: bool = LLM_HEDGE_ENABLED):
+    self.llm = llm
+    self.tier = tier
+    self.stats = stats or LatencyStats()
+    self.hedge = hedge
+
+  @property
+  def InputType(self):
+    return self.llm.InputType
+
+  @property
+  def OutputType(self):
+    return self.llm.OutputType
+
+  def _attempt(self, input, config, kwargs):
+    started = time.perf_counter()
+    key = traffic.call_key(self.tier, input.to_string() if hasattr(input, "to_string") else input, kwargs)
+    result = traffic.external("llm", key, lambda: self.llm.invoke(input, config, **kwargs),
+                              encode=lambda message: getattr(message, "content", message), decode=_ai_message)
+    self.stats.record(time.perf_counter() - started)
+    return result
+
+  def _submit(self, input, config, kwargs):
+    return _executor.submit(contextvars.copy_context().run, captured(self._attempt), input, config, kwargs)
+
+  def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+    self.stats.call_started()
+    if not self.hedge:
+      try:
+        return self._attempt(input, config, kwargs)
+      except Exception:
+        self.stats.count("errors")
+        raise
+
+    first = self._submit(input, config, kwargs)
+    done, _ = wait([first], timeout=self.stats.hedge_delay())
+    if done or not self.stats.take_hedge():
+      try:
+        return first.result()
+      except Exception:
+        self.stats.count("errors")
+        raise
+
+    second = self._submit(input, config, kwargs)
+    pending = {first, second}
+    error = None
+    while pending:
+      done, pending = wait(pending, return_when=FIRST_COMPLETED)
+      for future in done:
+        try:
+          result = future.result()
+        except Exception as e:
+          error = error or e
+          continue
+        if future is second:
+          self.stats.count("hedge_wins")
+        return result
+    self.stats.count("errors")
+    raise error
+
+
+_gateways: Dict[str, HedgedLLM] = {}
+_lock = threading.Lock()
+
+
+def get_llm(tier: str = "large") -> HedgedLLM:
+  """The shared, hedged chat model for `tier` ("fast" or "large")."""
+  with _lock:
+    if tier not in _gateways:
+      _gateways[tier] = HedgedLLM(model.get_llm(TIERS[tier]), tier)
+    return _gateways[tier]
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+  return {tier: gateway.stats.snapshot() for tier, gateway in _gateways.items()}
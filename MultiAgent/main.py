@@ -1,31 +1,85 @@
-from agents import WorkflowManager
-from fastapi import FastAPI
+from admission import AdmissionRejected
+from checkpointing import RequestConflict
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
 from pydantic import BaseModel
+from registry import get_manager, warm_up
+from profiling import PROFILING_ENABLED, capture, install as install_profiling
+from traffic import recording
+from typing import List, Literal, Optional
+import math
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  warm_up()
+  yield
+
+app = FastAPI(lifespan=lifespan)
+if PROFILING_ENABLED:
+  install_profiling(app)
 
 class UserRequest(BaseModel):
   user_query: str
+  priority: Literal["high", "normal", "low"] = "normal"
+  timeout_ms: Optional[int] = None
   
 class UserResponse(BaseModel):
   response: str
-
-manager = WorkflowManager()
+  degraded: List[str] = []
 
 @app.post("/chat", response_model=UserResponse)
-def chatbot(req: UserRequest):
-  response = manager.run(req.user_query)
-  return UserResponse(response=response["data"]["result"])
+def chatbot(req: UserRequest, request: Request, x_request_id: Optional[str] = Header(None), x_replay_id: Optional[str] = Header(None)):
+  # Scope client-chosen request IDs to the client, so they cannot name another caller's request.
+  client = request.client.host if request.client else "local"
+  request_id = f"{client}/{x_request_id}" if x_request_id else None
+  try:
+    timeout = req.timeout_ms / 1000 if req.timeout_ms else None
+    with capture(), recording(req.user_query, req.priority, req.timeout_ms, x_replay_id) as traffic:
+      try:
+        response = get_manager().run(req.user_query, priority=req.priority, timeout=timeout, request_id=request_id)
+        if traffic:
+          traffic.record["route"] = response.get("route") or None
+      except AdmissionRejected:
+        if traffic:
+          traffic.record["status"] = 429
+        raise
+  except AdmissionRejected as e:
+    raise HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": str(math.ceil(e.retry_after))})
+  except RequestConflict as e:
+    raise HTTPException(status_code=409, detail=str(e))
+  return UserResponse(response=response["result"], degraded=response["degraded"])
+
+@app.get("/admission/stats")
+def admission_stats():
+  return get_manager().admission.stats()
+
+
+@app.get("/llm/stats")
+def llm_stats():
+  import llm_gateway
+  return llm_gateway.stats()
+
+
+@app.get("/sql/stats")
+def sql_stats():
+  import sql_cache
+  return sql_cache.stats()
+
+
+@app.get("/search/stats")
+def search_stats():
+  from websearch import search
+  return search.search_stats()
 
 
 if __name__ == "__main__":
+  manager = get_manager()
   while True:
     user_query = input("Enter your query('exit' to quit): ")
     
     if user_query == 'exit':
       break
     
-    manager = WorkflowManager()
     response = manager.run(user_query)
     
     print(response)
\ No newline at end of file
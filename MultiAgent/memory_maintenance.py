@@ -0,0 +1,183 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import time
+from typing import Any, Dict, Iterator, List
+
+from db_connection import CHROMA_DIR, CONVERSATION_SOURCE, MEMORY_DEDUP_MAX_DISTANCE
+from metrics import percentile
+
+MEMORY_MAX_AGE_DAYS = float(os.getenv("MEMORY_MAX_AGE_DAYS", "90"))
+PAGE_SIZE = 1000
+
+
+def dir_size(path: str) -> int:
+  total = 0
+  for root, _, files in os.walk(path):
+    for name in files:
+      try:
+        total += os.path.getsize(os.path.join(root, name))
+      except OSError:
+        pass
+  return total
+
+
+def iter_records(collection, include: List[str]) -> Iterator[Dict[str, Any]]:
+  """Every stored entry, a page at a time."""
+  offset = 0
+  while True:
+    page = collection.get(include=include, limit=PAGE_SIZE, offset=offset)
+    if not page["ids"]:
+      return
+    for i, entry_id in enumerate(page["ids"]):
+      yield {"id": entry_id, **{field: page[field][i] for field in include}}
+    offset += len(page["ids"])
+
+
+def measure(collection, persist_dir: str, samples: int = 50, k: int = 5) -> Dict[str, Any]:
+  """Entry count, on-disk size and query latency, using stored embeddings as queries."""
+  count = collection.count()
+  latencies = []
+  if count:
+    ids = [record["id"] for record in iter_records(collection, [])]
+    picked = collection.get(ids=random.sample(ids, min(samples, len(ids))), include=["embeddings"])["embeddings"]
+    for embedding in picked:
+      started = time.perf_counter()
+      collection.query(query_embeddings=[embedding], n_results=min(k, count), include=["distances"])
+      latencies.append((time.perf_counter() - started) * 1000)
+  pct = lambda p: round(percentile(latencies, p), 2) if latencies else None
+  return {
+    "entries": count,
+    "disk_mib": round(dir_size(persist_dir) / 2 ** 20, 2),
+    "query_p50_ms": pct(50),
+    "query_p95_ms": pct(95),
+  }
+
+
+def find_removals(collection, max_age_days: float, max_distance: float) -> Dict[str, List[str]]:
+  """IDs to drop: stale conversation memories, exact repeats and near-duplicates.
+
+  Only answers stored by RespondAgent expire: `last_seen_at` changes when the
+  same answer is stored again, not when an entry is recalled, so ingested
+  documents would otherwise all go stale together. Newer entries are kept over
+  older ones, so the surviving copy of a repeated memory is its most recent answer.
+  """
+  now = time.time()
+  records = list(iter_records(collection, ["documents", "metadatas"]))
+  last_seen = lambda record: (record["metadatas"] or {}).get("last_seen_at") or (record["metadatas"] or {}).get("created_at") or 0
+  records.sort(key=last_seen, reverse=True)
+
+  conversation = lambda record: (record["metadatas"] or {}).get("source") == CONVERSATION_SOURCE
+  stale = [record["id"] for record in records
+           if conversation(record) and last_seen(record) and now - last_seen(record) > max_age_days * 86400]
+  removed = set(stale)
+  exact, near = [], []
+  hashes = set()
+  for record in records:
+    if record["id"] in removed:
+      continue
+    digest = hashlib.sha256((record["documents"] or "").encode("utf-8")).hexdigest()
+    if digest in hashes:
+      exact.append(record["id"])
+      removed.add(record["id"])
+      continue
+    hashes.add(digest)
+
+  kept = set()
+  n_results = min(10, collection.count())
+  for record in records:
+    if record["id"] in removed:
+      continue
+    kept.add(record["id"])
+    embedding = collection.get(ids=[record["id"]], include=["embeddings"])["embeddings"][0]
+    neighbours = collection.query(query_embeddings=[embedding], n_results=n_results, include=["distances"])
+    for neighbour, distance in zip(neighbours["ids"][0], neighbours["distances"][0]):
+      if distance > max_distance:
+        break
+      if neighbour not in kept and neighbour not in removed:
+        near.append(neighbour)
+        removed.add(neighbour)
+  return {"stale": stale, "exact_duplicates": exact, "near_duplicates": near}
+
+
+def rebuild(vector_db, backup_path: str):
+  """Recreate the collection from its live entries so the HNSW index drops deleted vectors.
+
+  Entries are written to `backup_path` first, to restore from if this is interrupted.
+  """
+  store = vector_db.vector_store
+  collection = store._collection
+  include = ["embeddings", "documents", "metadatas"]
+  with open(backup_path, "w") as f:
+    for record in iter_records(collection, include):
+      record["embeddings"] = [float(value) for value in record["embeddings"]]
+      f.write(json.dumps(record) + "\n")
+  name, metadata = collection.name, collection.metadata
+  store._client.delete_collection(name)
+  collection = store._client.get_or_create_collection(name, metadata=metadata)
+  batch: List[Dict[str, Any]] = []
+
+  def flush():
+    collection.add(ids=[r["id"] for r in batch], embeddings=[r["embeddings"] for r in batch],
+                   documents=[r["documents"] for r in batch], metadatas=[r["metadatas"] for r in batch])
+    batch.clear()
+
+  with open(backup_path) as f:
+    for line in f:
+      batch.append(json.loads(line))
+      if len(batch) >= PAGE_SIZE:
+        flush()
+  if batch:
+    flush()
+  store._collection = collection
+
+
+def vacuum(persist_dir: str):
+  """Reclaim the space of deleted rows in Chroma's SQLite file."""
+  conn = sqlite3.connect(os.path.join(persist_dir, "chroma.sqlite3"))
+  try:
+    conn.execute("VACUUM")
+  finally:
+    conn.close()
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Deduplicate and compact the vector memory store")
+  parser.add_argument("--persist-dir", default=CHROMA_DIR)
+  parser.add_argument("--max-age-days", type=float, default=MEMORY_MAX_AGE_DAYS, help="drop conversation memories not stored again for this long")
+  parser.add_argument("--max-distance", type=float, default=MEMORY_DEDUP_MAX_DISTANCE, help="Chroma distance for near-duplicates")
+  parser.add_argument("--samples", type=int, default=50, help="queries used to measure latency")
+  parser.add_argument("--rebuild", action="store_true", help="recreate the collection after deleting, to shrink the HNSW index")
+  parser.add_argument("--dry-run", action="store_true", help="only report what would be removed")
+  args = parser.parse_args()
+
+  from db_connection import VectorDBConnect
+  vector_db = VectorDBConnect(args.persist_dir)
+  collection = vector_db.vector_store._collection
+
+  before = measure(collection, args.persist_dir, args.samples)
+  print(f"Before: {json.dumps(before)}")
+  removals = find_removals(collection, args.max_age_days, args.max_distance)
+  print("To remove: " + ", ".join(f"{len(ids)} {kind.replace('_', ' ')}" for kind, ids in removals.items()))
+  if args.dry_run:
+    return
+
+  ids = [entry_id for group in removals.values() for entry_id in group]
+  for i in range(0, len(ids), PAGE_SIZE):
+    collection.delete(ids=ids[i:i + PAGE_SIZE])
+  if args.rebuild:
+    backup_path = os.path.join(args.persist_dir, "rebuild_backup.jsonl")
+    rebuild(vector_db, backup_path)
+    os.remove(backup_path)
+    collection = vector_db.vector_store._collection
+  vacuum(args.persist_dir)
+
+  after = measure(collection, args.persist_dir, args.samples)
+  print(f"After:  {json.dumps(after)}")
+
+
+if __name__ == "__main__":
+  main()
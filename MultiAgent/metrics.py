@@ -0,0 +1,9 @@
+from typing import Sequence
+
+
+def percentile(values: Sequence[float], pct: float, default=0.0):
+  """Nearest-rank `pct` percentile of `values`, or `default` when there are none."""
+  if not values:
+    return default
+  ordered = sorted(values)
+  return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
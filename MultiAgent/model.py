@@ -1,6 +1,23 @@
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from dotenv import load_dotenv
+from functools import lru_cache
 load_dotenv()
 
-embedding = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.0)
\ No newline at end of file
+# The Gemini clients are built on first use (`model.llm`, `model.embedding`) so
+# importing this module stays cheap.
+
+@lru_cache(maxsize=None)
+def get_embedding():
+  from langchain_google_genai import GoogleGenerativeAIEmbeddings
+  return GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+
+@lru_cache(maxsize=None)
+def get_llm(model: str = "gemini-2.5-flash"):
+  from langchain_google_genai import ChatGoogleGenerativeAI
+  return ChatGoogleGenerativeAI(model=model, temperature=0.0)
+
+def __getattr__(name):
+  if name == "llm":
+    return get_llm()
+  if name == "embedding":
+    return get_embedding()
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,7 +4,7 @@ from langchain_core.prompts import ChatPromptTemplate
 import re
 
 class SQLQueryChain:
-  def __init__(self, db, llm):
+  def __init__(self, db, llm, sql_llm=None):
     self.db = db
     self.llm = llm
     self.query_template = """
@@ -18,6 +18,8 @@ class SQLQueryChain:
     SQL Query:"""
 
     self.prompt = ChatPromptTemplate.from_template(self.query_template)
+    # SQL generation can run on a smaller model than the final answer.
+    self.sql_llm = (sql_llm or self.llm).bind(stop=["\nSQLResult:", "```"])
   
   def clean_sql_query(self, query: str) -> str:
     """Clean the SQL query by removing markdown formatting and extra whitespace."""
@@ -29,18 +31,21 @@ class SQLQueryChain:
     
     return query
     
-  def get_chain(self):
+  def get_query_chain(self):
+    """Question and schema in, cleaned SQL out."""
     return (
-      RunnablePassthrough.assign(schema=lambda x: self.db.get_schema())
-      | self.prompt
-      | self.llm.bind(stop=["\nSQLResult:", "```"])
+      self.prompt
+      | self.sql_llm
       | StrOutputParser()
       | self.clean_sql_query
     )
+    
+  def get_chain(self):
+    return RunnablePassthrough.assign(schema=lambda x: self.db.get_schema()) | self.get_query_chain()
 
 class SQLChain(SQLQueryChain):
-  def __init__(self, db, llm):
-    super().__init__(db, llm)
+  def __init__(self, db, llm, sql_llm=None):
+    super().__init__(db, llm, sql_llm)
     self.template = """Based on the table schema below, question, sql query, and sql response, write a natural language response:
     {schema}
 
@@ -49,24 +54,21 @@ class SQLChain(SQLQueryChain):
     SQL Response: {response}
     Answer:"""
     self.prompt_response = ChatPromptTemplate.from_template(self.template)
+    self.chain = self.get_chain()
 
   def get_chain(self):
-    sql_chain = super().get_chain()
-    
+    # The schema is fetched once per question and shared by both prompts.
     return (
-      RunnablePassthrough.assign(query=sql_chain)
-      .assign(
-        schema=lambda x: self.db.get_schema(),
-        response=lambda x: self.db.run_query(x["query"]),
-      )
+      RunnablePassthrough.assign(schema=lambda x: self.db.get_schema())
+      .assign(query=self.get_query_chain())
+      .assign(response=lambda x: self.db.run_query(x["query"]))
       | self.prompt_response
       | self.llm.bind(stop=["\nResponse:"])
       | StrOutputParser()
     )
 
   def invoke(self, inputs):
-    chain = self.get_chain()
-    return chain.invoke(inputs)
+    return self.chain.invoke(inputs)
   
 def main():
   """CLI mode for testing"""
@@ -91,6 +93,6 @@ def main():
     print(f"Error: {e}")
     
 if __name__ == "__main__":
-  from model import *
-  from db_connection import *
+  from model import llm
+  from db_connection import DatabaseConnect
   main()
\ No newline at end of file
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from deadline import has_budget, remaining
+
+WEB_DEEP_READ = os.getenv("WEB_DEEP_READ", "false").lower() in ("1", "true", "yes")
+DEEP_READ_TOP_N = int(os.getenv("DEEP_READ_TOP_N", "5"))
+FETCH_TIMEOUT_S = float(os.getenv("FETCH_TIMEOUT_S", "5"))
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "20"))
+FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "2"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "2"))
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", "./page_cache")
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "5000"))
+CHUNK_WORDS = int(os.getenv("DEEP_READ_CHUNK_WORDS", "200"))
+CHUNKS_PER_PAGE = int(os.getenv("DEEP_READ_CHUNKS_PER_PAGE", "3"))
+
+_SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "template"}
+
+
+class _TextExtractor(HTMLParser):
+  def __init__(self):
+    super().__init__(convert_charrefs=True)
+    self.parts: List[str] = []
+    self.skip_depth = 0
+
+  def handle_starttag(self, tag, attrs):
+    if tag in _SKIP_TAGS:
+      self.skip_depth += 1
+
+  def handle_endtag(self, tag):
+    if tag in _SKIP_TAGS and self.skip_depth:
+      self.skip_depth -= 1
+
+  def handle_data(self, data):
+    if not self.skip_depth and data.strip():
+      self.parts.append(data.strip())
+
+
+def extract_text(html: str) -> str:
+  """Readable text of an HTML page; runs in the extraction process pool."""
+  parser = _TextExtractor()
+  try:
+    parser.feed(html)
+    parser.close()
+  except Exception:
+    pass  # Keep whatever was parsed from malformed markup.
+  return re.sub(r"\s+", " ", " ".join(parser.parts)).strip()
+
+
+def chunk_text(text: str, size: int = CHUNK_WORDS, overlap: int = CHUNK_WORDS // 4) -> List[str]:
+  words = text.split()
+  step = max(1, size - overlap)
+  return [" ".join(words[i:i + size]) for i in range(0, max(len(words) - overlap, 1), step)]
+
+
+def rank_chunks(chunks: List[str], query: str, top_k: int = CHUNKS_PER_PAGE) -> List[str]:
+  """Best chunks by the same word-overlap scoring as filter_relevant_results."""
+  query_words = set(query.lower().split())
+  scored = []
+  for chunk in chunks:
+    lowered = chunk.lower()
+    score = len(query_words.intersection(lowered.split()))
+    if query.lower() in lowered:
+      score += 3
+    if score > 0:
+      scored.append((score, chunk))
+  scored.sort(key=lambda item: item[0], reverse=True)
+  return [chunk for _, chunk in scored[:top_k]]
+
+
+class PageCache:
+  """Extracted page text on disk, with the validators needed to revalidate it.
+
+  Holds at most `max_entries` pages. Reading a page refreshes its modification
+  time, and the least recently used pages are deleted when the cache is full.
+  """
+  def __init__(self, directory: str = PAGE_CACHE_DIR, max_entries: int = PAGE_CACHE_MAX_ENTRIES):
+    self.directory = directory
+    self.max_entries = max(1, max_entries)
+    os.makedirs(directory, exist_ok=True)
+    self._lock = threading.Lock()
+    self._entries = len(self._files())
+
+  def _path(self, url: str) -> str:
+    return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+  def _files(self) -> List[str]:
+    return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+
+  def get(self, url: str) -> Optional[Dict[str, Any]]:
+    try:
+      with open(self._path(url)) as f:
+        entry = json.load(f)
+      os.utime(self._path(url))
+      return entry
+    except (OSError, ValueError):
+      return None
+
+  def put(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str]):
+    entry = {"url": url, "text": text, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+    path = self._path(url)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+      json.dump(entry, f)
+    with self._lock:
+      if not os.path.exists(path):
+        self._entries += 1
+      os.replace(tmp, path)
+      if self._entries > self.max_entries:
+        self._evict()
+
+  def _evict(self):
+    # Evict a tenth below the limit so a full cache is not listed on every put.
+    keep = self.max_entries - self.max_entries // 10
+    files = []
+    for path in self._files():
+      try:
+        files.append((os.path.getmtime(path), path))
+      except OSError:
+        pass
+    files.sort()
+    for _, path in files[:max(0, len(files) - keep)]:
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+    self._entries = min(len(files), keep)
+
+
+class PageFetcher:
+  """Fetches pages concurrently over pooled keep-alive connections.
+
+  At most FETCH_PER_HOST_LIMIT requests go to one host at a time. Cached pages
+  are revalidated with If-None-Match / If-Modified-Since, and a 304 reuses the
+  cached text without extracting it again.
+  """
+  def __init__(self, cache: PageCache = None, max_connections: int = FETCH_MAX_CONNECTIONS,
+               per_host_limit: int = FETCH_PER_HOST_LIMIT, timeout: float = FETCH_TIMEOUT_S):
+    import httpx
+    self.cache = cache or PageCache()
+    self.timeout = timeout
+    self.per_host_limit = per_host_limit
+    self.client = httpx.Client(
+      limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+      timeout=httpx.Timeout(timeout),
+      follow_redirects=True,
+      headers={"User-Agent": "Mozilla/5.0 (compatible; MultiAgentDeepRead/1.0)"},
+    )
+    self._threads = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="fetch")
+    self._extractors = None
+    self._host_slots: Dict[str, threading.Semaphore] = {}
+    self._lock = threading.Lock()
+    self.stats = {"fetched": 0, "revalidated": 0, "failed": 0}
+
+  def _count(self, stat: str):
+    with self._lock:
+      self.stats[stat] += 1
+
+  def _host_slot(self, url: str) -> threading.Semaphore:
+    host = urlparse(url).netloc
+    with self._lock:
+      if host not in self._host_slots:
+        self._host_slots[host] = threading.Semaphore(self.per_host_limit)
+      return self._host_slots[host]
+
+  def _extract_pool(self) -> ProcessPoolExecutor:
+    with self._lock:
+      if self._extractors is None:
+        self._extractors = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+      return self._extractors
+
+  def _fetch(self, url: str, deadline: float) -> Dict[str, Any]:
+    """Raw fetch: {"text": ...} for a revalidated page, {"html": ...} for a new one."""
+    cached = self.cache.get(url)
+    headers = {}
+    if cached and cached.get("etag"):
+      headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+      headers["If-Modified-Since"] = cached["last_modified"]
+    timeout = max(0.1, min(self.timeout, remaining(deadline)))
+    with self._host_slot(url):
+      with self.client.stream("GET", url, headers=headers, timeout=timeout) as response:
+        if response.status_code == 304 and cached:
+          self._count("revalidated")
+          return {"url": url, "text": cached["text"]}
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "")
+        if "html" not in content_type and "text" not in content_type:
+          raise ValueError(f"Unsupported content type {content_type!r}")
+        body = b""
+        for part in response.iter_bytes():
+          body += part
+          if len(body) > FETCH_MAX_BYTES:
+            break
+        self._count("fetched")
+        return {
+          "url": url,
+          "html": body.decode(response.encoding or "utf-8", errors="replace"),
+          "etag": response.headers.get("etag"),
+          "last_modified": response.headers.get("last-modified"),
+        }
+
+  def fetch_texts(self, urls: List[str], deadline: float = 0.0) -> Dict[str, str]:
+    """Readable text for each URL that could be fetched in time."""
+    futures = {url: self._threads.submit(self._fetch, url, deadline) for url in urls}
+    pages = []
+    for url, future in futures.items():
+      try:
+        pages.append(future.result(timeout=max(0.1, min(self.timeout * 2, remaining(deadline)))))
+      except Exception as e:
+        self._count("failed")
+        print(f"Fetching {url} failed: {e}")
+
+    texts = {page["url"]: page["text"] for page in pages if "text" in page}
+    fresh = [page for page in pages if "html" in page]
+    if fresh:
+      extracted = self._extract_pool().map(extract_text, [page["html"] for page in fresh])
+      for page, text in zip(fresh, extracted):
+        self.cache.put(page["url"], text, page["etag"], page["last_modified"])
+        texts[page["url"]] = text
+    return texts
+
+  def deep_read(self, results: List[Dict[str, Any]], query: str, top_n: int = DEEP_READ_TOP_N,
+                deadline: float = 0.0, degraded: List[str] = None) -> List[Dict[str, Any]]:
+    """Attach the most query-relevant passages of the top results' pages as `content`."""
+    if not has_budget(deadline, "deep_read"):
+      if degraded is not None:
+        degraded.append("deep_read")
+      return results
+    top = [result for result in results[:top_n] if result.get("link")]
+    texts = self.fetch_texts([result["link"] for result in top], deadline)
+    for result in top:
+      passages = rank_chunks(chunk_text(texts.get(result["link"], "")), query)
+      if passages:
+        result["content"] = "\n...\n".join(passages)
+    return results
+
+  def close(self):
+    self._threads.shutdown(wait=True)
+    if self._extractors is not None:
+      self._extractors.shutdown(wait=True)
+    self.client.close()
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher() -> PageFetcher:
+  global _fetcher
+  with _fetcher_lock:
+    if _fetcher is None:
+      _fetcher = PageFetcher()
+    return _fetcher
+
@@ -0,0 +1,301 @@
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Everything here is opt-in: with PROFILING_ENABLED unset, main.py does not
+# install the middleware or the admin routes, and capture() is a ContextVar read.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "100"))
+# Sent as X-Admin-Token; the /admin routes reject every request while it is unset.
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+
+_current: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar("profile", default=None)
+
+
+class Profile:
+  """Stack samples of the threads working on one request, as folded stacks."""
+  def __init__(self, name: str, reason: str):
+    self.id = uuid.uuid4().hex[:12]
+    self.name = name
+    self.reason = reason
+    self.started = time.time()
+    self.elapsed_s = 0.0
+    self.samples = 0
+    self.stacks: Counter = Counter()
+    self.threads: Dict[int, int] = {}
+    self._lock = threading.Lock()
+
+  def attach(self, ident: int):
+    with self._lock:
+      self.threads[ident] = self.threads.get(ident, 0) + 1
+
+  def detach(self, ident: int):
+    with self._lock:
+      self.threads[ident] -= 1
+      if not self.threads[ident]:
+        del self.threads[ident]
+
+  def sample(self, frames):
+    with self._lock:
+      idents = list(self.threads)
+    for ident in idents:
+      frame = frames.get(ident)
+      if frame is not None:
+        self.stacks[_fold(frame)] += 1
+        self.samples += 1
+
+  def folded(self) -> str:
+    """Brendan Gregg's folded format, for flamegraph.pl or speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+  def summary(self) -> Dict[str, object]:
+    return {"id": self.id, "name": self.name, "reason": self.reason, "started": self.started,
+            "elapsed_ms": round(self.elapsed_s * 1000, 1), "samples": self.samples}
+
+
+def _fold(frame) -> str:
+  parts = []
+  while frame is not None:
+    code = frame.f_code
+    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+    frame = frame.f_back
+  return ";".join(reversed(parts))
+
+
+class Sampler:
+  """One background thread sampling every active profile every `interval` seconds.
+
+  It only runs while at least one profile is active.
+  """
+  def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+    self.interval = interval
+    self._active: List[Profile] = []
+    self._cond = threading.Condition()
+    self._thread = None
+
+  def start(self, profile: Profile):
+    with self._cond:
+      self._active.append(profile)
+      if self._thread is None or not self._thread.is_alive():
+        self._thread = threading.Thread(target=self._loop, name="profiler", daemon=True)
+        self._thread.start()
+      self._cond.notify()
+
+  def stop(self, profile: Profile):
+    with self._cond:
+      self._active.remove(profile)
+
+  def _loop(self):
+    while True:
+      with self._cond:
+        while not self._active:
+          self._cond.wait()
+        active = list(self._active)
+      frames = sys._current_frames()
+      for profile in active:
+        profile.sample(frames)
+      del frames
+      time.sleep(self.interval)
+
+
+class ProfileStore:
+  """The most recent profiles: summaries in memory, folded stacks on disk."""
+  def __init__(self, directory: str = PROFILE_DIR, max_stored: int = PROFILE_MAX_STORED):
+    self.directory = directory
+    self.max_stored = max_stored
+    self._profiles: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+    self._lock = threading.Lock()
+
+  def _path(self, profile_id: str) -> str:
+    return os.path.join(self.directory, f"{profile_id}.folded")
+
+  def save(self, profile: Profile):
+    os.makedirs(self.directory, exist_ok=True)
+    with open(self._path(profile.id), "w") as f:
+      f.write(profile.folded())
+    with self._lock:
+      self._profiles[profile.id] = profile.summary()
+      while len(self._profiles) > self.max_stored:
+        old_id, _ = self._profiles.popitem(last=False)
+        try:
+          os.remove(self._path(old_id))
+        except OSError:
+          pass
+
+  def list(self) -> List[Dict[str, object]]:
+    with self._lock:
+      return list(reversed(self._profiles.values()))
+
+  def folded(self, profile_id: str) -> Optional[str]:
+    with self._lock:
+      if profile_id not in self._profiles:
+        return None
+    with open(self._path(profile_id)) as f:
+      return f.read()
+
+
+sampler = Sampler()
+store = ProfileStore()
+
+
+@contextmanager
+def capture():
+  """Include the current thread in the request's profile, if it is being profiled.
+
+  Context variables follow the request into threadpool endpoints and into
+  pool threads started with a copied context, so call this wherever the
+  request's work runs.
+  """
+  profile = _current.get()
+  if profile is None:
+    yield
+    return
+  ident = threading.get_ident()
+  profile.attach(ident)
+  try:
+    yield
+  finally:
+    profile.detach(ident)
+
+
+def captured(fn):
+  """`fn` wrapped in capture(), for work handed to a pool with a copied context."""
+  def run(*args, **kwargs):
+    with capture():
+      return fn(*args, **kwargs)
+  return run
+
+
+@contextmanager
+def profiled(name: str, reason: str = "manual"):
+  """Profile everything run under capture() inside this block, then store it."""
+  profile = Profile(name, reason)
+  token = _current.set(profile)
+  sampler.start(profile)
+  started = time.perf_counter()
+  try:
+    yield profile
+  finally:
+    profile.elapsed_s = time.perf_counter() - started
+    sampler.stop(profile)
+    _current.reset(token)
+    store.save(profile)
+
+
+_snapshots: "OrderedDict[str, object]" = OrderedDict()
+
+
+def _rss_kib() -> Optional[int]:
+  try:
+    with open("/proc/self/status") as f:
+      for line in f:
+        if line.startswith("VmRSS:"):
+          return int(line.split()[1])
+  except OSError:
+    pass
+  return None
+
+
+def _top(stats, limit: int) -> List[Dict[str, object]]:
+  rows = []
+  for stat in stats[:limit]:
+    frame = stat.traceback[0]
+    row = {"where": f"{frame.filename}:{frame.lineno}", "size_kib": round(stat.size / 1024, 1), "count": stat.count}
+    if hasattr(stat, "size_diff"):
+      row.update(size_diff_kib=round(stat.size_diff / 1024, 1), count_diff=stat.count_diff)
+    rows.append(row)
+  return rows
+
+
+def install(app):
+  """Add the profiling middleware and /admin/profiles and /admin/tracemalloc routes to `app`.
+
+  The admin routes reject every request until PROFILE_ADMIN_TOKEN is set.
+  """
+  import tracemalloc
+  import deadline
+  from fastapi import APIRouter, Depends, Header, HTTPException, Request
+  from fastapi.responses import PlainTextResponse
+
+  deadline.set_task_wrapper(captured)
+  if not PROFILE_ADMIN_TOKEN:
+    print("PROFILE_ADMIN_TOKEN is not set, the /admin profiling endpoints are disabled")
+
+  def admin(x_admin_token: Optional[str] = Header(None)):
+    if not PROFILE_ADMIN_TOKEN:
+      raise HTTPException(status_code=403, detail="Set PROFILE_ADMIN_TOKEN to use the admin endpoints")
+    if x_admin_token != PROFILE_ADMIN_TOKEN:
+      raise HTTPException(status_code=403, detail="Admin token required")
+
+  @app.middleware("http")
+  async def profile_requests(request: Request, call_next):
+    if request.url.path.startswith("/admin/"):
+      return await call_next(request)
+    if request.headers.get("x-profile") or request.query_params.get("profile") == "1":
+      reason = "requested"
+    elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+      reason = "sampled"
+    else:
+      return await call_next(request)
+    with profiled(f"{request.method} {request.url.path}", reason) as profile:
+      response = await call_next(request)
+    response.headers["X-Profile-Id"] = profile.id
+    return response
+
+  router = APIRouter(prefix="/admin", dependencies=[Depends(admin)])
+
+  @router.get("/profiles")
+  def list_profiles():
+    return store.list()
+
+  @router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+  def get_profile(profile_id: str):
+    folded = store.folded(profile_id)
+    if folded is None:
+      raise HTTPException(status_code=404, detail="Unknown profile")
+    return folded
+
+  @router.post("/tracemalloc/start")
+  def tracemalloc_start(frames: int = 25):
+    if not tracemalloc.is_tracing():
+      tracemalloc.start(frames)
+    return {"tracing": True, "rss_kib": _rss_kib()}
+
+  @router.post("/tracemalloc/stop")
+  def tracemalloc_stop():
+    tracemalloc.stop()
+    _snapshots.clear()
+    return {"tracing": False, "rss_kib": _rss_kib()}
+
+  @router.post("/tracemalloc/snapshot")
+  def tracemalloc_snapshot(limit: int = 20):
+    if not tracemalloc.is_tracing():
+      raise HTTPException(status_code=409, detail="tracemalloc is not running, POST /admin/tracemalloc/start first")
+    snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    snapshot_id = uuid.uuid4().hex[:12]
+    _snapshots[snapshot_id] = snapshot
+    while len(_snapshots) > 10:
+      _snapshots.popitem(last=False)
+    traced, peak = tracemalloc.get_traced_memory()
+    return {"id": snapshot_id, "rss_kib": _rss_kib(), "traced_kib": traced // 1024, "peak_kib": peak // 1024,
+            "top": _top(snapshot.statistics("lineno"), limit)}
+
+  @router.get("/tracemalloc/diff")
+  def tracemalloc_diff(base: Optional[str] = None, target: Optional[str] = None, limit: int = 20):
+    ids = list(_snapshots)
+    base, target = base or (ids[-2] if len(ids) > 1 else None), target or (ids[-1] if ids else None)
+    if base not in _snapshots or target not in _snapshots:
+      raise HTTPException(status_code=404, detail="Need two snapshots to diff")
+    return {"base": base, "target": target, "top": _top(_snapshots[target].compare_to(_snapshots[base], "lineno"), limit)}
+
+  app.include_router(router)
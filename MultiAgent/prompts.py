@@ -0,0 +1,103 @@
+from typing import Any, Dict
+
+# Every agent's system prompt starts with the same prefix so provider-side
+# prompt/context caching can reuse it across agents and requests. Keep the
+# static text first and never put per-request values in a prefix.
+SHARED_SYSTEM_PREFIX = """You are one agent in a multi-agent assistant that answers user questions.
+The system can search the web for current information, query a SQL database for structured data, and answer general questions using past conversation memory.
+"""
+
+ROUTING_PREFIX = SHARED_SYSTEM_PREFIX + """
+You are a helpful routing agent. Your job is to analyze the user's question and return one of the following routing decisions based on its intent:
+      1. web - If the user is asking for current information, real-time data, or referencing a specific name (not a user name), location, or entity that may require web access.
+      2. nl2sql - If the user is asking to query a database, fetch structured data, or perform operations that require SQL or database access.
+      3. general - If the user is asking for a general explanation, definition, code sample, or if the question refers to past conversation context or user-specific details stored in memory.
+"""
+
+# Used instead of ROUTING_PREFIX when the router may hand compound questions to the planner.
+ROUTING_PLAN_PREFIX = ROUTING_PREFIX + """      4. plan - If the question has several independent parts that need different sources, for example database figures together with current news.
+"""
+
+ROUTER_SYSTEM = """
+      Instructions:
+      - Return only one of the options listed above.
+      - Do not include any explanation or reasoning in your response.
+      - Base your decision only on the question provided.
+    """
+
+ROUTER_HUMAN = """
+      Query: {query}
+
+      Please provide the appropriate result based on the user query.
+      """
+
+ROUTER_BATCH_SYSTEM = """
+      Instructions:
+      - Return only a JSON array with exactly one of the options listed above per query, in the same order as the queries.
+      - Do not include any explanation or reasoning in your response.
+      - Base each decision only on its own question.
+    """
+
+ROUTER_BATCH_HUMAN = """
+      Queries:
+      {queries}
+
+      Please provide the JSON array of routing decisions.
+      """
+
+WEB_SYSTEM = """You are an helpful agent. Use the user's query and web search result to give appropriate result.
+      """
+
+WEB_HUMAN = """
+      Query: {query}
+      Web Result: {web_result}
+
+      Please provide the appropriate result based on the user query and web search result.
+      """
+
+GENERAL_SYSTEM = """You are an helpful assistant providing response to user's query.
+          Provide only the data that you have or from the context provided, do not hallucinate and generate fake data.
+          """
+
+GENERAL_HUMAN = """
+          Query: {query}
+          Conversation history: {context}
+          Please provide the appropriate result based on the user query and conversation history. If conversation history does not meet with the user query, respond to the query with your knowledge or greet the user ignoring the conversation history.
+          """
+
+PLANNER_SYSTEM = """
+      Instructions:
+      - Split the user's question into independent sub-questions that can each be answered by one agent: web, nl2sql or general.
+      - Keep a question that has only one part as a single sub-question.
+      - Return only a JSON array of objects like {{"question": "...", "route": "web"}}, without any explanation.
+    """
+
+PLANNER_HUMAN = """
+      Query: {query}
+
+      Return at most {max_subtasks} sub-questions.
+      """
+
+SYNTHESIS_SYSTEM = """You are an helpful assistant combining the answers to parts of the user's question into one response.
+          Use only the partial answers provided, do not hallucinate and generate fake data. Say which parts could not be answered.
+          """
+
+SYNTHESIS_HUMAN = """
+          Query: {query}
+          Partial answers: {partials}
+          Please provide one response to the user query based on the partial answers.
+          """
+
+_prompt_cache: Dict[tuple, Any] = {}
+
+
+def build_prompt(system: str, human: str, prefix: str = SHARED_SYSTEM_PREFIX):
+  """Compile a system/human prompt once; identical declarations share one template."""
+  from langchain_core.prompts import ChatPromptTemplate
+  key = (prefix, system, human)
+  if key not in _prompt_cache:
+    _prompt_cache[key] = ChatPromptTemplate.from_messages([
+      ("system", prefix + system),
+      ("human", human),
+    ])
+  return _prompt_cache[key]
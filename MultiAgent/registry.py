@@ -0,0 +1,37 @@
+import threading
+from typing import Any, Callable, Dict
+
+# Long-lived objects (compiled graphs, agents and their clients) built once per
+# process and reused by every request and REPL iteration.
+_instances: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def get(name: str, factory: Callable[[], Any]) -> Any:
+  instance = _instances.get(name)
+  if instance is None:
+    with _lock:
+      instance = _instances.get(name)
+      if instance is None:
+        instance = _instances[name] = factory()
+  return instance
+
+
+def _build_manager():
+  from agents import WorkflowManager
+  return WorkflowManager()
+
+
+def get_manager():
+  """The process-wide MultiAgent WorkflowManager with its compiled graph."""
+  return get("multiagent", _build_manager)
+
+
+def warm_up():
+  """Build the manager on a background thread so startup does not wait for it."""
+  def build():
+    try:
+      get_manager()
+    except Exception as e:
+      print(f"Warm-up failed, the manager will be built on the first request: {e}")
+  threading.Thread(target=build, name="warm-up", daemon=True).start()
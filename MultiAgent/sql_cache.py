@@ -0,0 +1,215 @@
+import os
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "256"))
+SQL_CACHE_MAX_RESULT_CHARS = int(os.getenv("SQL_CACHE_MAX_RESULT_CHARS", "200000"))
+SQL_CACHE_TTL_S = float(os.getenv("SQL_CACHE_TTL_S", "300"))
+# Table versions are looked up at most this often, however many hits there are.
+SQL_CACHE_VERSION_CHECK_S = float(os.getenv("SQL_CACHE_VERSION_CHECK_S", "1.0"))
+
+_TOKEN = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|`[^`]*`|\[[^\]]*\]|[\w$.]+|--[^\n]*|/\*.*?\*/|\S", re.S)
+_CLAUSE_END = {"where", "group", "order", "having", "limit", "union", "on", "using", "join", "inner", "left",
+               "right", "full", "cross", "natural", "window", "offset", "fetch", "for", "into", ")", ";"}
+# Functions whose arguments use FROM without reading a table, e.g. EXTRACT(YEAR FROM d).
+_FROM_FUNCTIONS = {"extract", "trim", "substring", "substr", "position", "overlay"}
+_VOLATILE = re.compile(r"\b(now|rand|random|uuid|sysdate|current_date|current_time|current_timestamp|curdate|curtime|localtime|localtimestamp|last_insert_id)\b", re.I)
+
+_caches = weakref.WeakSet()
+
+
+def normalize_sql(query: str) -> str:
+  """Cache key for `query`: comments dropped, whitespace collapsed and keywords
+  lowercased, with string literals left untouched."""
+  tokens = []
+  for token in _TOKEN.findall(query.strip().rstrip(";")):
+    if token.startswith(("--", "/*")):
+      continue
+    tokens.append(token if token[0] in "'\"`[" else token.lower())
+  return " ".join(tokens)
+
+
+def _unquote(name: str) -> str:
+  return ".".join(part.strip("`\"[]") for part in name.split(".")).lower()
+
+
+def extract_tables(query: str) -> FrozenSet[str]:
+  """Tables read by a SELECT: every FROM/JOIN reference, including comma joins,
+  minus subqueries and CTE names."""
+  tokens = [token for token in _TOKEN.findall(query) if not token.startswith(("--", "/*"))]
+  lowered = [token.lower() for token in tokens]
+  ctes = {lowered[i - 1] for i, token in enumerate(lowered) if token == "as" and i + 1 < len(lowered) and lowered[i + 1] == "(" and i > 0}
+  tables = set()
+  openers = []
+  i = 0
+  while i < len(tokens):
+    if tokens[i] == "(":
+      openers.append(lowered[i - 1] if i else "")
+      i += 1
+    elif tokens[i] == ")":
+      if openers:
+        openers.pop()
+      i += 1
+    elif lowered[i] in ("from", "join") and not (openers and openers[-1] in _FROM_FUNCTIONS):
+      in_from = lowered[i] == "from"
+      i += 1
+      while i < len(tokens) and tokens[i] != "(":
+        tables.add(_unquote(tokens[i]))
+        i += 1
+        # Skip an alias, then continue with the next comma-separated table.
+        while in_from and i < len(tokens) and tokens[i] != "," and lowered[i] not in _CLAUSE_END:
+          i += 1
+        if not in_from or i >= len(tokens) or tokens[i] != ",":
+          break
+        i += 1
+    else:
+      i += 1
+  return frozenset(table for table in tables if table not in ctes)
+
+
+def is_cacheable(normalized: str) -> bool:
+  return normalized.startswith(("select ", "with ")) and not _VOLATILE.search(normalized) and " into " not in normalized
+
+
+class TableVersions:
+  """Cheap change markers for tables: MySQL's information_schema UPDATE_TIME,
+  SQLite's row count. Other dialects have none and rely on the TTL alone, as
+  do tables whose marker is missing (e.g. a NULL UPDATE_TIME after a restart)."""
+  def __init__(self, engine):
+    self.engine = engine
+    self.dialect = engine.dialect.name if engine is not None else ""
+    self._checked: Dict[str, Tuple[float, Any]] = {}
+    self._lock = threading.Lock()
+    self._stats_expiry = True
+
+  def _lookup(self, tables) -> Dict[str, Any]:
+    from sqlalchemy import bindparam, text
+    with self.engine.connect() as conn:
+      if self.dialect == "mysql":
+        if self._stats_expiry:
+          # MySQL 8 otherwise serves UPDATE_TIME from a cache kept for up to a day.
+          try:
+            conn.execute(text("SET SESSION information_schema_stats_expiry = 0"))
+          except Exception:
+            self._stats_expiry = False  # Older servers have no such cache.
+        # extract_tables lowercases names; with lower_case_table_names=0 they are stored as written.
+        names = [table.split(".")[-1] for table in tables]
+        statement = text("SELECT LOWER(TABLE_NAME), UPDATE_TIME FROM information_schema.tables "
+                         "WHERE TABLE_SCHEMA = DATABASE() AND LOWER(TABLE_NAME) IN :names").bindparams(bindparam("names", expanding=True))
+        found = dict(conn.execute(statement, {"names": names}).all())
+        markers = {table: found.get(table.split(".")[-1]) for table in tables}
+        return {table: str(marker) if marker is not None else None for table, marker in markers.items()}
+      if self.dialect == "sqlite":
+        return {table: conn.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar() for table in tables}
+    return {}
+
+  def get(self, tables) -> Optional[Dict[str, Any]]:
+    """Current marker per table, or None when changes to any of them cannot be detected."""
+    if self.dialect not in ("mysql", "sqlite") or not tables:
+      return None
+    now = time.monotonic()
+    with self._lock:
+      stale = [table for table in tables if table not in self._checked or now - self._checked[table][0] > SQL_CACHE_VERSION_CHECK_S]
+    try:
+      fresh = self._lookup(stale) if stale else {}
+    except Exception as e:
+      print(f"Table version check failed: {e}")
+      return None
+    with self._lock:
+      for table, version in fresh.items():
+        self._checked[table] = (now, version)
+      markers = {table: self._checked[table][1] for table in tables if table in self._checked}
+    if len(markers) < len(tables) or any(marker is None for marker in markers.values()):
+      return None
+    return markers
+
+
+class SQLResultCache:
+  """LRU cache of SELECT results keyed by normalized SQL.
+
+  An entry is dropped when it is older than `ttl` or when the change marker
+  of any table it reads differs from the one recorded with it. Statements that
+  are not SELECTs, use volatile functions or read no identifiable table always
+  go to the database.
+  """
+  def __init__(self, engine=None, max_entries: int = SQL_CACHE_MAX_ENTRIES, ttl: float = SQL_CACHE_TTL_S):
+    self.versions = TableVersions(engine)
+    self.max_entries = max_entries
+    self.ttl = ttl
+    self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    self._lock = threading.Lock()
+    self.metrics = {"hits": 0, "misses": 0, "expired": 0, "invalidated": 0, "evicted": 0, "uncacheable": 0}
+    _caches.add(self)
+
+  def _count(self, metric: str):
+    with self._lock:
+      self.metrics[metric] += 1
+
+  def _lookup(self, key: str, tables) -> Optional[Any]:
+    with self._lock:
+      entry = self._entries.get(key)
+    if entry is None:
+      return None
+    if time.time() - entry["created_at"] > self.ttl:
+      self._count("expired")
+    elif entry["versions"] is not None and self.versions.get(tables) != entry["versions"]:
+      self._count("invalidated")
+    else:
+      with self._lock:
+        if key in self._entries:
+          self._entries.move_to_end(key)
+      return entry
+    with self._lock:
+      self._entries.pop(key, None)
+    return None
+
+  def get_or_run(self, query: str, run: Callable[[str], Any]) -> Any:
+    key = normalize_sql(query)
+    tables = extract_tables(query)
+    if not is_cacheable(key) or not tables:
+      self._count("uncacheable")
+      return run(query)
+
+    entry = self._lookup(key, tables)
+    if entry is not None:
+      self._count("hits")
+      return entry["result"]
+
+    self._count("misses")
+    # Read the markers before running so a write in between invalidates the entry.
+    versions = self.versions.get(tables)
+    result = run(query)
+    if len(str(result)) <= SQL_CACHE_MAX_RESULT_CHARS:
+      with self._lock:
+        self._entries[key] = {"result": result, "tables": tables, "versions": versions, "created_at": time.time()}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+          self._entries.popitem(last=False)
+          self.metrics["evicted"] += 1
+    return result
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def stats(self) -> Dict[str, Any]:
+    with self._lock:
+      lookups = self.metrics["hits"] + self.metrics["misses"]
+      return dict(self.metrics, entries=len(self._entries), hit_rate=round(self.metrics["hits"] / lookups, 3) if lookups else 0.0)
+
+
+def stats() -> Dict[str, Any]:
+  """Metrics summed over every live cache in the process."""
+  total: Dict[str, Any] = {}
+  for cache in list(_caches):
+    for name, value in cache.stats().items():
+      if name != "hit_rate":
+        total[name] = total.get(name, 0) + value
+  lookups = total.get("hits", 0) + total.get("misses", 0)
+  total["hit_rate"] = round(total["hits"] / lookups, 3) if lookups else 0.0
+  return total
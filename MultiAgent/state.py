@@ -0,0 +1,84 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Annotated, Any, Dict, List, Mapping, Union
+
+STATE_MAX_MESSAGES = int(os.getenv("STATE_MAX_MESSAGES", "50"))
+
+# Placeholder stored in the message log instead of a copy of the result text;
+# it names the entry in `WorkflowState.results` the message was logged with.
+RESULT_REF = "<result:{}>"
+_RESULT_REF_RE = re.compile(r"<result:(\d+)>")
+
+
+def merge_partials(left: List[Dict[str, Any]], right: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+  """Reducer for sub-task answers arriving from parallel branches.
+
+  Nodes return the whole state, so an update may repeat answers already
+  merged; keying by sub-task index keeps each answer once, in plan order.
+  """
+  by_index = {partial["index"]: partial for partial in left}
+  by_index.update((partial["index"], partial) for partial in right)
+  return [by_index[index] for index in sorted(by_index)]
+
+
+@dataclass(slots=True)
+class WorkflowState:
+  """State shared by every workflow graph in this repo.
+
+  Fields are typed instead of a free-form `data` dict, and the message log is
+  bounded to STATE_MAX_MESSAGES entries. Agents record their answer with
+  `set_result`, which keeps it in `results` and logs a reference to that
+  entry; an answer equal to the previous one reuses its entry, and entries
+  leave `results` when the messages referring to them are trimmed.
+  `route` is set when the route was decided before the graph ran, for example
+  by the batch runner, and routers skip classification when it is present;
+  the main router also records its decision there.
+  `feedback`, `attempts`, `node_inputs` and `node_runs` belong to retry loops:
+  what the last failed validation said, the output of every iteration, the
+  input fingerprint each node last ran with and how often each node ran.
+  `subtasks` and `partials` belong to planner mode: the sub-questions a query
+  was split into and their answers, merged as parallel branches finish.
+  """
+  user_message: str = ""
+  messages: List[str] = field(default_factory=list)
+  current_state: str = ""
+  route: str = ""
+  result: str = ""
+  results: Dict[str, str] = field(default_factory=dict)
+  query_type: str = ""
+  final_response: str = ""
+  iteration_counter: int = 0
+  feedback: str = ""
+  attempts: List[Dict[str, Any]] = field(default_factory=list)
+  node_inputs: Dict[str, str] = field(default_factory=dict)
+  node_runs: Dict[str, int] = field(default_factory=dict)
+  deadline: float = 0.0
+  degraded: List[str] = field(default_factory=list)
+  subtasks: List[Dict[str, Any]] = field(default_factory=list)
+  partials: Annotated[List[Dict[str, Any]], merge_partials] = field(default_factory=list)
+
+  def add_message(self, msg: str):
+    self.messages.append(msg)
+    if len(self.messages) > STATE_MAX_MESSAGES:
+      del self.messages[:len(self.messages) - STATE_MAX_MESSAGES]
+      if self.results:
+        referenced = {ref for msg in self.messages for ref in _RESULT_REF_RE.findall(msg)}
+        self.results = {ref: value for ref, value in self.results.items() if ref in referenced}
+
+  def set_result(self, name: str, result: str, label: str = ""):
+    self.result = result
+    last = next(reversed(self.results), None)
+    if last is None or self.results[last] != result:
+      last = str(int(last) + 1) if last is not None else "0"
+      self.results[last] = result
+    self.add_message(f"{name}: {label}{RESULT_REF.format(last)}")
+
+
+def render_messages(state: Union[WorkflowState, Mapping[str, Any]]) -> List[str]:
+  """Message log with result references expanded, for display."""
+  if isinstance(state, Mapping):
+    messages, results = state.get("messages", []), state.get("results", {})
+  else:
+    messages, results = state.messages, state.results
+  return [_RESULT_REF_RE.sub(lambda ref: results.get(ref.group(1), ""), msg) for msg in messages]
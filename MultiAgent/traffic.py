@@ -0,0 +1,215 @@
+import argparse
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import percentile
+
+# "capture" logs every /chat request with the external responses it needed;
+# "replay" answers external calls from that log instead of the network.
+TRAFFIC_MODE = os.getenv("TRAFFIC_MODE", "off").lower()
+TRAFFIC_LOG = os.getenv("TRAFFIC_LOG", "./traffic.jsonl")
+# Replayed external calls sleep for their recorded latency times this factor.
+TRAFFIC_REPLAY_LATENCY_SCALE = float(os.getenv("TRAFFIC_REPLAY_LATENCY_SCALE", "1.0"))
+
+CAPTURING = TRAFFIC_MODE == "capture"
+REPLAYING = TRAFFIC_MODE == "replay"
+
+_current: contextvars.ContextVar[Optional["Recording"]] = contextvars.ContextVar("traffic", default=None)
+_write_lock = threading.Lock()
+
+
+class ReplayMiss(Exception):
+  pass
+
+
+def active() -> bool:
+  """Whether the current request is being captured or replayed.
+
+  Memos and result caches are bypassed for such requests, so a capture records
+  every external call the request needs and a replay measures those calls
+  rather than whatever the caches hold.
+  """
+  return _current.get() is not None
+
+
+def call_key(*parts: Any) -> str:
+  return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+
+class Recording:
+  """One /chat request and the external calls made while serving it."""
+  def __init__(self, query: str, priority: str = "normal", timeout_ms: Optional[int] = None, record: Dict[str, Any] = None):
+    self.record = record or {"id": uuid.uuid4().hex, "ts": time.time(), "query": query, "priority": priority,
+                             "timeout_ms": timeout_ms, "calls": []}
+    self._lock = threading.Lock()
+    # Replay state: calls by key, and a cursor per kind for inputs that changed.
+    self._by_key: Dict[tuple, List[Dict[str, Any]]] = {}
+    self._cursor: Dict[str, int] = {}
+    for call in self.record["calls"]:
+      self._by_key.setdefault((call["kind"], call["key"]), []).append(call)
+
+  @property
+  def id(self) -> str:
+    return self.record["id"]
+
+  def add(self, kind: str, key: str, response: Any, elapsed: float):
+    with self._lock:
+      self.record["calls"].append({"kind": kind, "key": key, "response": response, "elapsed_ms": round(elapsed * 1000, 1)})
+
+  def find(self, kind: str, key: str) -> Dict[str, Any]:
+    """The recorded call with this key, else the next recorded call of this kind."""
+    with self._lock:
+      calls = self._by_key.get((kind, key))
+      if calls:
+        return calls.pop(0) if len(calls) > 1 else calls[0]
+      of_kind = [call for call in self.record["calls"] if call["kind"] == kind]
+      cursor = self._cursor.get(kind, 0)
+      if cursor >= len(of_kind):
+        raise ReplayMiss(f"No recorded {kind} call left for request {self.id}")
+      self._cursor[kind] = cursor + 1
+      return of_kind[cursor]
+
+
+def external(kind: str, key: str, fn: Callable[[], Any], encode: Callable[[Any], Any] = None,
+             decode: Callable[[Any], Any] = None) -> Any:
+  """Run an external call, recording or replaying it when the request is.
+
+  `encode` turns the result into JSON for the log and `decode` turns it back.
+  Outside capture and replay this is a ContextVar read and a call to `fn`.
+  """
+  recording = _current.get()
+  if recording is None:
+    return fn()
+  if REPLAYING:
+    call = recording.find(kind, key)
+    if TRAFFIC_REPLAY_LATENCY_SCALE:
+      time.sleep(call["elapsed_ms"] / 1000 * TRAFFIC_REPLAY_LATENCY_SCALE)
+    return decode(call["response"]) if decode else call["response"]
+  started = time.perf_counter()
+  result = fn()
+  recording.add(kind, key, encode(result) if encode else result, time.perf_counter() - started)
+  return result
+
+
+_replay_index: Optional[Dict[str, Dict[str, Any]]] = None
+
+
+def load_log(path: str = TRAFFIC_LOG) -> List[Dict[str, Any]]:
+  with open(path) as f:
+    return [json.loads(line) for line in f if line.strip()]
+
+
+def _replay_record(replay_id: str) -> Dict[str, Any]:
+  global _replay_index
+  with _write_lock:
+    if _replay_index is None:
+      _replay_index = {record["id"]: record for record in load_log(TRAFFIC_LOG)}
+  if replay_id not in _replay_index:
+    raise ReplayMiss(f"Request {replay_id} is not in {TRAFFIC_LOG}")
+  return _replay_index[replay_id]
+
+
+@contextmanager
+def recording(query: str, priority: str = "normal", timeout_ms: Optional[int] = None, replay_id: Optional[str] = None):
+  """Capture or replay the external calls of one request, depending on TRAFFIC_MODE.
+
+  Yields the Recording (None when traffic mode is off); set `route` (from the
+  final state), `status` or `elapsed_ms` on its record before the block ends to
+  have them logged.
+  """
+  if not (CAPTURING or (REPLAYING and replay_id)):
+    yield None
+    return
+  current = Recording(query, priority, timeout_ms, _replay_record(replay_id) if REPLAYING else None)
+  token = _current.set(current)
+  started = time.perf_counter()
+  try:
+    yield current
+  finally:
+    _current.reset(token)
+    if CAPTURING:
+      current.record.setdefault("route", None)
+      current.record.setdefault("elapsed_ms", round((time.perf_counter() - started) * 1000, 1))
+      with _write_lock, open(TRAFFIC_LOG, "a") as f:
+        f.write(json.dumps(current.record, default=str) + "\n")
+
+
+def replay(path: str, url: str = "http://127.0.0.1:8000", speed: float = 1.0, concurrency: int = 64,
+           limit: Optional[int] = None) -> Dict[str, Any]:
+  """Send the captured requests to a server running with TRAFFIC_MODE=replay.
+
+  Requests keep their original inter-arrival times divided by `speed`
+  (0 sends them back to back), so bursts in production stay bursts here.
+  """
+  import httpx
+  from concurrent.futures import ThreadPoolExecutor
+
+  records = sorted(load_log(path), key=lambda record: record["ts"])[:limit]
+  if not records:
+    raise ValueError(f"No requests captured in {path}")
+  latencies: List[float] = []
+  statuses: Dict[str, int] = {}
+  lock = threading.Lock()
+  client = httpx.Client(base_url=url, timeout=120.0, limits=httpx.Limits(max_connections=concurrency))
+
+  def send(record: Dict[str, Any]):
+    started = time.perf_counter()
+    try:
+      body = {"user_query": record["query"], "priority": record.get("priority", "normal"), "timeout_ms": record.get("timeout_ms")}
+      status = str(client.post("/chat", json=body, headers={"X-Replay-Id": record["id"]}).status_code)
+    except Exception as e:
+      status = type(e).__name__
+    with lock:
+      latencies.append((time.perf_counter() - started) * 1000)
+      statuses[status] = statuses.get(status, 0) + 1
+
+  first_ts = records[0]["ts"]
+  started = time.perf_counter()
+  with ThreadPoolExecutor(max_workers=concurrency) as pool:
+    for record in records:
+      if speed:
+        delay = (record["ts"] - first_ts) / speed - (time.perf_counter() - started)
+        if delay > 0:
+          time.sleep(delay)
+      pool.submit(send, record)
+  elapsed = time.perf_counter() - started
+  client.close()
+
+  summary = {
+    "requests": len(records),
+    "statuses": statuses,
+    "elapsed_s": round(elapsed, 2),
+    "requests_per_s": round(len(records) / elapsed, 2),
+    "latency_p50_ms": round(percentile(latencies, 50), 1),
+    "latency_p95_ms": round(percentile(latencies, 95), 1),
+    "latency_p99_ms": round(percentile(latencies, 99), 1),
+  }
+  print(json.dumps(summary))
+  return summary
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Replay captured /chat traffic against a server started with TRAFFIC_MODE=replay")
+  parser.add_argument("log", nargs="?", default=TRAFFIC_LOG, help="traffic log written with TRAFFIC_MODE=capture")
+  parser.add_argument("--url", default="http://127.0.0.1:8000")
+  parser.add_argument("--speed", type=float, default=1.0, help="inter-arrival time divisor, 0 for back to back")
+  parser.add_argument("--concurrency", type=int, default=64)
+  parser.add_argument("--limit", type=int, default=None, help="replay only the first N requests")
+  parser.add_argument("--output", help="also write the summary as JSON, to compare builds")
+  args = parser.parse_args()
+
+  summary = replay(args.log, args.url, args.speed, args.concurrency, args.limit)
+  if args.output:
+    with open(args.output, "w") as f:
+      json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+  main()
@@ -1,10 +1,41 @@
 from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
 from langchain_community.tools import DuckDuckGoSearchResults
 from typing import List, Dict, Any
+from deadline import call_with_deadline, has_budget
+from page_fetch import WEB_DEEP_READ, get_fetcher
+import traffic
+import threading
+import os
 import re
 
+# deep_search stops issuing query variants and timeframes once this many
+# distinct results score at least WEB_STOP_MIN_SCORE; 0 always runs every call.
+WEB_STOP_MIN_RESULTS = int(os.getenv("WEB_STOP_MIN_RESULTS", "8"))
+WEB_STOP_MIN_SCORE = int(os.getenv("WEB_STOP_MIN_SCORE", "4"))
+
+def relevance_score(result: Dict[str, Any], query: str) -> int:
+  """Word overlap of the query with a result's title (weighted 3x) and snippet,
+  plus a bonus where the whole query appears."""
+  query = query.lower()
+  query_words = set(query.split())
+  title = result.get('title', '').lower()
+  snippet = result.get('snippet', '').lower()
+  
+  score = len(query_words.intersection(title.split())) * 3
+  score += len(query_words.intersection(snippet.split()))
+  if query in title:
+    score += 5
+  if query in snippet:
+    score += 3
+  return score
+
 class EnhancedWebSearch:
-  def __init__(self):
+  def __init__(self, stop_min_results: int = WEB_STOP_MIN_RESULTS, stop_min_score: int = WEB_STOP_MIN_SCORE):
+    self.stop_min_results = stop_min_results
+    self.stop_min_score = stop_min_score
+    self.stats = {"searches": 0, "calls": 0, "calls_saved": 0, "stopped_early": 0}
+    self._stats_lock = threading.Lock()
+    
     self.wrapper = DuckDuckGoSearchAPIWrapper(
       time="d",           # Last day for current info
       max_results=30,     
@@ -62,48 +93,85 @@ class EnhancedWebSearch:
     
     return enhanced_queries[:3]
   
-  def multi_timeframe_search(self, query: str) -> List[Dict[str, Any]]:
-    all_results = []
-    
+  def _timeframe_search(self, query: str, timeframe: str, deadline: float = 0.0) -> List[Dict[str, Any]]:
+    search = self.search if timeframe == 'daily' else self.search_week
     try:
-      daily_results = self.search.invoke(query)
-      if daily_results:
-        for result in daily_results:
-          result['timeframe'] = 'daily'
-        all_results.extend(daily_results)
+      results = call_with_deadline(deadline, search.invoke, query, kind="search") or []
     except Exception as e:
-      print(f"Daily search failed: {e}")
+      print(f"{timeframe.capitalize()} search failed: {e}")
+      return []
+    for result in results:
+      result['timeframe'] = timeframe
+    return results if timeframe == 'daily' else results[:10]
+  
+  def multi_timeframe_search(self, query: str, deadline: float = 0.0, degraded: List[str] = None) -> List[Dict[str, Any]]:
+    all_results = self._timeframe_search(query, 'daily', deadline)
     
-    try:
-      weekly_results = self.search_week.invoke(query)
-      if weekly_results:
-        for result in weekly_results:
-          result['timeframe'] = 'weekly'
-        all_results.extend(weekly_results[:10])
-    except Exception as e:
-      print(f"Weekly search failed: {e}")
+    if not has_budget(deadline, "search") and all_results:
+      if degraded is not None:
+        degraded.append("weekly_search")
+      return all_results
     
+    all_results.extend(self._timeframe_search(query, 'weekly', deadline))
     return all_results
   
-  def deep_search(self, query: str) -> List[Dict[str, Any]]:
+  def target_met(self, results: List[Dict[str, Any]], query: str) -> bool:
+    """Whether enough results score well against the query to stop searching."""
+    if self.stop_min_results <= 0:
+      return False
+    good = sum(1 for result in results if relevance_score(result, query) >= self.stop_min_score)
+    return good >= self.stop_min_results
+  
+  def deep_search(self, query: str, deadline: float = 0.0, degraded: List[str] = None, stats: Dict[str, int] = None) -> List[Dict[str, Any]]:
+    """Search the query variants across timeframes, stopping once the results are good enough.
+
+    Calls run in order (each variant daily, then weekly) and the collected
+    results are scored after each one; once `target_met`, the remaining calls
+    are skipped and counted as saved in `stats` and `self.stats`.
+    """
     all_results = []
     seen_urls = set()
     enhanced_queries = self.enhance_query(query)
-    
-    for enhanced_query in enhanced_queries:
-      try:
-        results = self.multi_timeframe_search(enhanced_query)
-        for result in results:
-          if isinstance(result, dict) and 'link' in result:
-            if result['link'] not in seen_urls:
-              seen_urls.add(result['link'])
-              result['query_variation'] = enhanced_query
-              all_results.append(result)
-          
-      except Exception as e:
-        print(f"Search failed for query '{enhanced_query}': {e}")
+    plan = [(variant, timeframe) for variant in enhanced_queries for timeframe in ('daily', 'weekly')]
+    made = saved = 0
+    variant_found = 0
+    
+    for n, (enhanced_query, timeframe) in enumerate(plan):
+      if self.target_met(all_results, query):
+        saved = len(plan) - n
+        break
+      if timeframe == 'daily':
+        variant_found = 0
+        if n > 0 and not has_budget(deadline, "search_variant"):
+          # The original query has been searched, the variants are optional.
+          if degraded is not None:
+            degraded.append(f"query_variants({len(enhanced_queries) - n // 2} skipped)")
+          break
+      elif variant_found and not has_budget(deadline, "search"):
+        if degraded is not None:
+          degraded.append("weekly_search")
         continue
       
+      results = self._timeframe_search(enhanced_query, timeframe, deadline)
+      made += 1
+      variant_found += len(results)
+      for result in results:
+        if isinstance(result, dict) and 'link' in result:
+          if result['link'] not in seen_urls:
+            seen_urls.add(result['link'])
+            result['query_variation'] = enhanced_query
+            all_results.append(result)
+    
+    with self._stats_lock:
+      self.stats["searches"] += 1
+      self.stats["calls"] += made
+      self.stats["calls_saved"] += saved
+      self.stats["stopped_early"] += 1 if saved else 0
+    if stats is not None:
+      stats.update(calls=made, calls_saved=saved, planned=len(plan))
+    if saved:
+      print(f"Search target met after {made} of {len(plan)} calls, {saved} saved")
+      
     all_results.sort(key=lambda x: (
         x.get('timeframe') == 'daily',  # Daily results first
         query.lower() in x.get('title', '').lower(),  # Title matches
@@ -116,45 +184,41 @@ class EnhancedWebSearch:
     if not results:
       return []
     
-    query_words = set(query.lower().split())
     filtered_results = []
     
     for result in results:
       if not isinstance(result, dict):
         continue
-          
-      title = result.get('title', '').lower()
-      snippet = result.get('snippet', '').lower()
-      relevance_score = 0
-      
-      title_words = set(title.split())
-      title_overlap = len(query_words.intersection(title_words))
-      relevance_score += title_overlap * 3
       
-      snippet_words = set(snippet.split())
-      snippet_overlap = len(query_words.intersection(snippet_words))
-      relevance_score += snippet_overlap
-      
-      if query.lower() in title:
-        relevance_score += 5
-      if query.lower() in snippet:
-        relevance_score += 3
-      
-      if relevance_score > 0:
-        result['relevance_score'] = relevance_score
+      score = relevance_score(result, query)
+      if score > 0:
+        result['relevance_score'] = score
         filtered_results.append(result)
     
     filtered_results.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
     
     return filtered_results
   
-  def invoke(self, query: str) -> List[Dict[str, Any]]:
+  def search_stats(self) -> Dict[str, Any]:
+    with self._stats_lock:
+      searches = self.stats["searches"]
+      return dict(self.stats, saved_per_search=round(self.stats["calls_saved"] / searches, 2) if searches else 0.0)
+  
+  def invoke(self, query: str, deadline: float = 0.0, degraded: List[str] = None, deep_read: bool = None) -> List[Dict[str, Any]]:
       """Main search method with enhanced capabilities"""
+      deep_read = WEB_DEEP_READ if deep_read is None else deep_read
+      return traffic.external("search", traffic.call_key(query, deep_read), lambda: self._invoke(query, deadline, degraded, deep_read))
+  
+  def _invoke(self, query: str, deadline: float, degraded: List[str], deep_read: bool) -> List[Dict[str, Any]]:
       print(f"Performing enhanced search for: {query}")
-      raw_results = self.deep_search(query)
+      raw_results = self.deep_search(query, deadline, degraded)
       filtered_results = self.filter_relevant_results(raw_results, query)
       print(f"Found {len(filtered_results)} relevant results")
       
+      if deep_read:
+        # Snippets are short; read the top pages for passages that answer the query.
+        filtered_results = get_fetcher().deep_read(filtered_results, query, deadline=deadline, degraded=degraded)
+      
       return filtered_results
 
 
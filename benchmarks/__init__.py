@@ -0,0 +1,27 @@
+"""Benchmarks and demos for the MultiAgent modules.
+
+Run one from the repo root with `python -m benchmarks.<name>`, e.g.
+`python -m benchmarks.router_batching`.
+"""
+import os
+import sys
+
+MULTIAGENT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "MultiAgent")
+
+# The MultiAgent modules import each other by bare name, as main.py does.
+if MULTIAGENT not in sys.path:
+  sys.path.insert(0, MULTIAGENT)
+
+
+def linear_graph(schema, node, steps: int):
+  """Compiled-ready StateGraph that runs `node` `steps` times in a row."""
+  from langgraph.graph import StateGraph, START, END
+
+  graph = StateGraph(schema)
+  previous = START
+  for i in range(steps):
+    graph.add_node(f"step{i}", node)
+    graph.add_edge(previous, f"step{i}")
+    previous = f"step{i}"
+  graph.add_edge(previous, END)
+  return graph
@@ -0,0 +1,79 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from admission import PRIORITIES, AdmissionController, AdmissionRejected
+from metrics import percentile
+
+BASE_LATENCY = {"web": 0.20, "nl2sql": 0.10, "general": 0.05}
+CAPACITY = {"web": 4, "nl2sql": 8, "general": 16}
+
+
+class StubBackends:
+  """Backends that slow down as more calls overlap, like a saturated search API or LLM quota."""
+  def __init__(self, base_latency: Dict[str, float] = BASE_LATENCY, capacity: Dict[str, int] = CAPACITY):
+    self.base_latency = base_latency
+    self.capacity = capacity
+    self.active = {route: 0 for route in base_latency}
+    self._lock = threading.Lock()
+
+  def call(self, route: str):
+    with self._lock:
+      self.active[route] += 1
+      load = self.active[route]
+    time.sleep(self.base_latency[route] * max(1.0, load / self.capacity[route]))
+    with self._lock:
+      self.active[route] -= 1
+
+
+def run_load(controller: Optional[AdmissionController], requests: int, arrival_rate: float,
+             backends: StubBackends = None, seed: int = 7) -> Tuple[List[float], Dict[str, int]]:
+  """Open-loop traffic at `arrival_rate`/s; latencies (seconds) of served requests and outcome counts."""
+  backends = backends or StubBackends()
+  rng = random.Random(seed)
+  plan = [(rng.choice(["web", "web", "nl2sql", "general"]), rng.choice(list(PRIORITIES))) for _ in range(requests)]
+  latencies, outcomes = [], {"ok": 0, "degraded": 0, "rejected": 0}
+  lock = threading.Lock()
+
+  def one(route, priority):
+    started = time.perf_counter()
+    try:
+      if controller is None:
+        backends.call(route)
+        outcome = "ok"
+      else:
+        with controller.admit(priority):
+          with controller.route_slot(route) as granted:
+            backends.call(granted)
+            outcome = "degraded" if granted != route else "ok"
+    except AdmissionRejected:
+      with lock:
+        outcomes["rejected"] += 1
+      return
+    with lock:
+      outcomes[outcome] += 1
+      latencies.append(time.perf_counter() - started)
+
+  with ThreadPoolExecutor(max_workers=requests) as pool:
+    for route, priority in plan:
+      pool.submit(one, route, priority)
+      time.sleep(1 / arrival_rate)
+  return latencies, outcomes
+
+
+def load_test(requests: int = 300, arrival_rate: float = 100.0):
+  """Send open-loop stub traffic at the controller and report tail latency of admitted requests.
+
+  Without admission control every request pays for the burst on the stub backends.
+  """
+  for label, controller in [("no admission", None), ("admission", AdmissionController(max_concurrent=16, max_queue=32, max_wait=1.0))]:
+    latencies, outcomes = run_load(controller, requests, arrival_rate)
+    print(f"{label:>13}: p50={percentile(latencies, 50) * 1000:.0f}ms p99={percentile(latencies, 99) * 1000:.0f}ms {outcomes}")
+    if controller:
+      print(f"{'':>13}  {controller.stats()}")
+
+
+if __name__ == "__main__":
+  load_test()
@@ -0,0 +1,34 @@
+import os
+import tempfile
+import time
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from benchmarks import linear_graph
+from checkpointing import get_checkpointer, run_config
+from state import WorkflowState
+
+
+def benchmark(steps: int = 5, iterations: int = 300, result_size: int = 2000):
+  """Per-step cost of checkpoint writes: no checkpointer, in-memory and SQLite."""
+  def node(state: WorkflowState) -> WorkflowState:
+    state.set_result("Agent", "x" * result_size)
+    return state
+
+  graph = linear_graph(WorkflowState, node, steps)
+
+  with tempfile.TemporaryDirectory() as tmp:
+    savers = [("none", None), ("memory", InMemorySaver()), ("sqlite", get_checkpointer(os.path.join(tmp, "bench.sqlite")))]
+    baseline = None
+    for label, saver in savers:
+      workflow = graph.compile(checkpointer=saver)
+      started = time.perf_counter()
+      for i in range(iterations):
+        workflow.invoke(WorkflowState(user_message="q"), run_config(f"bench-{i}") if saver else None)
+      per_step = (time.perf_counter() - started) / iterations / steps * 1e6
+      baseline = baseline or per_step
+      print(f"{label:>7}: {per_step:.0f} us/step (+{per_step - baseline:.0f} us checkpoint overhead)")
+
+
+if __name__ == "__main__":
+  benchmark()
@@ -0,0 +1,41 @@
+import random
+import time
+
+from keyword_router import KeywordRouter
+
+
+def benchmark(message_words: int = 5000, iterations: int = 20):
+  """Compare the compiled router with the old `any(key in msg ...)` loops.
+
+  The message contains no keywords, the worst case for the old loops, which
+  scan the whole message once per keyword.
+  """
+  random.seed(3)
+  alphabet = "abcdefghijklmnopqrstuvwxyz"
+
+  def word():
+    return "".join(random.choice(alphabet) for _ in range(random.randint(4, 9)))
+
+  message = " ".join(word() for _ in range(message_words))
+  for keywords_per_route in (20, 200, 2000):
+    billing = ["#" + word() for _ in range(keywords_per_route)]
+    technical = ["#" + word() for _ in range(keywords_per_route)]
+    router = KeywordRouter({"Billing": billing, "Technical": technical}, default="General")
+
+    def old_loops(user_msg):
+      if any(key in user_msg for key in billing):
+        return "Billing"
+      elif any(key in user_msg for key in technical):
+        return "Technical"
+      return "General"
+
+    for label, fn in [("any() loops", old_loops), ("KeywordRouter", router.classify)]:
+      started = time.perf_counter()
+      for _ in range(iterations):
+        fn(message.lower())
+      elapsed = time.perf_counter() - started
+      print(f"{keywords_per_route * 2:>5} keywords, {message_words} words, {label:>13}: {elapsed / iterations * 1000:.2f} ms/message")
+
+
+if __name__ == "__main__":
+  benchmark()
@@ -0,0 +1,39 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.runnables import RunnableLambda
+
+from llm_gateway import LLM_HEDGE_MIN_SAMPLES, HedgedLLM
+from metrics import percentile
+
+
+def demo(requests: int = 400, concurrency: int = 16):
+  """Tail latency with and without hedging, against a fake model with a slow tail."""
+  rng = random.Random(7)
+
+  def fake_model(prompt):
+    # 94% of calls take 40-80 ms, the rest stall for 1-2 s.
+    time.sleep(rng.uniform(0.04, 0.08) if rng.random() < 0.94 else rng.uniform(1.0, 2.0))
+    return f"answer to {prompt}"
+
+  for label, hedge in [("unhedged", False), ("hedged", True)]:
+    llm = HedgedLLM(RunnableLambda(fake_model), label, hedge=hedge)
+    for i in range(LLM_HEDGE_MIN_SAMPLES):
+      llm.invoke(f"warm-up {i}")
+    latencies = []
+
+    def timed(i):
+      started = time.perf_counter()
+      llm.invoke(f"question {i}")
+      latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+      list(pool.map(timed, range(requests)))
+    pct = lambda p: percentile(latencies, p) * 1000
+    print(f"{label:>9}: p50 {pct(50):.0f} ms, p95 {pct(95):.0f} ms, p99 {pct(99):.0f} ms, "
+          f"hedges {llm.stats.hedges} ({llm.stats.hedges / llm.stats.calls:.0%} extra calls), hedge wins {llm.stats.hedge_wins}")
+
+
+if __name__ == "__main__":
+  demo()
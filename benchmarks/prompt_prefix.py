@@ -0,0 +1,34 @@
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+
+from prompts import ROUTER_HUMAN, ROUTER_SYSTEM, ROUTING_PREFIX, build_prompt
+
+
+def benchmark(iterations: int = 2000):
+  """Per-request overhead of rebuilding the prompt and chain versus reusing a prebuilt one."""
+  llm = FakeListChatModel(responses=["general"])
+  inputs = {"query": "What is the capital of France?"}
+
+  def rebuilt():
+    prompt = ChatPromptTemplate.from_messages([("system", ROUTING_PREFIX + ROUTER_SYSTEM), ("human", ROUTER_HUMAN)])
+    chain = prompt | llm
+    return chain.invoke(inputs)
+
+  prebuilt_chain = build_prompt(ROUTER_SYSTEM, ROUTER_HUMAN, ROUTING_PREFIX) | llm
+
+  def prebuilt():
+    return prebuilt_chain.invoke(inputs)
+
+  for label, fn in [("rebuilt per request", rebuilt), ("prebuilt", prebuilt)]:
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+      fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>20}: {elapsed / iterations * 1e6:.0f} us/request")
+
+
+if __name__ == "__main__":
+  benchmark()
@@ -0,0 +1,44 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from batching import MicroBatcher
+from metrics import percentile
+
+
+def benchmark(concurrency: int = 32, requests: int = 256, base_latency: float = 0.2, per_item: float = 0.005, llm_slots: int = 4):
+  """Compare throughput and tail latency of router calls with a fake LLM.
+
+  The fake LLM takes `base_latency + per_item * n` seconds per call and only
+  serves `llm_slots` calls at once, mimicking a provider quota.
+  """
+  slots = threading.Semaphore(llm_slots)
+
+  def fake_llm(queries: List[str]) -> List[str]:
+    with slots:
+      time.sleep(base_latency + per_item * len(queries))
+    return ["general"] * len(queries)
+
+  configs = [(1, 0.0), (4, 0.005), (8, 0.010), (16, 0.015), (32, 0.020)]
+  print(f"{'batch':>5} {'wait_ms':>7} {'req/s':>8} {'p50_ms':>8} {'p99_ms':>8} {'avg_batch':>9}")
+  for max_batch_size, max_wait in configs:
+    batcher = MicroBatcher(fake_llm, max_batch_size=max_batch_size, max_wait=max_wait, max_concurrency=llm_slots * 2)
+    latencies = []
+
+    def one(i):
+      started = time.perf_counter()
+      batcher.submit(f"query {i}")
+      latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+      list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    print(f"{max_batch_size:>5} {max_wait * 1000:>7.0f} {requests / elapsed:>8.1f} "
+          f"{percentile(latencies, 50) * 1000:>8.0f} {percentile(latencies, 99) * 1000:>8.0f} "
+          f"{batcher.stats()['avg_batch_size']:>9.1f}")
+
+
+if __name__ == "__main__":
+  benchmark()
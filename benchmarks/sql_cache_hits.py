@@ -0,0 +1,45 @@
+import os
+import tempfile
+import time
+
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import text
+
+from sql_cache import SQL_CACHE_VERSION_CHECK_S, SQLResultCache, extract_tables
+
+
+def demo(repeats: int = 200):
+  """Repeated dashboard queries on SQLite, with and without the cache."""
+  with tempfile.TemporaryDirectory() as tmp:
+    db = SQLDatabase.from_uri(f"sqlite:///{os.path.join(tmp, 'demo.db')}")
+    with db._engine.begin() as conn:
+      conn.execute(text("CREATE TABLE Track (TrackId INTEGER PRIMARY KEY, GenreId INTEGER, Milliseconds INTEGER)"))
+      conn.execute(text("CREATE TABLE Genre (GenreId INTEGER PRIMARY KEY, Name TEXT)"))
+      conn.execute(text("INSERT INTO Genre VALUES (1, 'Rock'), (2, 'Jazz'), (3, 'Metal')"))
+      for i in range(20000):
+        conn.execute(text("INSERT INTO Track VALUES (:i, :g, :ms)"), {"i": i, "g": i % 3 + 1, "ms": 180000 + i})
+
+    queries = [
+      "SELECT g.Name, COUNT(*) FROM Track t JOIN Genre g ON t.GenreId = g.GenreId GROUP BY g.Name;",
+      "select   AVG(Milliseconds) from Track where GenreId = 2",
+      "SELECT Name FROM Genre ORDER BY Name",
+    ]
+    cache = SQLResultCache(db._engine)
+    for label, run in [("uncached", db.run), ("cached", lambda q: cache.get_or_run(q, db.run))]:
+      started = time.perf_counter()
+      for i in range(repeats):
+        run(queries[i % len(queries)])
+      print(f"{label:>9}: {(time.perf_counter() - started) / repeats * 1000:.2f} ms/query")
+    print(f"   tables: {sorted(extract_tables(queries[0]))}")
+
+    before = cache.get_or_run(queries[2], db.run)
+    with db._engine.begin() as conn:
+      conn.execute(text("INSERT INTO Genre VALUES (4, 'Blues')"))
+    time.sleep(SQL_CACHE_VERSION_CHECK_S)
+    after = cache.get_or_run(queries[2], db.run)
+    print(f"    write: {before} -> {after}")
+    print(f"  metrics: {cache.stats()}")
+
+
+if __name__ == "__main__":
+  demo()
@@ -0,0 +1,96 @@
+"""Cold-start time of the API and CLI, with the slowest imports from `-X importtime`."""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from benchmarks import MULTIAGENT
+
+# The probes import main the way uvicorn does, from inside MultiAgent.
+HERE = MULTIAGENT
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+# Each probe prints a JSON dict of elapsed seconds for its phases.
+PROBES = {
+  "api": """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from registry import get_manager
+result = {"import_s": imported - started}
+try:
+  get_manager()
+  result["ready_s"] = time.perf_counter() - started
+  if QUERY:
+    from fastapi.testclient import TestClient
+    with TestClient(main.app) as client:
+      client.post("/chat", json={"user_query": QUERY})
+    result["first_request_s"] = time.perf_counter() - started
+except Exception as e:
+  result["error"] = f"{type(e).__name__}: {e}"
+print(json.dumps(result))
+""",
+  "cli": """
+import json, time
+started = time.perf_counter()
+import main
+from registry import get_manager
+result = {"import_s": time.perf_counter() - started}
+try:
+  manager = get_manager()
+  result["ready_s"] = time.perf_counter() - started
+  if QUERY:
+    manager.run(QUERY)
+    result["first_request_s"] = time.perf_counter() - started
+except Exception as e:
+  result["error"] = f"{type(e).__name__}: {e}"
+print(json.dumps(result))
+""",
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+  """(module, self us, cumulative us) for each line of `-X importtime` output."""
+  rows = []
+  for line in stderr.splitlines():
+    match = _IMPORTTIME_LINE.match(line)
+    if match:
+      rows.append((match.group(4), int(match.group(1)), int(match.group(2))))
+  return rows
+
+
+def run_probe(mode: str, query: str) -> Dict[str, object]:
+  code = f"QUERY = {query!r}\n" + PROBES[mode]
+  proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=HERE, capture_output=True, text=True)
+  rows = parse_importtime(proc.stderr)
+  lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+  result = json.loads(lines[-1]) if lines else {"error": proc.stderr.strip().splitlines()[-1:]}
+  result["top_imports"] = [(module, round(cumulative / 1000, 1)) for module, _, cumulative in sorted(rows, key=lambda row: -row[2]) if "." not in module][:8]
+  return result
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Measure cold start of the API and CLI with -X importtime")
+  parser.add_argument("--query", default="", help="also time the first request (needs working credentials)")
+  parser.add_argument("--runs", type=int, default=3)
+  args = parser.parse_args()
+
+  for mode in PROBES:
+    results = [run_probe(mode, args.query) for _ in range(args.runs)]
+    print(f"[{mode}]")
+    for phase in ("import_s", "ready_s", "first_request_s"):
+      values = sorted(result[phase] for result in results if phase in result)
+      if values:
+        print(f"  {phase:>16}: median {values[len(values) // 2]:.3f}s over {len(values)} runs")
+    errors = {result["error"] for result in results if "error" in result}
+    for error in errors:
+      print(f"  error: {error}")
+    print(f"  slowest top-level imports (ms): {results[-1]['top_imports']}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,50 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from benchmarks import linear_graph
+from state import WorkflowState
+
+
+def benchmark(steps: int = 6, result_size: int = 200_000, iterations: int = 200):
+  """Per-invoke and serialized size cost of the old dict state versus WorkflowState.
+
+  The old state kept every result in `data` and again in `messages`, so a
+  checkpointer serializes large results twice at every step.
+  """
+  @dataclass
+  class LegacyState:
+    user_message: str = ""
+    messages: List[Any] = None
+    current_state: str = ""
+    data: Dict[str, Any] = None
+
+  big = "x" * result_size
+
+  def legacy_node(state: LegacyState) -> LegacyState:
+    state.data["result"] = big
+    state.messages.append(f"Agent: {big}")
+    return state
+
+  def compact_node(state: WorkflowState) -> WorkflowState:
+    state.set_result("Agent", big)
+    return state
+
+  cases = [
+    ("legacy", linear_graph(LegacyState, legacy_node, steps).compile(), lambda: LegacyState(user_message="q", messages=[], data={})),
+    ("WorkflowState", linear_graph(WorkflowState, compact_node, steps).compile(), lambda: WorkflowState(user_message="q")),
+  ]
+  serde = JsonPlusSerializer()
+  for label, graph, initial in cases:
+    graph.invoke(initial())
+    started = time.perf_counter()
+    for _ in range(iterations):
+      final = graph.invoke(initial())
+    elapsed = time.perf_counter() - started
+    print(f"{label:>14}: {elapsed / iterations / steps * 1e6:.0f} us/step, checkpointed final state {len(serde.dumps_typed(final)[1]) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+  benchmark()
@@ -1,15 +1,10 @@
 from langgraph.graph import StateGraph, START, END
-from dataclasses import dataclass
-from typing import List, Dict, Any
 from abc import ABC, abstractmethod
-
-@dataclass
-class WorkflowState:
-  user_message: str = ""
-  messages: List[Any] = None
-  current_state: str = ""
-  data: Dict[str, Any] = None
-
+from MultiAgent.state import WorkflowState, render_messages
+from MultiAgent.batch_runner import run_batch
+from MultiAgent.checkpointing import get_checkpointer, invoke_resumable
+from support_routes import support_router
+import uuid
 
 class BaseAgent(ABC):
   def __init__(self, name):
@@ -21,30 +16,22 @@ class BaseAgent(ABC):
     pass
   
   def add_message(self, state: WorkflowState, msg: str):
-    msg = f"{self.name}: {msg}"
-    state.messages.append(msg)
+    state.add_message(f"{self.name}: {msg}")
 
 class OrchestrationAgent(BaseAgent):
   def __init__(self, name):
     super().__init__(name)
     self.role = "OrchestrationAgent"
+    self.router = support_router()
   
   
   def process(self, state: WorkflowState)->WorkflowState:
     user_msg = state.user_message.lower()
     print("User Query: ", user_msg)
     
-    billing_key = ["billing", "payment", "invoice", "charge", "calculate", "bill", "cost", "price", "amount", "refund", "transaction", "receipt", "subscription", "plan", "fee", "credit", "debit", "statement", "balance", "due", "refund", "fund", "money"]
-    
-    technical_key = ["technical", "issue", "problem", "error", "bug", "glitch", "malfunction", "failure", "support", "help", "assist", "troubleshoot", "diagnose", "fix", "repair", "solution"]
-    
-  
-    if any(key in user_msg for key in billing_key):
-      state.current_state = "Billing"
-    elif any(key in user_msg for key in technical_key):
-      state.current_state = "Technical"
-    else:
-      state.current_state = "General"
+    # A route decided up front, e.g. by the batch runner, is not classified again.
+    state.route = state.route or self.router.classify(user_msg)
+    state.current_state = state.route
       
     self.add_message(state, f"Next state/agent to go {state.current_state}")
     return state
@@ -59,8 +46,7 @@ class GeneralAgent(BaseAgent):
     print(f"General Agent processing...{user_msg}")
     
     response = "This is General service, we will solve your problem in no time."
-    state.data["result"] = response
-    self.add_message(state, f"Response, {response}")
+    state.set_result(self.name, response, label="Response, ")
     return state
 
 class BillingAgent(BaseAgent):
@@ -73,8 +59,7 @@ class BillingAgent(BaseAgent):
     print(f"Billing Agent processing...{user_msg}")
     
     response = "This is Billing service, we will solve your problem in no time."
-    state.data["result"] = response
-    self.add_message(state, f"Response, {response}")
+    state.set_result(self.name, response, label="Response, ")
     return state
 
 class TechnicalAgent(BaseAgent):
@@ -87,8 +72,7 @@ class TechnicalAgent(BaseAgent):
     print(f"Technical Agent processing...{user_msg}")
     
     response = "This is Technical service, we will solve your problem in no time."
-    state.data["result"] = response
-    self.add_message(state, f"Response, {response}")
+    state.set_result(self.name, response, label="Response, ")
     return state
 
 class RespondAgent(BaseAgent):
@@ -97,9 +81,9 @@ class RespondAgent(BaseAgent):
     self.role = "RespondAgent"
   
   def process(self, state: WorkflowState) -> WorkflowState:
-    result = state.data.get("result", "No result available")
+    result = state.result or "No result available"
     formatted_response = f"Response: {result}"
-    self.add_message(state, formatted_response)
+    state.set_result(self.name, result, label="Response: ")
     
     print(f"Final Response: {formatted_response}")
     state.current_state = "Completed"
@@ -134,7 +118,7 @@ class WorkflowManager:
     workflow.add_edge("technical", "respond")
     
     workflow.add_edge("respond", END)
-    return workflow.compile()
+    return workflow.compile(checkpointer=get_checkpointer())
     
   def _orchestration_node(self, state:WorkflowState)->WorkflowState:
     return self.orchestration.process(state)
@@ -151,19 +135,24 @@ class WorkflowManager:
   def _respond_node(self, state:WorkflowState)->WorkflowState:
     return self.respond.process(state)
   
-  def run(self, query: str) -> WorkflowState:
+  def run(self, query: str, request_id: str = None, route: str = "") -> WorkflowState:
     print("Multi-agent System started processing this query", query)
     
     initial_state = WorkflowState(
       user_message=query,
-      messages=[],
       current_state="Start(Orchestration)",
-      data={}
+      route=route
     )
     
-    result = self.workflow.invoke(initial_state)
+    result = invoke_resumable(self.workflow, initial_state, request_id or uuid.uuid4().hex)
     
     return result
+  
+  def run_batch(self, input_path: str, output_path: str, **kwargs):
+    return run_batch(
+      lambda query, route: self.run(query, route=route),
+      input_path, output_path, route=lambda query: self.orchestration.router.classify(query.lower()), **kwargs
+    )
        
 if __name__ == "__main__":
   user_query = "I have a billing issue with my last invoice"
@@ -173,6 +162,7 @@ if __name__ == "__main__":
   print("Workflow completed successfully!")
   print("Final State:", response["current_state"])
   
-  print("Messages:", response["messages"])
-  for msg in response["messages"]:
+  messages = render_messages(response)
+  print("Messages:", messages)
+  for msg in messages:
     print(msg)
\ No newline at end of file
@@ -1,16 +1,16 @@
 from langgraph.graph import StateGraph, START, END
-from dataclasses import dataclass
-from typing import List, Dict, Any
 from abc import ABC, abstractmethod
+from MultiAgent.state import WorkflowState, render_messages
+from MultiAgent.batch_runner import run_batch
+from MultiAgent.checkpointing import get_checkpointer, invoke_resumable
+from MultiAgent.deadline import deadline_after, remaining
+from support_routes import support_router
+import hashlib
+import os
+import uuid
 
-@dataclass
-class WorkflowState:
-  user_message: str = ""
-  messages: List[Any] = None
-  current_state: str = ""
-  data: Dict[str, Any] = None
-  iterationCounter: int = 0
-
+VALIDATION_MAX_ITERATIONS = int(os.getenv("VALIDATION_MAX_ITERATIONS", "5"))
+VALIDATION_RETRY_BUDGET_S = float(os.getenv("VALIDATION_RETRY_BUDGET_S", "30"))
 
 class BaseAgent(ABC):
   def __init__(self, name):
@@ -22,30 +22,22 @@ class BaseAgent(ABC):
     pass
   
   def add_message(self, state: WorkflowState, msg: str):
-    msg = f"{self.name}: {msg}"
-    state.messages.append(msg)
+    state.add_message(f"{self.name}: {msg}")
 
 class OrchestrationAgent(BaseAgent):
   def __init__(self, name):
     super().__init__(name)
     self.role = "OrchestrationAgent"
+    self.router = support_router()
   
   
   def process(self, state: WorkflowState)->WorkflowState:
     user_msg = state.user_message.lower()
     print("User Query: ", user_msg)
     
-    billing_key = ["billing", "payment", "invoice", "charge", "calculate", "bill", "cost", "price", "amount", "refund", "transaction", "receipt", "subscription", "plan", "fee", "credit", "debit", "statement", "balance", "due", "refund", "fund", "money"]
-    
-    technical_key = ["technical", "issue", "problem", "error", "bug", "glitch", "malfunction", "failure", "support", "help", "assist", "troubleshoot", "diagnose", "fix", "repair", "solution"]
-    
-    
-    if any(key in user_msg for key in billing_key):
-      state.current_state = "Billing"
-    elif any(key in user_msg for key in technical_key):
-      state.current_state = "Technical"
-    else:
-      state.current_state = "General"
+    # A route decided up front, e.g. by the batch runner, is not classified again.
+    state.route = state.route or self.router.classify(user_msg)
+    state.current_state = state.route
       
     self.add_message(state, f"Next state/agent to go {state.current_state}")
     return state
@@ -60,8 +52,7 @@ class GeneralAgent(BaseAgent):
     print(f"General Agent processing...{user_msg}")
     
     response = "This is General service, we will solve your problem in no time."
-    state.data["result"] = response
-    self.add_message(state, f"Response, {response}")
+    state.set_result(self.name, response, label="Response, ")
     return state
 
 class BillingAgent(BaseAgent):
@@ -74,8 +65,7 @@ class BillingAgent(BaseAgent):
     print(f"Billing Agent processing...{user_msg}")
     
     response = "This is Billing service, we will solve your problem in no time."
-    state.data["result"] = response
-    self.add_message(state, f"Response, {response}")
+    state.set_result(self.name, response, label="Response, ")
     return state
 
 class TechnicalAgent(BaseAgent):
@@ -88,8 +78,7 @@ class TechnicalAgent(BaseAgent):
     print(f"Technical Agent processing...{user_msg}")
     
     response = "This is Technical service, we will solve your problem in no time."
-    state.data["result"] = response
-    self.add_message(state, f"Response, {response}")
+    state.set_result(self.name, response, label="Response, ")
     return state
 
 class RespondAgent(BaseAgent):
@@ -98,9 +87,9 @@ class RespondAgent(BaseAgent):
     self.role = "RespondAgent"
   
   def process(self, state: WorkflowState) -> WorkflowState:
-    result = state.data.get("result", "No result available")
+    result = state.result or "No result available"
     formatted_response = f"Response: {result}"
-    self.add_message(state, formatted_response)
+    state.set_result(self.name, result, label="Response: ")
     
     print(f"Final Response: {formatted_response}")
     state.current_state = "Completed"
@@ -112,29 +101,38 @@ class ValidationAgent(BaseAgent):
     self.role = "ValidationAgent"
   
   def process(self, state: WorkflowState) -> WorkflowState:
-    result = state.data.get("result", "No result available")
-    if not result or "no result available" in result.lower():
-      error_message = "Validation Error: No valid result found."
-      self.add_message(state, error_message)
-      state.current_state = "orchestration"
-      print(f"Validation Error: {error_message}")
-    else:
+    result = state.result or "No result available"
+    valid = bool(result) and "no result available" not in result.lower()
+    state.iteration_counter += 1
+    state.attempts.append({"iteration": state.iteration_counter, "route": state.route, "result": state.result, "valid": valid})
+    
+    if valid:
       success_message = "Validation successful, proceeding to respond."
       self.add_message(state, success_message)
       print(f"Validation Success: {success_message}")
       state.current_state = "respond"
-      
-    state.iterationCounter += 1
-    if state.iterationCounter > 5:
-      error_message = "Validation Error: Too many iterations, stopping workflow."
+    elif state.iteration_counter > VALIDATION_MAX_ITERATIONS or remaining(state.deadline) <= 0:
+      reason = "too many iterations" if state.iteration_counter > VALIDATION_MAX_ITERATIONS else "running out of time"
+      error_message = f"Validation Error: Stopping workflow due to {reason}."
       self.add_message(state, error_message)
       state.current_state = "respond"
-      state.data["result"] = "Workflow stopped due to too many iterations."
+      state.result = f"Workflow stopped due to {reason}."
+      print(f"Validation Error: {error_message}")
+    else:
+      error_message = "Validation Error: No valid result found."
+      self.add_message(state, error_message)
+      # The feedback is an input of the worker node, so only the worker runs again.
+      state.feedback = f"Attempt {state.iteration_counter}: {error_message}"
+      state.current_state = "orchestration"
       print(f"Validation Error: {error_message}")
     return state
     
 
 
+def fingerprint(*values) -> str:
+  return hashlib.sha256(repr(values).encode()).hexdigest()
+
+
 class WorkflowManager:
   def __init__(self):
     self.orchestration = OrchestrationAgent("OrchestrationAgent")
@@ -148,10 +146,12 @@ class WorkflowManager:
   def _build_workflow(self):
     workflow = StateGraph(WorkflowState)
     
-    workflow.add_node("orchestration", self._orchestration_node)
-    workflow.add_node("billing", self._billing_node)
-    workflow.add_node("general", self._general_node)
-    workflow.add_node("technical", self._technical_node)
+    # On a retry, nodes whose inputs are unchanged keep their previous output.
+    worker_inputs = lambda state: (state.user_message, state.route, state.feedback)
+    workflow.add_node("orchestration", self._incremental("orchestration", self._orchestration_node, lambda state: (state.user_message,), self._reuse_route))
+    workflow.add_node("billing", self._incremental("billing", self._billing_node, worker_inputs))
+    workflow.add_node("general", self._incremental("general", self._general_node, worker_inputs))
+    workflow.add_node("technical", self._incremental("technical", self._technical_node, worker_inputs))
     workflow.add_node("respond", self._respond_node)
     workflow.add_node("validation", self._validation_node)
     
@@ -164,7 +164,6 @@ class WorkflowManager:
     workflow.add_edge("billing", "validation")
     workflow.add_edge("general", "validation")
     workflow.add_edge("technical", "validation")
-    workflow.add_edge("validation", "respond")
     
     workflow.add_conditional_edges(
       "validation",
@@ -172,7 +171,23 @@ class WorkflowManager:
     )
     
     workflow.add_edge("respond", END)
-    return workflow.compile()
+    return workflow.compile(checkpointer=get_checkpointer())
+    
+  def _incremental(self, node, process, inputs, reuse=None):
+    """Run `process` only when `inputs(state)` differs from the node's last run in this request."""
+    def run_node(state:WorkflowState)->WorkflowState:
+      key = fingerprint(*inputs(state))
+      if state.node_inputs.get(node) == key:
+        state.add_message(f"{node}: inputs unchanged, reusing previous output")
+        return reuse(state) if reuse else state
+      state.node_inputs[node] = key
+      state.node_runs[node] = state.node_runs.get(node, 0) + 1
+      return process(state)
+    return run_node
+  
+  def _reuse_route(self, state:WorkflowState)->WorkflowState:
+    state.current_state = state.route
+    return state
     
   def _orchestration_node(self, state:WorkflowState)->WorkflowState:
     return self.orchestration.process(state)
@@ -192,18 +207,23 @@ class WorkflowManager:
   def _validation_node(self, state:WorkflowState)->WorkflowState:
     return self.validation.process(state)
   
-  def run(self, query: str) -> WorkflowState:
+  def run(self, query: str, request_id: str = None, route: str = "") -> WorkflowState:
     print("Multi-agent System started processing this query", query)
     
     initial_state = WorkflowState(
       user_message=query,
-      messages=[],
       current_state="Start(Orchestration)",
-      data={},
-      iterationCounter=0
+      route=route,
+      deadline=deadline_after(VALIDATION_RETRY_BUDGET_S)
     )
-    result = self.workflow.invoke(initial_state)
+    result = invoke_resumable(self.workflow, initial_state, request_id or uuid.uuid4().hex)
     return result
+  
+  def run_batch(self, input_path: str, output_path: str, **kwargs):
+    return run_batch(
+      lambda query, route: self.run(query, route=route),
+      input_path, output_path, route=lambda query: self.orchestration.router.classify(query.lower()), **kwargs
+    )
        
 if __name__ == "__main__":
   user_query = "I have a billing issue with my last invoice"
@@ -213,6 +233,8 @@ if __name__ == "__main__":
   print("Workflow completed successfully!")
   print("Final State:", response["current_state"])
   
-  print("Messages:", response["messages"])
-  for msg in response["messages"]:
-    print(msg)
\ No newline at end of file
+  messages = render_messages(response)
+  print("Messages:", messages)
+  for msg in messages:
+    print(msg)
+  print("Node runs:", response["node_runs"])
\ No newline at end of file
@@ -1,15 +1,16 @@
 from langgraph.graph import StateGraph, START, END
-from dataclasses import dataclass
-from typing import Union, List, Annotated, TypedDict, Any, Dict
 from abc import ABC, abstractmethod
+from MultiAgent.state import WorkflowState, render_messages
+from MultiAgent.keyword_router import KeywordRouter
+from MultiAgent.batch_runner import run_batch
+from MultiAgent.checkpointing import get_checkpointer, invoke_resumable
+import uuid
+
+QUERY_TYPES = {
+  "weather_query": ["weather"],
+  "joke_query": ["joke", "funny"],
+}
 
-@dataclass
-class WorkflowState:
-  user_message: str = ""
-  messages: List[str] = None
-  current_state: str = "Start"
-  data: Dict[str, Any] = None
-  
 class BaseAgent(ABC):
   def __init__(self, name):
     self.name = name
@@ -20,26 +21,22 @@ class BaseAgent(ABC):
     pass
   
   def add_message(self, state: WorkflowState, msg: str)->None:
-    msg = f"{self.name}: {msg}"
-    state.messages.append(msg)
+    state.add_message(f"{self.name}: {msg}")
   
 class ReaderAgent(BaseAgent):
   def __init__(self):
     super().__init__("Reader")
     self.role = "ReaderAgent"
+    self.router = KeywordRouter(QUERY_TYPES, default="general_query")
   
   
   def process(self, state: WorkflowState)->WorkflowState:
     user_msg = state.user_message.lower()
     print(f"Reader Agent....User query: {user_msg}")
-    if "weather" in user_msg:
-      query_type = "weather_query"
-    elif "joke" in user_msg or "funny" in user_msg:
-      query_type = "joke_query"
-    else:
-      query_type = "general_query"
+    # A route decided up front, e.g. by the batch runner, is not classified again.
+    query_type = state.route or self.router.classify(user_msg)
     
-    state.data['query_type'] = query_type
+    state.query_type = query_type
     state.current_state = "Processing State"
     self.add_message(state, f"User Message- {user_msg}")
     self.add_message(state, f"Query Type- {query_type}")
@@ -51,17 +48,17 @@ class ProcessAgent(BaseAgent):
     self.role = "ReaderAgent"
   
   def process(self, state: WorkflowState)->WorkflowState:
-    query_type = state.data.get("query_type", "general_query")
+    query_type = state.query_type or "general_query"
     print(f"Processing Agent...Processing {query_type}")
     
     if query_type == "weather_query":
-      state.data["result"] = "Today's weather is awesome"
+      result = "Today's weather is awesome"
     elif query_type == "joke_query":
-      state.data["result"] = "I failed math so many times at school, I can't even count."
+      result = "I failed math so many times at school, I can't even count."
     else:
-      state.data["result"] = "This is General service, how can I help."
+      result = "This is General service, how can I help."
     
-    self.add_message(state, f"Result- {state.data.get("result", "No result found")}")
+    state.set_result(self.name, result, label="Result- ")
     state.current_state = "Response"
     return state
   
@@ -72,7 +69,7 @@ class RespondAgent(BaseAgent):
   
   
   def process(self, state: WorkflowState)->WorkflowState:
-    result = state.data.get("result", "No result available")
+    result = state.result or "No result available"
     formatted_response = f"""
     ✅ **Task Completed Successfully!**
     
@@ -82,7 +79,7 @@ class RespondAgent(BaseAgent):
     Thank you for using our agent system!
     """
     
-    state.data["final_response"] = formatted_response
+    state.final_response = formatted_response
     state.current_state = "complete"
     
     self.add_message(state, "Response - Response formatted and ready!")
@@ -109,7 +106,7 @@ class WorkflowManager:
     workflow.add_edge("process", "respond")
     workflow.add_edge("respond", END)
     
-    return workflow.compile()
+    return workflow.compile(checkpointer=get_checkpointer())
 
 
   def _reader_node(self, state: WorkflowState)->WorkflowState:
@@ -121,20 +118,25 @@ class WorkflowManager:
   def _respond_node(self, state: WorkflowState)->WorkflowState:
     return self.respond.process(state)
   
-  def run(self, user_query: str)->WorkflowState:
+  def run(self, user_query: str, request_id: str = None, route: str = "")->WorkflowState:
     print("Starting Simple Workflow Agent....")
     
     initial_state = WorkflowState(
       user_message= user_query,
-      messages= [],
       current_state= "Start",
-      data= {}
+      route= route
     )
     
-    result = self.workflow.invoke(initial_state)
+    result = invoke_resumable(self.workflow, initial_state, request_id or uuid.uuid4().hex)
     print("Workflow completed successfully!")
     return result
   
+  def run_batch(self, input_path: str, output_path: str, **kwargs):
+    return run_batch(
+      lambda query, route: self.run(query, route=route),
+      input_path, output_path, route=lambda query: self.reader.router.classify(query.lower()), **kwargs
+    )
+  
 if __name__ == "__main__":
   user_query = "What's the weather like today?"
   manager = WorkflowManager()
@@ -144,8 +146,8 @@ if __name__ == "__main__":
   print(final_state)
   
   print("Messages:")
-  for msg in final_state['messages']:
+  for msg in render_messages(final_state):
     print(msg)
     
   print("Final Response:")
-  print(final_state['data'].get('final_response', 'No response available'))
\ No newline at end of file
+  print(final_state['final_response'] or 'No response available')
\ No newline at end of file
@@ -0,0 +1,14 @@
+from MultiAgent.keyword_router import KeywordRouter
+import os
+
+# Routes are scored in order; on a tie the earlier route wins. Set
+# SUPPORT_ROUTES_CONFIG to a JSON file to load routes and weights from config.
+SUPPORT_ROUTES = {
+  "Billing": ["billing", "payment", "invoice", "charge", "calculate", "bill", "cost", "price", "amount", "refund", "transaction", "receipt", "subscription", "plan", "fee", "credit", "debit", "statement", "balance", "due", "fund", "money"],
+  "Technical": ["technical", "issue", "problem", "error", "bug", "glitch", "malfunction", "failure", "support", "help", "assist", "troubleshoot", "diagnose", "fix", "repair", "solution"],
+}
+
+def support_router() -> KeywordRouter:
+  """The customer-support router, from SUPPORT_ROUTES_CONFIG if set, else SUPPORT_ROUTES."""
+  config = os.getenv("SUPPORT_ROUTES_CONFIG")
+  return KeywordRouter.from_config(config) if config else KeywordRouter(SUPPORT_ROUTES, default="General")
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MULTIAGENT = os.path.join(ROOT, "MultiAgent")
+
+# The toy workflows import the package as MultiAgent.*, while the modules
+# inside it import each other by bare name, as main.py does.
+for path in (ROOT, MULTIAGENT):
+  if path not in sys.path:
+    sys.path.insert(0, path)
+
+# Keep checkpoints and node memos of test runs out of the MultiAgent directory.
+os.environ.setdefault("CHECKPOINT_DB", ":memory:")
+os.environ.setdefault("NODE_MEMO_DB", ":memory:")
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+  """Answer every agent's LLM calls with `replies["fn"](prompt text)`; tests replace "fn"."""
+  import llm_gateway
+  import model
+  from langchain_core.messages import AIMessage
+  from langchain_core.runnables import RunnableLambda
+
+  replies = {"fn": lambda prompt: "general"}
+  respond = RunnableLambda(lambda prompt: AIMessage(content=replies["fn"](prompt.to_string())))
+  monkeypatch.setattr(model, "get_llm", lambda name=None: respond)
+  monkeypatch.setattr(llm_gateway, "_gateways", {})
+  return replies
+
+
+@pytest.fixture
+def fake_memory(monkeypatch):
+  """Vector memory that goes through traffic like the real one, but recalls and stores nothing."""
+  import agents
+  import traffic
+
+  class FakeMemory:
+    def get_similar_content(self, query):
+      return traffic.external("memory_recall", traffic.call_key(query), lambda: [])
+
+    def add_document(self, data):
+      traffic.external("memory_write", traffic.call_key(data), lambda: None)
+
+  monkeypatch.setattr(agents.BaseAgent, "vector_db", property(lambda self: FakeMemory()))
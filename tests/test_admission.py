@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from admission import AdmissionController, AdmissionRejected
+from benchmarks.admission_load import BASE_LATENCY, run_load
+from metrics import percentile
+
+
+def wait_for(condition, timeout=2.0):
+  deadline = time.monotonic() + timeout
+  while not condition():
+    assert time.monotonic() < deadline, "condition not reached"
+    time.sleep(0.005)
+
+
+def test_queued_requests_are_admitted_in_priority_order():
+  controller = AdmissionController(max_concurrent=1, max_queue=10, max_wait=5.0, route_limits={})
+  order = []
+
+  def request(priority):
+    with controller.admit(priority):
+      order.append(priority)
+
+  holder = controller.admit("normal")
+  holder.__enter__()
+  threads = []
+  for priority in ("low", "normal", "high"):
+    threads.append(threading.Thread(target=request, args=(priority,)))
+    threads[-1].start()
+    wait_for(lambda: controller.stats()["queue_depth"] == len(threads))
+  holder.__exit__(None, None, None)
+  for thread in threads:
+    thread.join()
+
+  assert order == ["high", "normal", "low"]
+  assert controller.stats()["in_flight"] == 0
+  assert controller.counters["admitted"] == 4
+
+
+def test_full_queue_is_rejected():
+  controller = AdmissionController(max_concurrent=1, max_queue=0, max_wait=1.0, route_limits={})
+  with controller.admit():
+    with pytest.raises(AdmissionRejected, match="queue is full"):
+      with controller.admit():
+        pass
+  assert controller.counters == {"admitted": 1, "rejected": 1, "timed_out": 0, "degraded": 0}
+
+
+def test_waiting_past_max_wait_is_rejected_and_gives_up_its_place():
+  controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait=0.05, route_limits={})
+  with controller.admit():
+    with pytest.raises(AdmissionRejected, match="Timed out"):
+      with controller.admit():
+        pass
+  # The slot is not handed to the waiter that gave up.
+  assert controller.stats()["in_flight"] == 0
+  assert controller.counters["timed_out"] == 1
+  assert controller.counters["admitted"] == 1
+
+
+def test_saturated_route_degrades_then_rejects():
+  controller = AdmissionController(route_limits={"web": 1, "general": 1}, route_wait=0.01)
+  with controller.route_slot("web") as first:
+    with controller.route_slot("web") as second:
+      with pytest.raises(AdmissionRejected, match="'web' is overloaded"):
+        with controller.route_slot("web"):
+          pass
+      with controller.route_slot("unlimited") as other:
+        pass
+  assert (first, second, other) == ("web", "general", "unlimited")
+  assert controller.counters["degraded"] == 1
+  assert controller.counters["rejected"] == 1
+  assert controller.stats()["route_in_flight"] == {"web": 0, "general": 0}
+
+
+def test_rejection_is_returned_as_429(monkeypatch):
+  class Manager:
+    def run(self, *args, **kwargs):
+      raise AdmissionRejected("Request queue is full", retry_after=1.5)
+
+  monkeypatch.setattr(main, "get_manager", lambda: Manager())
+  response = TestClient(main.app).post("/chat", json={"user_query": "hello"})
+  assert response.status_code == 429
+  assert response.json()["detail"] == "Request queue is full"
+  assert response.headers["Retry-After"] == "2"
+
+
+def test_tail_latency_stays_bounded_under_overload():
+  controller = AdmissionController(max_concurrent=8, max_queue=16, max_wait=0.5,
+                                   route_limits={"web": 4, "nl2sql": 8, "general": 16}, route_wait=0.1)
+  requests = 150
+  # Arrivals at twice what the stub backends can serve without slowing down.
+  latencies, outcomes = run_load(controller, requests=requests, arrival_rate=200.0)
+
+  # An admitted request waits at most max_wait for a slot and route_wait per
+  # route it tries, and route limits keep each backend at its base latency.
+  bound = controller.max_wait + 2 * controller.route_wait + max(BASE_LATENCY.values())
+  assert percentile(latencies, 99) < bound + 0.25
+  assert outcomes["rejected"] > 0
+
+  counters = controller.counters
+  assert sum(outcomes.values()) == requests
+  assert counters["degraded"] == outcomes["degraded"]
+  assert counters["rejected"] + counters["timed_out"] == outcomes["rejected"]
+  assert counters["admitted"] >= outcomes["ok"] + outcomes["degraded"]
+  assert controller.stats()["in_flight"] == 0
@@ -0,0 +1,137 @@
+import json
+import re
+import threading
+import time
+
+import pytest
+
+import deadline
+from agents import PlannerAgent, RouterAgent, WorkflowManager
+from deadline import call_with_deadline, deadline_after, reserve
+from state import WorkflowState, merge_partials
+
+
+@pytest.fixture
+def small_pools(monkeypatch):
+  monkeypatch.setattr(deadline, "DEADLINE_POOL_SIZE", 2)
+  monkeypatch.setattr(deadline, "_pools", {})
+  release = threading.Event()
+  yield release
+  release.set()
+  for pool in deadline._pools.values():
+    pool.shutdown(wait=True)
+
+
+def test_hung_router_batches_do_not_starve_answer_calls(fake_llm, small_pools):
+  class HungBatcher:
+    def submit(self, query):
+      small_pools.wait(5)
+
+  router = RouterAgent("RouterAgent")
+  router.batcher = HungBatcher()
+  for _ in range(3):
+    state = router.process(WorkflowState(user_message="hello", deadline=deadline_after(1.1)))
+    assert state.current_state == "general"
+    assert state.degraded == ["router"]
+
+  started = time.perf_counter()
+  assert call_with_deadline(deadline_after(1.0), lambda: "answer", kind="llm") == "answer"
+  assert time.perf_counter() - started < 0.5
+
+
+def reply_by_prompt(plan: str, synthesis_calls: list):
+  """Fake LLM: the planner gets `plan`, synthesis joins the partials, agents echo the question."""
+  def reply(prompt):
+    if "Split the user's question" in prompt:
+      return plan
+    if "combining the answers" in prompt:
+      synthesis_calls.append(prompt)
+      return "combined"
+    question = re.search(r"Query: (.*)", prompt).group(1).strip()
+    return f"answer to {question}"
+  return reply
+
+
+@pytest.fixture
+def planner(fake_llm, fake_memory):
+  synthesis_calls = []
+  manager = WorkflowManager()
+  manager.router.batcher = None
+
+  def run(plan: str, query: str = "Who won the match and what is 2+2?"):
+    fake_llm["fn"] = reply_by_prompt(plan, synthesis_calls)
+    return manager.run(query, route="plan")
+  run.manager = manager
+  run.synthesis_calls = synthesis_calls
+  return run
+
+
+def test_planner_fans_out_and_synthesizes(planner):
+  plan = '```json\n[{"question": "Who won the match?", "route": "general"}, {"question": "What is 2+2?", "route": "general"}]\n```'
+  result = planner(plan)
+
+  assert [task["question"] for task in result["subtasks"]] == ["Who won the match?", "What is 2+2?"]
+  assert result["partials"] == [
+    {"index": 0, "question": "Who won the match?", "route": "general", "answer": "answer to Who won the match?", "degraded": []},
+    {"index": 1, "question": "What is 2+2?", "route": "general", "answer": "answer to What is 2+2?", "degraded": []},
+  ]
+  assert result["result"] == "combined"
+  assert len(planner.synthesis_calls) == 1
+  assert "1. Who won the match? (general): answer to Who won the match?" in planner.synthesis_calls[0]
+  assert "2. What is 2+2? (general): answer to What is 2+2?" in planner.synthesis_calls[0]
+
+
+@pytest.mark.parametrize("plan", ["I cannot split this", "[]", '[{"route": "web"}]'])
+def test_planner_without_subtasks_answers_the_query_as_a_whole(planner, plan):
+  result = planner(plan, query="Tell me a joke")
+
+  assert result["subtasks"] == [{"index": 0, "question": "Tell me a joke", "route": "general"}]
+  assert result["result"] == "answer to Tell me a joke"
+  # A single partial answer is returned as is, without a synthesis call.
+  assert planner.synthesis_calls == []
+
+
+def test_failed_subtask_is_degraded_and_the_rest_synthesized(planner, monkeypatch):
+  process = planner.manager.general.process
+
+  def failing(state):
+    if state.user_message == "What is 2+2?":
+      raise RuntimeError("model unavailable")
+    return process(state)
+  monkeypatch.setattr(planner.manager.general, "process", failing)
+
+  result = planner('[{"question": "Who won the match?"}, {"question": "What is 2+2?"}]')
+  assert [partial["answer"] for partial in result["partials"]] == ["answer to Who won the match?", ""]
+  assert "subtask_1" in result["degraded"]
+  assert result["result"] == "combined"
+  assert "2. What is 2+2? (general): no answer" in planner.synthesis_calls[0]
+
+
+def test_plan_maps_routes_and_caps_subtasks(fake_llm):
+  agent = PlannerAgent("PlannerAgent", max_subtasks=2)
+  fake_llm["fn"] = lambda prompt: json.dumps([
+    {"question": "Sales last month?", "route": "SQL"}, {"question": "Latest news?", "route": "web search"},
+    {"question": "Third?", "route": "general"},
+  ])
+  assert agent.plan("q") == [
+    {"index": 0, "question": "Sales last month?", "route": "nl2sql"},
+    {"index": 1, "question": "Latest news?", "route": "web"},
+  ]
+
+
+def test_fan_out_sends_each_subtask_with_the_synthesis_budget_reserved(fake_llm):
+  manager = WorkflowManager()
+  deadline = deadline_after(20)
+  state = WorkflowState(user_message="q", deadline=deadline, subtasks=[
+    {"index": 0, "question": "a", "route": "general"}, {"index": 1, "question": "b", "route": "web"}])
+
+  sends = manager._fan_out(state)
+  assert [send.node for send in sends] == ["subtask", "subtask"]
+  assert [send.arg for send in sends] == [dict(task, deadline=reserve(deadline, "answer")) for task in state.subtasks]
+
+
+def test_merge_partials_keeps_one_answer_per_subtask_in_plan_order():
+  first = {"index": 1, "answer": "b"}
+  second = {"index": 0, "answer": "a"}
+  assert merge_partials([first], [second]) == [second, first]
+  assert merge_partials([second, first], [first, {"index": 1, "answer": "b2"}]) == [second, {"index": 1, "answer": "b2"}]
@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from batching import MicroBatcher
+
+
+class Recorder:
+  def __init__(self, fail: Exception = None):
+    self.batches = []
+    self.fail = fail
+    self._lock = threading.Lock()
+
+  def __call__(self, items):
+    with self._lock:
+      self.batches.append(list(items))
+    if self.fail:
+      raise self.fail
+    return [item * 2 for item in items]
+
+
+def submit_all(batcher, items):
+  with ThreadPoolExecutor(max_workers=len(items)) as pool:
+    futures = [pool.submit(batcher.submit, item) for item in items]
+    return [future.exception() or future.result() for future in futures]
+
+
+def test_concurrent_calls_are_grouped_into_full_batches():
+  calls = Recorder()
+  batcher = MicroBatcher(calls, max_batch_size=4, max_wait=1.0)
+
+  started = time.monotonic()
+  results = submit_all(batcher, list(range(8)))
+
+  assert results == [item * 2 for item in range(8)]
+  assert sorted(len(batch) for batch in calls.batches) == [4, 4]
+  # Full batches go out without waiting for max_wait.
+  assert time.monotonic() - started < 1.0
+  assert batcher.stats() == {"batches": 2, "items": 8, "avg_batch_size": 4.0}
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+  calls = Recorder()
+  batcher = MicroBatcher(calls, max_batch_size=8, max_wait=0.1)
+
+  started = time.monotonic()
+  assert batcher.submit(21) == 42
+  elapsed = time.monotonic() - started
+
+  assert calls.batches == [[21]]
+  assert 0.09 <= elapsed < 1.0
+
+
+@pytest.mark.parametrize("batch_fn, error", [
+  (Recorder(fail=RuntimeError("provider down")), RuntimeError),
+  (lambda items: items[:1], ValueError),  # Wrong number of results.
+])
+def test_failed_batch_raises_in_every_waiter(batch_fn, error):
+  batcher = MicroBatcher(batch_fn, max_batch_size=3, max_wait=1.0)
+
+  results = submit_all(batcher, [1, 2, 3])
+
+  assert all(isinstance(result, error) for result in results)
+  assert len({id(result) for result in results}) == 1
@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks import admission_load, checkpoint_overhead, keyword_routing, llm_hedging, prompt_prefix, router_batching, sql_cache_hits, startup, state_size
+
+# Each benchmark with a configuration small enough to finish in a few seconds,
+# so they keep running against the modules they measure.
+CASES = [
+  (admission_load.load_test, dict(requests=20, arrival_rate=1000.0)),
+  (checkpoint_overhead.benchmark, dict(steps=1, iterations=2)),
+  (keyword_routing.benchmark, dict(message_words=50, iterations=1)),
+  (llm_hedging.demo, dict(requests=10, concurrency=2)),
+  (prompt_prefix.benchmark, dict(iterations=2)),
+  (router_batching.benchmark, dict(concurrency=4, requests=8, base_latency=0.01, per_item=0.0)),
+  (sql_cache_hits.demo, dict(repeats=3)),
+  (state_size.benchmark, dict(steps=1, result_size=10, iterations=1)),
+]
+
+
+@pytest.mark.parametrize("fn, kwargs", CASES, ids=[fn.__module__.rsplit(".", 1)[1] for fn, _ in CASES])
+def test_benchmark_runs(fn, kwargs, capsys):
+  fn(**kwargs)
+  assert capsys.readouterr().out.strip()
+
+
+def test_startup_probe_times_the_import():
+  result = startup.run_probe("cli", "")
+  assert result["import_s"] > 0
+  assert result["top_imports"]
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from langgraph.graph import StateGraph, START, END
+
+import main
+from checkpointing import RequestConflict, get_checkpointer, invoke_resumable
+from state import WorkflowState
+
+
+@pytest.fixture
+def workflow(tmp_path):
+  runs = []
+
+  def answer(state: WorkflowState) -> WorkflowState:
+    runs.append(state.user_message)
+    state.set_result("Agent", f"answer to {state.user_message}")
+    return state
+
+  graph = StateGraph(WorkflowState)
+  graph.add_node("answer", answer)
+  graph.add_edge(START, "answer")
+  graph.add_edge("answer", END)
+  compiled = graph.compile(checkpointer=get_checkpointer(str(tmp_path / "checkpoints.sqlite")))
+  compiled.runs = runs
+  return compiled
+
+
+def test_finished_request_returns_its_stored_result(workflow):
+  first = invoke_resumable(workflow, WorkflowState(user_message="hello"), "r1")
+  again = invoke_resumable(workflow, WorkflowState(user_message="hello"), "r1")
+  assert again["result"] == first["result"] == "answer to hello"
+  assert workflow.runs == ["hello"]
+
+
+@pytest.mark.parametrize("second", [
+  WorkflowState(user_message="a totally different question"),
+  WorkflowState(user_message="hello", route="web"),
+])
+def test_reused_request_id_for_another_request_is_refused(workflow, second):
+  invoke_resumable(workflow, WorkflowState(user_message="hello"), "r1")
+  with pytest.raises(RequestConflict):
+    invoke_resumable(workflow, second, "r1")
+  assert workflow.runs == ["hello"]
+
+
+def test_threads_logged_before_the_request_hash_compare_the_question(tmp_path):
+  path = str(tmp_path / "old.sqlite")
+  conn = sqlite3.connect(path)
+  conn.execute("CREATE TABLE checkpoint_threads (thread_id TEXT PRIMARY KEY, started_at REAL NOT NULL)")
+  conn.execute("INSERT INTO checkpoint_threads VALUES ('old', 0)")
+  conn.commit()
+
+  graph = StateGraph(WorkflowState)
+  graph.add_node("answer", lambda state: state)
+  graph.add_edge(START, "answer")
+  graph.add_edge("answer", END)
+  compiled = graph.compile(checkpointer=get_checkpointer(path))
+  compiled.invoke(WorkflowState(user_message="hello"), {"configurable": {"thread_id": "old"}})
+
+  assert invoke_resumable(compiled, WorkflowState(user_message="hello"), "old")["user_message"] == "hello"
+  with pytest.raises(RequestConflict):
+    invoke_resumable(compiled, WorkflowState(user_message="something else"), "old")
+
+
+def test_api_scopes_request_ids_to_the_client_and_maps_conflicts_to_409(monkeypatch):
+  seen = []
+
+  class Manager:
+    def run(self, query, request_id=None, **kwargs):
+      seen.append(request_id)
+      if query != "hello":
+        raise RequestConflict(f"Request ID {request_id} was already used for a different request")
+      return {"result": "hi", "degraded": []}
+
+  monkeypatch.setattr(main, "get_manager", lambda: Manager())
+  client = TestClient(main.app)
+  assert client.post("/chat", json={"user_query": "hello"}, headers={"X-Request-Id": "r1"}).status_code == 200
+  assert client.post("/chat", json={"user_query": "other"}, headers={"X-Request-Id": "r1"}).status_code == 409
+  assert client.post("/chat", json={"user_query": "hello"}).status_code == 200
+  assert seen == ["testclient/r1", "testclient/r1", None]
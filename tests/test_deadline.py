@@ -0,0 +1,46 @@
+import threading
+import time
+
+import pytest
+
+import deadline
+from deadline import DeadlineExceeded, call_with_deadline, deadline_after
+
+
+@pytest.fixture
+def small_pools(monkeypatch):
+  monkeypatch.setattr(deadline, "DEADLINE_POOL_SIZE", 2)
+  monkeypatch.setattr(deadline, "_pools", {})
+  release = threading.Event()
+  yield release
+  release.set()
+  for pool in deadline._pools.values():
+    pool.shutdown(wait=True)
+
+
+def test_hung_calls_do_not_block_other_kinds(small_pools):
+  hang = lambda: small_pools.wait(5)
+  for _ in range(2):
+    with pytest.raises(DeadlineExceeded, match="did not finish"):
+      call_with_deadline(deadline_after(0.1), hang, kind="search")
+
+  started = time.perf_counter()
+  assert call_with_deadline(deadline_after(1.0), lambda: "answer", kind="llm") == "answer"
+  assert time.perf_counter() - started < 0.5
+
+
+def test_call_queued_behind_hung_calls_is_reported_as_not_started(small_pools):
+  ran = []
+  for _ in range(2):
+    with pytest.raises(DeadlineExceeded):
+      call_with_deadline(deadline_after(0.1), lambda: small_pools.wait(5), kind="search")
+
+  with pytest.raises(DeadlineExceeded, match="did not start within .* search pool is busy"):
+    call_with_deadline(deadline_after(0.1), lambda: ran.append(True), kind="search")
+  small_pools.set()
+  time.sleep(0.1)
+  assert ran == []
+
+
+def test_unbounded_deadline_runs_inline():
+  assert call_with_deadline(0.0, threading.current_thread) is threading.current_thread()
@@ -0,0 +1,76 @@
+import json
+import threading
+
+import pytest
+
+import ingest
+
+
+class FakeCollection:
+  def __init__(self):
+    self.rows = {}
+    self.upserts = 0
+
+  def get(self, ids, include):
+    return {"ids": [chunk_id for chunk_id in ids if chunk_id in self.rows]}
+
+  def upsert(self, ids, embeddings, documents, metadatas):
+    assert len(ids) == len(embeddings) == len(documents) == len(metadatas)
+    self.upserts += 1
+    for row in zip(ids, embeddings, documents, metadatas):
+      self.rows[row[0]] = row[1:]
+
+
+class FlakyEmbeddings:
+  """Fails the first `failures` calls, then embeds each text as [length, 0]."""
+  def __init__(self, failures: int):
+    self.failures = failures
+    self.calls = 0
+    self._lock = threading.Lock()
+
+  def embed_documents(self, texts):
+    with self._lock:
+      self.calls += 1
+      if self.calls <= self.failures:
+        raise RuntimeError("rate limited")
+    return [[float(len(text)), 0.0] for text in texts]
+
+
+class FakeVectorDB:
+  def __init__(self, embeddings):
+    self.vector_store = type("Store", (), {"_collection": FakeCollection(), "embeddings": embeddings})()
+
+
+@pytest.fixture
+def corpus(tmp_path):
+  records = [{"text": f"Document {i} about topic {i % 5}.", "lang": "en"} for i in range(20)]
+  records.append({"text": "Document 3 about topic 3."})  # Same chunk as document 3.
+  records.append({"content": " ".join(f"word{i}" for i in range(400))})  # Several chunks.
+  path = tmp_path / "corpus.jsonl"
+  path.write_text("".join(json.dumps(record) + "\n" for record in records))
+  return str(path)
+
+
+def test_reingesting_the_same_corpus_inserts_nothing(corpus, monkeypatch):
+  monkeypatch.setattr(ingest.random, "uniform", lambda low, high: 0.0)
+  db = FakeVectorDB(FlakyEmbeddings(failures=2))
+  options = dict(batch_size=4, concurrency=3, upsert_batch=5, workers=2, window=6)
+
+  first = ingest.ingest(corpus, vector_db=db, **options)
+  collection = db.vector_store._collection
+  assert first["docs"] == 22
+  assert first["chunks"] > first["docs"]
+  assert first["inserted"] == len(collection.rows) == first["chunks"] - 1
+  assert first["skipped"] == 1
+  assert first["inserted"] + first["skipped"] == first["chunks"]
+  assert first["retries"] == 2
+  assert all(metadata["created_at"] == metadata["last_seen_at"] for _, _, metadata in collection.rows.values())
+
+  upserts = collection.upserts
+  again = ingest.ingest(corpus, vector_db=db, **options)
+  assert again["docs"] == 22
+  assert again["chunks"] == first["chunks"]
+  assert again["inserted"] == 0
+  assert again["skipped"] == again["chunks"]
+  assert again["retries"] == 0
+  assert collection.upserts == upserts
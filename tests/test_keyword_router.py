@@ -0,0 +1,39 @@
+import json
+
+from keyword_router import KeywordRouter
+from support_routes import support_router
+
+
+def test_keywords_match_whole_words_only():
+  router = KeywordRouter({"Billing": ["due", "charge"]}, default="General")
+  assert router.classify("we produce widgets") == "General"
+  assert router.classify("the payment is due") == "Billing"
+  assert router.classify("Why so many charges?") == "Billing"
+  assert support_router().classify("How do you produce this?") == "General"
+
+
+def test_longest_ngram_wins_with_its_weight():
+  router = KeywordRouter({"Technical": {"error": 1.0}, "Billing": {"payment error": 3.0}}, default="General")
+  assert router.scores("a payment error on my card") == {"Technical": 0.0, "Billing": 3.0}
+  assert router.classify("a payment error on my card") == "Billing"
+  assert router.classify("an error on the login page") == "Technical"
+
+
+def test_weights_decide_between_routes():
+  router = KeywordRouter({"Billing": {"bill": 0.5}, "Technical": ["bug"]}, default="General")
+  assert router.classify("a bug in my bill") == "Technical"
+  assert router.classify("bills, bills, bills and a bug") == "Billing"
+
+
+def test_ties_go_to_the_route_listed_first():
+  assert KeywordRouter({"Billing": ["help"], "Technical": ["help"]}, default="General").classify("help") == "Billing"
+  assert KeywordRouter({"Technical": ["help"], "Billing": ["help"]}, default="General").classify("help") == "Technical"
+  assert KeywordRouter({"Billing": ["refund"], "Technical": ["error"]}, default="General").classify("refund error") == "Billing"
+
+
+def test_routes_load_from_config(tmp_path):
+  path = tmp_path / "routes.json"
+  path.write_text(json.dumps({"default": "General", "plurals": False, "routes": {"Billing": {"invoice": 2}}}))
+  router = KeywordRouter.from_config(str(path))
+  assert router.classify("where is my invoice") == "Billing"
+  assert router.classify("where are my invoices") == "General"
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from llm_gateway import HedgedLLM, LatencyStats
+
+DELAY = 0.1
+
+
+class FakeModel:
+  """Answers attempt n after `plan[n][0]` seconds, with `plan[n][1]` or by raising it."""
+  def __init__(self, *plan):
+    self.plan = plan
+    self.started = []
+    self._lock = threading.Lock()
+
+  def __call__(self, prompt):
+    with self._lock:
+      attempt = len(self.started)
+      self.started.append(time.perf_counter())
+    seconds, outcome = self.plan[attempt]
+    time.sleep(seconds)
+    if isinstance(outcome, Exception):
+      raise outcome
+    return outcome
+
+
+def hedged(fake, **stats_kwargs):
+  stats = LatencyStats(**stats_kwargs)
+  # Enough history that the slow attempts below do not move the hedge delay.
+  for _ in range(100):
+    stats.record(DELAY)
+  return HedgedLLM(RunnableLambda(fake), "test", stats=stats, hedge=True)
+
+
+def counters(llm):
+  snapshot = llm.stats.snapshot()
+  return {name: snapshot[name] for name in ("calls", "errors", "hedges", "hedge_wins", "hedges_skipped")}
+
+
+def test_fast_call_is_not_hedged():
+  fake = FakeModel((0.01, "first"))
+  llm = hedged(fake)
+  assert llm.invoke("q") == "first"
+  assert len(fake.started) == 1
+  assert counters(llm) == {"calls": 1, "errors": 0, "hedges": 0, "hedge_wins": 0, "hedges_skipped": 0}
+
+
+def test_hedge_is_sent_after_the_delay_and_the_faster_hedge_wins():
+  fake = FakeModel((1.0, "first"), (0.01, "second"))
+  llm = hedged(fake)
+  started = time.perf_counter()
+  assert llm.invoke("q") == "second"
+  assert time.perf_counter() - started < 0.5
+  assert len(fake.started) == 2
+  assert DELAY * 0.9 <= fake.started[1] - fake.started[0] < DELAY + 0.1
+  assert counters(llm) == {"calls": 1, "errors": 0, "hedges": 1, "hedge_wins": 1, "hedges_skipped": 0}
+
+
+def test_first_response_wins_when_it_finishes_before_the_hedge():
+  fake = FakeModel((DELAY + 0.05, "first"), (1.0, "second"))
+  llm = hedged(fake)
+  started = time.perf_counter()
+  assert llm.invoke("q") == "first"
+  assert time.perf_counter() - started < 0.5
+  assert counters(llm) == {"calls": 1, "errors": 0, "hedges": 1, "hedge_wins": 0, "hedges_skipped": 0}
+
+
+def test_failed_attempt_falls_back_to_the_other():
+  fake = FakeModel((DELAY + 0.05, RuntimeError("provider error")), (0.2, "second"))
+  llm = hedged(fake)
+  assert llm.invoke("q") == "second"
+  assert counters(llm) == {"calls": 1, "errors": 0, "hedges": 1, "hedge_wins": 1, "hedges_skipped": 0}
+
+
+def test_error_is_raised_when_both_attempts_fail():
+  fake = FakeModel((DELAY + 0.05, RuntimeError("first")), (0.01, RuntimeError("second")))
+  llm = hedged(fake)
+  with pytest.raises(RuntimeError):
+    llm.invoke("q")
+  assert counters(llm) == {"calls": 1, "errors": 1, "hedges": 1, "hedge_wins": 0, "hedges_skipped": 0}
+
+
+def test_hedges_are_capped_by_the_budget():
+  fake = FakeModel(*[(DELAY + 0.1, f"answer {i}") for i in range(20)])
+  llm = hedged(fake, hedge_rate=0.0, hedge_burst=1)
+  assert [llm.invoke("q") for _ in range(3)] == ["answer 0", "answer 2", "answer 3"]
+  assert len(fake.started) == 4
+  assert counters(llm) == {"calls": 3, "errors": 0, "hedges": 1, "hedge_wins": 0, "hedges_skipped": 2}
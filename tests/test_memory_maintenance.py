@@ -0,0 +1,56 @@
+import math
+import time
+
+from db_connection import CONVERSATION_SOURCE
+from memory_maintenance import find_removals
+
+DAY = 86400
+
+
+class FakeCollection:
+  """Just enough of a Chroma collection for find_removals, with L2 distances."""
+  def __init__(self, records):
+    self.records = records
+
+  def count(self):
+    return len(self.records)
+
+  def get(self, ids=None, include=(), limit=None, offset=0):
+    records = [r for r in self.records if ids is None or r["id"] in ids]
+    records = records[offset:offset + limit] if limit else records
+    page = {"ids": [r["id"] for r in records]}
+    for field in include:
+      page[field] = [r[field] for r in records]
+    return page
+
+  def query(self, query_embeddings, n_results, include=()):
+    ranked = sorted(self.records, key=lambda r: math.dist(r["embeddings"], query_embeddings[0]))[:n_results]
+    return {"ids": [[r["id"] for r in ranked]],
+            "distances": [[math.dist(r["embeddings"], query_embeddings[0]) for r in ranked]]}
+
+
+def record(entry_id, document, embedding, age_days, source=CONVERSATION_SOURCE):
+  seen = time.time() - age_days * DAY
+  return {"id": entry_id, "documents": document, "embeddings": embedding,
+          "metadatas": {"source": source, "created_at": seen, "last_seen_at": seen}}
+
+
+def test_only_conversation_memories_expire():
+  collection = FakeCollection([
+    record("old-answer", "Query: a\nResult: x", [0.0, 0.0], age_days=120),
+    record("new-answer", "Query: b\nResult: y", [1.0, 0.0], age_days=1),
+    record("ingested", "Chinook has 11 tables.", [0.0, 1.0], age_days=400, source="docs/chinook.md"),
+  ])
+  removals = find_removals(collection, max_age_days=90, max_distance=0.05)
+  assert removals == {"stale": ["old-answer"], "exact_duplicates": [], "near_duplicates": []}
+
+
+def test_duplicates_keep_the_newest_copy():
+  collection = FakeCollection([
+    record("first", "same text", [0.0, 0.0], age_days=5),
+    record("repeat", "same text", [0.5, 0.5], age_days=1),
+    record("close", "nearly the same text", [0.51, 0.5], age_days=3, source="notes.jsonl:4"),
+    record("other", "different", [5.0, 5.0], age_days=2),
+  ])
+  removals = find_removals(collection, max_age_days=90, max_distance=0.05)
+  assert removals == {"stale": [], "exact_duplicates": ["first"], "near_duplicates": ["close"]}
@@ -0,0 +1,10 @@
+from metrics import percentile
+
+
+def test_percentile():
+  values = [5, 1, 4, 2, 3]
+  assert percentile(values, 50) == 3
+  assert percentile(values, 99) == 5
+  assert percentile(values, 0) == 1
+  assert percentile([], 50) == 0.0
+  assert percentile([], 50, None) is None
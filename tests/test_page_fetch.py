@@ -0,0 +1,162 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from page_fetch import PageCache, PageFetcher
+
+PAGE = ("<html><head><style>p{}</style><script>var x=1;</script></head><body><nav>Home | About</nav>"
+        "<p>Agentic AI systems combine planning, tool use and memory.</p>"
+        "<p>Multi agent frameworks route each query to a specialised agent.</p></body></html>").encode()
+
+
+class Site:
+  """What the local server saw: status codes sent and the peak of concurrent requests."""
+  def __init__(self):
+    self.statuses = []
+    self.active = 0
+    self.peak = 0
+    self.lock = threading.Lock()
+
+
+@pytest.fixture
+def site():
+  state = Site()
+
+  class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+      with state.lock:
+        state.active += 1
+        state.peak = max(state.peak, state.active)
+      try:
+        if self.path.startswith("/slow"):
+          time.sleep(1.0)
+        elif self.path.startswith("/hold"):
+          time.sleep(0.2)
+        if self.headers.get("If-None-Match") == '"v1"':
+          self.reply(304)
+          return
+        self.reply(200, PAGE)
+      finally:
+        with state.lock:
+          state.active -= 1
+
+    def reply(self, status, body=b""):
+      with state.lock:
+        state.statuses.append(status)
+      self.send_response(status)
+      if status == 200:
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", '"v1"')
+      self.send_header("Content-Length", str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+
+    def log_message(self, *args):
+      pass
+
+  server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  state.url = f"http://127.0.0.1:{server.server_port}"
+  yield state
+  server.shutdown()
+  server.server_close()
+
+
+@pytest.fixture
+def make_fetcher(tmp_path):
+  fetchers = []
+
+  def make(**kwargs):
+    fetcher = PageFetcher(cache=PageCache(str(tmp_path)), **kwargs)
+    fetchers.append(fetcher)
+    return fetcher
+  yield make
+  for fetcher in fetchers:
+    fetcher.close()
+
+
+def test_page_is_extracted_and_cached_with_its_etag(site, make_fetcher):
+  fetcher = make_fetcher()
+  url = f"{site.url}/page"
+  text = fetcher.fetch_texts([url])[url]
+
+  assert "Agentic AI systems combine planning" in text
+  assert "var x" not in text and "Home | About" not in text
+  assert fetcher.cache.get(url)["etag"] == '"v1"'
+  assert fetcher.cache.get(url)["text"] == text
+  assert fetcher.stats == {"fetched": 1, "revalidated": 0, "failed": 0}
+
+
+def test_not_modified_reuses_the_cached_text(site, make_fetcher):
+  fetcher = make_fetcher()
+  url = f"{site.url}/page"
+  first = fetcher.fetch_texts([url])[url]
+  second = fetcher.fetch_texts([url])[url]
+
+  assert second == first
+  assert site.statuses == [200, 304]
+  assert fetcher.stats == {"fetched": 1, "revalidated": 1, "failed": 0}
+
+
+def test_per_host_limit_is_respected(site, make_fetcher):
+  fetcher = make_fetcher(per_host_limit=2)
+  urls = [f"{site.url}/hold{i}" for i in range(6)]
+  texts = fetcher.fetch_texts(urls)
+
+  assert sorted(texts) == sorted(urls)
+  assert site.peak == 2
+
+
+def test_timeout_is_counted_as_failed(site, make_fetcher):
+  fetcher = make_fetcher(timeout=0.2)
+  texts = fetcher.fetch_texts([f"{site.url}/slow", f"{site.url}/page"])
+
+  assert list(texts) == [f"{site.url}/page"]
+  assert fetcher.stats == {"fetched": 1, "revalidated": 0, "failed": 1}
+
+
+def test_deep_read_attaches_relevant_passages(site, make_fetcher):
+  fetcher = make_fetcher()
+  results = [{"title": "Page", "snippet": "", "link": f"{site.url}/page"}]
+  read = fetcher.deep_read(results, "multi agent AI")
+  assert "Multi agent frameworks" in read[0]["content"]
+
+
+def test_cache_keeps_the_most_recently_used_pages(tmp_path):
+  cache = PageCache(str(tmp_path), max_entries=3)
+  for name in "abc":
+    cache.put(name, f"text {name}", None, None)
+    time.sleep(0.01)
+  assert cache.get("a")["text"] == "text a"
+  time.sleep(0.01)
+  cache.put("d", "text d", None, None)
+
+  assert cache.get("b") is None
+  assert [cache.get(name)["text"] for name in "acd"] == ["text a", "text c", "text d"]
+  cache.put("a", "text a again", None, None)
+  assert len(list(tmp_path.glob("*.json"))) == 3
+  # A new cache over the same directory counts the pages already there.
+  assert PageCache(str(tmp_path), max_entries=3)._entries == 3
+
+
+def test_concurrent_first_callers_share_one_fetcher(monkeypatch):
+  import page_fetch
+  created = []
+
+  class SlowFetcher:
+    def __init__(self):
+      time.sleep(0.05)
+      created.append(self)
+
+  monkeypatch.setattr(page_fetch, "PageFetcher", SlowFetcher)
+  monkeypatch.setattr(page_fetch, "_fetcher", None)
+  threads = [threading.Thread(target=page_fetch.get_fetcher) for _ in range(8)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert len(created) == 1
+  assert page_fetch.get_fetcher() is created[0]
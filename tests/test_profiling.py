@@ -0,0 +1,26 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiling
+
+
+def client_with_token(monkeypatch, token):
+  monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", token)
+  app = FastAPI()
+  profiling.install(app)
+  return TestClient(app)
+
+
+@pytest.mark.parametrize("method, path", [("get", "/admin/profiles"), ("post", "/admin/tracemalloc/start"), ("get", "/admin/tracemalloc/diff")])
+def test_admin_routes_are_closed_without_a_configured_token(monkeypatch, method, path):
+  client = client_with_token(monkeypatch, "")
+  assert getattr(client, method)(path).status_code == 403
+  assert getattr(client, method)(path, headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_admin_routes_require_the_configured_token(monkeypatch):
+  client = client_with_token(monkeypatch, "secret")
+  assert client.get("/admin/profiles").status_code == 403
+  assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+  assert client.get("/admin/profiles", headers={"X-Admin-Token": "secret"}).status_code == 200
@@ -0,0 +1,60 @@
+import pytest
+
+import simple_loop_customer_support as loop
+from MultiAgent.state import render_messages
+
+QUERY = "I have a billing issue with my last invoice"
+ANSWER = "This is Billing service, we will solve your problem in no time."
+
+
+def failing_billing(manager, failures):
+  """Make the billing worker return no result for its first `failures` runs."""
+  process = manager.billing.process
+  calls = {"n": 0}
+
+  def flaky(state):
+    calls["n"] += 1
+    if calls["n"] <= failures:
+      state.set_result(manager.billing.name, "No result available", label="Response, ")
+      return state
+    return process(state)
+  manager.billing.process = flaky
+
+
+@pytest.mark.parametrize("failures", [0, 1, 2])
+def test_retry_reruns_only_the_worker(failures):
+  manager = loop.WorkflowManager()
+  failing_billing(manager, failures)
+  result = manager.run(QUERY)
+
+  assert result["node_runs"] == {"orchestration": 1, "billing": failures + 1}
+  assert result["attempts"] == (
+    [{"iteration": i + 1, "route": "Billing", "result": "No result available", "valid": False} for i in range(failures)]
+    + [{"iteration": failures + 1, "route": "Billing", "result": ANSWER, "valid": True}]
+  )
+  assert result["result"] == ANSWER
+  rendered = render_messages(result)
+  assert rendered.count("BillingAgent: Response, No result available") == failures
+  assert rendered.count(f"BillingAgent: Response, {ANSWER}") == 1
+
+
+def test_iteration_limit_is_reported(monkeypatch):
+  monkeypatch.setattr(loop, "VALIDATION_MAX_ITERATIONS", 2)
+  manager = loop.WorkflowManager()
+  failing_billing(manager, failures=10)
+  result = manager.run(QUERY)
+
+  assert result["node_runs"]["billing"] == 3
+  assert result["result"] == "Workflow stopped due to too many iterations."
+  # Earlier attempts still render with their own result.
+  assert render_messages(result).count("BillingAgent: Response, No result available") == 3
+
+
+def test_time_budget_is_reported(monkeypatch):
+  monkeypatch.setattr(loop, "VALIDATION_RETRY_BUDGET_S", 0.0)
+  manager = loop.WorkflowManager()
+  failing_billing(manager, failures=10)
+  result = manager.run(QUERY)
+
+  assert result["node_runs"]["billing"] == 1
+  assert result["result"] == "Workflow stopped due to running out of time."
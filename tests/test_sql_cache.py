@@ -0,0 +1,101 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import sql_cache
+from sql_cache import SQLResultCache, TableVersions, extract_tables
+
+
+@pytest.fixture(autouse=True)
+def no_version_throttle(monkeypatch):
+  monkeypatch.setattr(sql_cache, "SQL_CACHE_VERSION_CHECK_S", 0.0)
+
+
+@pytest.fixture
+def engine(tmp_path):
+  engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+  with engine.begin() as conn:
+    conn.execute(text("CREATE TABLE Genre (GenreId INTEGER PRIMARY KEY, Name TEXT)"))
+    conn.execute(text("INSERT INTO Genre VALUES (1, 'Rock'), (2, 'Jazz')"))
+  yield engine
+  engine.dispose()
+
+
+def counting_runner(engine):
+  calls = []
+
+  def run(query):
+    calls.append(query)
+    with engine.connect() as conn:
+      return [tuple(row) for row in conn.execute(text(query))]
+  return run, calls
+
+
+def test_hit_until_a_read_table_changes(engine):
+  cache = SQLResultCache(engine)
+  run, calls = counting_runner(engine)
+  query = "SELECT Name FROM Genre ORDER BY Name"
+
+  assert cache.get_or_run(query, run) == [("Jazz",), ("Rock",)]
+  assert cache.get_or_run("select name  from genre order by name;", run) == [("Jazz",), ("Rock",)]
+  assert len(calls) == 1
+
+  with engine.begin() as conn:
+    conn.execute(text("INSERT INTO Genre VALUES (3, 'Blues')"))
+  assert cache.get_or_run(query, run) == [("Blues",), ("Jazz",), ("Rock",)]
+  assert len(calls) == 2
+  assert cache.stats()["invalidated"] == 1
+
+
+def test_missing_marker_falls_back_to_the_ttl(engine, monkeypatch):
+  cache = SQLResultCache(engine, ttl=60)
+  monkeypatch.setattr(cache.versions, "_lookup", lambda tables: {table: None for table in tables})
+  run, calls = counting_runner(engine)
+  query = "SELECT Name FROM Genre"
+
+  cache.get_or_run(query, run)
+  cache.get_or_run(query, run)
+  assert len(calls) == 1
+  assert cache.stats()["invalidated"] == 0
+
+  cache._entries[sql_cache.normalize_sql(query)]["created_at"] -= 61
+  cache.get_or_run(query, run)
+  assert len(calls) == 2
+  assert cache.stats()["expired"] == 1
+
+
+class FakeMySQL:
+  """Engine stand-in that answers information_schema lookups from `update_times`."""
+  def __init__(self, update_times):
+    self.dialect = SimpleNamespace(name="mysql")
+    self.update_times = update_times
+    self.statements = []
+
+  def connect(self):
+    return self
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    return False
+
+  def execute(self, statement, params=None):
+    self.statements.append(str(statement))
+    names = (params or {}).get("names", [])
+    rows = [(name.lower(), value) for name, value in self.update_times.items() if name.lower() in names]
+    return SimpleNamespace(all=lambda: rows)
+
+
+def test_mysql_markers_match_mixed_case_table_names():
+  updated = datetime.datetime(2026, 1, 1, 12, 0)
+  engine = FakeMySQL({"Album": updated, "Track": None})
+  versions = TableVersions(engine)
+
+  assert versions.get(extract_tables("SELECT * FROM Album")) == {"album": str(updated)}
+  assert "SET SESSION information_schema_stats_expiry = 0" in engine.statements
+  assert any("LOWER(TABLE_NAME) IN" in statement for statement in engine.statements)
+  # A NULL UPDATE_TIME cannot be validated, so the entry relies on its TTL.
+  assert versions.get(extract_tables("SELECT * FROM Album JOIN Track ON 1 = 1")) is None
@@ -0,0 +1,33 @@
+import state
+from state import WorkflowState, render_messages
+
+
+def test_each_message_renders_the_result_it_was_logged_with():
+  s = WorkflowState(user_message="q")
+  s.set_result("Worker", "first try", label="Response, ")
+  s.set_result("Worker", "second try", label="Response, ")
+  s.result = "Workflow stopped due to too many iterations."
+  assert render_messages(s) == ["Worker: Response, first try", "Worker: Response, second try"]
+
+
+def test_repeated_result_is_stored_once():
+  s = WorkflowState()
+  s.set_result("Worker", "answer", label="Response, ")
+  s.set_result("RespondAgent", "answer", label="Response: ")
+  assert len(s.results) == 1
+  assert render_messages(s) == ["Worker: Response, answer", "RespondAgent: Response: answer"]
+
+
+def test_trimmed_messages_release_their_results(monkeypatch):
+  monkeypatch.setattr(state, "STATE_MAX_MESSAGES", 3)
+  s = WorkflowState()
+  for i in range(5):
+    s.set_result("Worker", f"answer {i}")
+  assert render_messages(s) == ["Worker: answer 2", "Worker: answer 3", "Worker: answer 4"]
+  assert sorted(s.results.values()) == ["answer 2", "answer 3", "answer 4"]
+
+
+def test_render_messages_accepts_the_graph_output_mapping():
+  s = WorkflowState()
+  s.set_result("Worker", "answer")
+  assert render_messages({"messages": s.messages, "results": s.results}) == ["Worker: answer"]
@@ -0,0 +1,41 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("script", ["customer_support.py", "simple_loop_customer_support.py", "simple_multiagent_workflow.py"])
+def test_toy_workflow_runs_from_repo_root(script, tmp_path):
+  # A fresh interpreter, so only the repo root is on the path, as when run by hand.
+  env = dict(os.environ, CHECKPOINT_DB=str(tmp_path / "checkpoints.sqlite"))
+  env.pop("PYTHONPATH", None)
+  completed = subprocess.run([sys.executable, script], cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+  assert completed.returncode == 0, completed.stderr
+  assert "Traceback" not in completed.stderr
+
+
+@pytest.mark.parametrize("module, router", [
+  ("customer_support", lambda manager: manager.orchestration.router),
+  ("simple_loop_customer_support", lambda manager: manager.orchestration.router),
+  ("simple_multiagent_workflow", lambda manager: manager.reader.router),
+])
+def test_run_batch_classifies_each_query_once(module, router, tmp_path, monkeypatch):
+  manager = importlib.import_module(module).WorkflowManager()
+  classified = []
+  classify = router(manager).classify
+  monkeypatch.setattr(router(manager), "classify", lambda message: classified.append(message) or classify(message))
+
+  queries = ["I have a billing issue with my last invoice", "Tell me a joke", "There is an error on the login page"]
+  input_path, output_path = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+  input_path.write_text("".join(json.dumps(query) + "\n" for query in queries))
+  summary = manager.run_batch(str(input_path), str(output_path), concurrency=2)
+
+  assert summary["succeeded"] == len(queries)
+  assert sorted(classified) == sorted(query.lower() for query in queries)
+  outputs = [json.loads(line) for line in output_path.read_text().splitlines()]
+  assert all(output["result"] for output in outputs)
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import agents
+import main
+import traffic
+
+
+@pytest.fixture
+def manager(fake_llm, fake_memory, monkeypatch, tmp_path):
+  calls = []
+  fake_llm["fn"] = lambda prompt: calls.append(prompt) or ("general" if len(calls) % 2 else f"answer {len(calls)}")
+  monkeypatch.setattr(traffic, "TRAFFIC_LOG", str(tmp_path / "traffic.jsonl"))
+  monkeypatch.setattr(traffic, "TRAFFIC_REPLAY_LATENCY_SCALE", 0.0)
+  monkeypatch.setattr(traffic, "_replay_index", None)
+  workflow = agents.WorkflowManager()
+  workflow.router.batcher = None
+  workflow.llm_calls = calls
+  monkeypatch.setattr(main, "get_manager", lambda: workflow)
+  return workflow
+
+
+def set_mode(monkeypatch, mode):
+  monkeypatch.setattr(traffic, "CAPTURING", mode == "capture")
+  monkeypatch.setattr(traffic, "REPLAYING", mode == "replay")
+
+
+def capture(manager, monkeypatch, queries):
+  # An unrecorded request first, so the memos hold the answer to "hello".
+  manager.run("hello")
+  set_mode(monkeypatch, "capture")
+  client = TestClient(main.app)
+  responses = [client.post("/chat", json={"user_query": query}).json()["response"] for query in queries]
+  set_mode(monkeypatch, "off")
+  return responses, traffic.load_log(traffic.TRAFFIC_LOG)
+
+
+def test_capture_records_every_call_despite_memo_hits(manager, monkeypatch):
+  _, records = capture(manager, monkeypatch, ["hello", "hello"])
+
+  assert [record["route"] for record in records] == ["general", "general"]
+  for record in records:
+    kinds = [call["kind"] for call in record["calls"]]
+    assert kinds.count("route") == 1
+    assert kinds.count("llm") == 2
+    assert "memory_recall" in kinds and "memory_write" in kinds
+  assert manager.memo.hits == 0
+
+
+def test_replay_answers_from_the_log_without_the_memo(manager, monkeypatch):
+  responses, records = capture(manager, monkeypatch, ["hello", "hello"])
+  llm_calls = len(manager.llm_calls)
+
+  set_mode(monkeypatch, "replay")
+  client = TestClient(main.app)
+  replayed = [client.post("/chat", json={"user_query": record["query"]}, headers={"X-Replay-Id": record["id"]})
+              for record in records]
+
+  assert [response.status_code for response in replayed] == [200, 200]
+  assert [response.json()["response"] for response in replayed] == responses
+  assert len(manager.llm_calls) == llm_calls
+  assert manager.memo.hits == 0
+
+
+def test_replay_without_a_recorded_call_raises_replay_miss(manager, monkeypatch):
+  _, [record] = capture(manager, monkeypatch, ["hello"])
+  record["calls"] = [call for call in record["calls"] if call["kind"] != "route"]
+  with open(traffic.TRAFFIC_LOG, "w") as f:
+    f.write(json.dumps(record) + "\n")
+
+  set_mode(monkeypatch, "replay")
+  client = TestClient(main.app)
+  with pytest.raises(traffic.ReplayMiss, match="No recorded route call left"):
+    client.post("/chat", json={"user_query": "hello"}, headers={"X-Replay-Id": record["id"]})
+  with pytest.raises(traffic.ReplayMiss, match="not in"):
+    client.post("/chat", json={"user_query": "hello"}, headers={"X-Replay-Id": "unknown"})
@@ -0,0 +1,93 @@
+import pytest
+from langchain_core.documents import Document
+
+from db_connection import CONVERSATION_SOURCE, VectorDBConnect, content_id
+
+
+class FakeCollection:
+  """Just enough of a Chroma collection for add_new, with squared L2 distances like Chroma's default."""
+  metadata = {"hnsw:space": "l2"}
+
+  def __init__(self):
+    self.rows = {}
+
+  def count(self):
+    return len(self.rows)
+
+  def get(self, ids, include=()):
+    return {"ids": [entry_id for entry_id in ids if entry_id in self.rows]}
+
+  def query(self, query_embeddings, n_results, include=()):
+    distance = lambda entry_id: sum((x - y) ** 2 for x, y in zip(self.rows[entry_id]["embedding"], query_embeddings[0]))
+    ranked = sorted(self.rows, key=distance)[:n_results]
+    return {"ids": [ranked], "distances": [[distance(entry_id) for entry_id in ranked]]}
+
+  def upsert(self, ids, embeddings, documents, metadatas):
+    for entry_id, embedding, document, metadata in zip(ids, embeddings, documents, metadatas):
+      self.rows[entry_id] = {"embedding": embedding, "document": document, "metadata": metadata}
+
+  def update(self, ids, metadatas):
+    for entry_id, metadata in zip(ids, metadatas):
+      self.rows[entry_id]["metadata"].update(metadata)
+
+  def delete(self, ids):
+    for entry_id in ids:
+      del self.rows[entry_id]
+
+
+class FakeEmbeddings:
+  """Texts embed to the vector given by their first word, e.g. "a:" -> [0, 0]."""
+  VECTORS = {"a": [0.0, 0.0], "a2": [0.01, 0.0], "b": [1.0, 0.0], "c": [0.0, 1.0]}
+
+  def __init__(self):
+    self.calls = 0
+
+  def embed_documents(self, texts):
+    self.calls += 1
+    return [list(self.VECTORS[text.split(":")[0]]) for text in texts]
+
+
+@pytest.fixture
+def memory():
+  db = VectorDBConnect.__new__(VectorDBConnect)
+  db.vector_store = type("Store", (), {"_collection": FakeCollection(), "embeddings": FakeEmbeddings()})()
+  return db
+
+
+def add(memory, *texts):
+  return memory.add_new([Document(page_content=text, metadata={"source": CONVERSATION_SOURCE}) for text in texts])
+
+
+def documents(memory):
+  return sorted(row["document"] for row in memory.vector_store._collection.rows.values())
+
+
+def test_near_duplicate_replaces_the_stored_answer(memory):
+  add(memory, "a: old answer", "b: other")
+  stored = add(memory, "a2: new answer")
+
+  assert stored == [content_id("a2: new answer")]
+  assert documents(memory) == ["a2: new answer", "b: other"]
+
+
+def test_exact_repeat_refreshes_last_seen(memory):
+  add(memory, "a: answer")
+  row = memory.vector_store._collection.rows[content_id("a: answer")]
+  row["metadata"]["last_seen_at"] = 0.0
+
+  assert add(memory, "a: answer") == []
+  assert row["metadata"]["last_seen_at"] > 0.0
+  assert memory.vector_store.embeddings.calls == 1
+
+
+def test_chunks_of_one_call_are_deduplicated_against_each_other(memory):
+  stored = add(memory, "a: first chunk", "a2: nearly the same chunk", "c: another chunk")
+
+  assert stored == [content_id("a: first chunk"), content_id("c: another chunk")]
+  assert documents(memory) == ["a: first chunk", "c: another chunk"]
+
+
+def test_chunk_close_to_a_stored_chunk_of_the_same_call_is_dropped(memory):
+  add(memory, "a: kept")
+  assert add(memory, "a: kept", "a2: near the kept one") == []
+  assert documents(memory) == ["a: kept"]
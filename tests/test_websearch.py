@@ -0,0 +1,62 @@
+import pytest
+
+from websearch import EnhancedWebSearch
+
+# enhance_query turns this into three variants, each searched daily and weekly.
+QUERY = "latest gen ai models"
+
+
+class StubSearch:
+  """Stands in for a DuckDuckGo tool: `relevant` on-topic results, then unrelated ones."""
+  def __init__(self, relevant: int):
+    self.relevant = relevant
+    self.queries = []
+
+  def invoke(self, query):
+    self.queries.append(query)
+    n = len(self.queries)
+    results = [{"title": f"{QUERY} explained, part {i}", "snippet": f"All about {QUERY}.",
+                "link": f"https://example.com/{id(self)}/{n}/{i}"} for i in range(self.relevant)]
+    return results + [{"title": f"Unrelated page {i}", "snippet": "Nothing to see.",
+                       "link": f"https://example.com/{id(self)}/{n}/other{i}"} for i in range(10)]
+
+
+def engine(relevant, **kwargs):
+  search = EnhancedWebSearch(**kwargs)
+  search.search, search.search_week = StubSearch(relevant), StubSearch(relevant)
+  return search
+
+
+def test_stops_once_enough_relevant_results_are_found():
+  search = engine(relevant=12, stop_min_results=8, stop_min_score=4)
+  stats = {}
+  results = search.filter_relevant_results(search.deep_search(QUERY, stats=stats), QUERY)
+
+  assert stats == {"calls": 1, "calls_saved": 5, "planned": 6}
+  assert search.search.queries == [QUERY] and search.search_week.queries == []
+  assert len(results) == 12
+  assert search.search_stats() == {"searches": 1, "calls": 1, "calls_saved": 5, "stopped_early": 1, "saved_per_search": 5.0}
+
+
+def test_weekly_search_is_skipped_once_the_target_is_met_mid_variant():
+  search = engine(relevant=5, stop_min_results=8, stop_min_score=4)
+  stats = {}
+  search.deep_search(QUERY, stats=stats)
+  assert stats == {"calls": 2, "calls_saved": 4, "planned": 6}
+
+
+def test_runs_every_call_when_results_stay_irrelevant():
+  search = engine(relevant=0, stop_min_results=8, stop_min_score=4)
+  stats = {}
+  assert search.filter_relevant_results(search.deep_search(QUERY, stats=stats), QUERY) == []
+  assert stats == {"calls": 6, "calls_saved": 0, "planned": 6}
+  assert search.search_stats()["stopped_early"] == 0
+
+
+@pytest.mark.parametrize("relevant", [0, 12])
+def test_threshold_zero_runs_every_call(relevant):
+  search = engine(relevant=relevant, stop_min_results=0)
+  stats = {}
+  search.deep_search(QUERY, stats=stats)
+  assert stats == {"calls": 6, "calls_saved": 0, "planned": 6}
+  assert len(search.search.queries) == len(search.search_week.queries) == 3